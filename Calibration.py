@@ -1,34 +1,33 @@
+import functools
 import numpy as np
-from skimage import io
+from phasor.transform import phasor_weights, phasor_centroid
+from phasor.cache import PhasorCache
 from image_loader.image_loader import ImageLoader
 
-def get_calibration_parameters(filename, channel, bin_width=0.2208, freq=80, harmonic=1, tau_ref=4):
-	"""Opens the tiff image file and calculates the fft and gets the center coordinates of the g and s. Returns
-	the angle and distance that these values need to be translated by to place the calibration measurement
-	at the position expected by the user"""
-	im = ImageLoader.load(filename, channel)
-	image = np.moveaxis(im, 0, 2)
-	bins = image.shape[2]
-	t_arr = bin_width * (np.arange(bins) + 0.5)
-
-	integral = np.sum(image, axis=2, dtype=np.float64)
-	integral[integral == 0] = 1e-5  # Avoid division by zero
-	inv_integral = 1.0 / integral  # Precompute reciprocal
-
-	omega_t = 2 * np.pi * freq / 1000 * harmonic * t_arr
-	cos_omega_t = np.cos(omega_t)
-	sin_omega_t = np.sin(omega_t)
-
-	# Use einsum for better performance
-	g = np.einsum('ijk,k->ij', image, cos_omega_t) * inv_integral
-	s = np.einsum('ijk,k->ij', image, sin_omega_t) * inv_integral
-
-	# Flatten and calculate mean directly
-	coor_x = np.mean(g)
-	coor_y = np.mean(s)
+def get_calibration_parameters(filename, channel, bin_width=0.2208, freq=80, harmonic=1, tau_ref=4, cache=None):
+	"""Opens the image file and calculates the photon weighted center of its g and s coordinates. Returns the angle
+	and distance that these values need to be translated by to place the calibration measurement at the position
+	expected by the user. The totals of the reference file are kept in cache, a PhasorCache, so calibrating with the
+	same file and settings again doesn't read it again"""
+	cache = PhasorCache() if cache is None else cache
+	key = None
+	totals = None
+	if cache.enabled:
+		key = cache.key(filename, channel=int(channel), bin_width=float(bin_width), freq=float(freq),
+						harmonics=(float(harmonic),), kind='totals')
+		totals = cache.get(key)
+	if totals is None:
+		# The stack is read in tiles or time bins by the loader, and only the decay of the whole image is kept
+		weights = functools.partial(phasor_weights, bin_width=bin_width, freq=freq, harmonic=harmonic)
+		totals = ImageLoader.load_totals(filename, channel, weights)
+		if key is not None:
+			cache.put(key, totals)
+	g, s = phasor_centroid(totals)
+	coor_x = g[0]
+	coor_y = s[0]
 
 	# Known sample parameters based on tau and freq
-	omega_tau = 2 * np.pi * freq / 1000 * tau_ref
+	omega_tau = 2 * np.pi * freq / 1000 * harmonic * tau_ref
 	x_ideal = 1 / (1 + omega_tau ** 2)
 	y_ideal = omega_tau / (1 + omega_tau ** 2)
 
@@ -43,4 +42,4 @@ def get_calibration_parameters(filename, channel, bin_width=0.2208, freq=80, har
 	theta = phi_ideal - phi_given
 	m = m_ideal / m_given
 
-	return theta, m
\ No newline at end of file
+	return theta, m
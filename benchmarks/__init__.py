@@ -0,0 +1 @@
+# Benchmarks of FLUTE on synthetic FLIM data, which are run with python -m benchmarks
@@ -0,0 +1,54 @@
+# Runs the benchmarks from the command line, from the folder FLUTE is in:
+#   python -m benchmarks run --sizes 256 1024 4096 --bins 64 256
+#   python -m benchmarks compare old.json new.json
+
+# imports
+import argparse
+
+from .suite import SIZES, BINS, PTU_SIZES, run_suite, save_results, load_results, compare
+
+def main():
+	parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Times FLUTE on synthetic FLIM data")
+	commands = parser.add_subparsers(dest='command', required=True)
+	run = commands.add_parser('run', help="time every stage and save the results")
+	run.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="sides of the images in pixels")
+	run.add_argument('--bins', type=int, nargs='+', default=BINS, help="numbers of time bins")
+	run.add_argument('--ptu-sizes', type=int, nargs='*', default=PTU_SIZES,
+					 help="sizes that PTU files are timed for as well")
+	run.add_argument('--repeats', type=int, default=3, help="times each stage is run, of which the fastest is kept")
+	run.add_argument('--filters', type=int, default=3, help="number of median filters")
+	run.add_argument('--clouds', type=int, default=4, help="number of clouds of the multi-phasor view")
+	run.add_argument('--photons', type=float, default=500, help="photons of the brightest pixels")
+	run.add_argument('--seed', type=int, default=0)
+	run.add_argument('--folder', help="folder that the synthetic files are written to while they are timed")
+	run.add_argument('--output', help="file that the results are saved to")
+	compare_parser = commands.add_parser('compare', help="compare the results of two runs")
+	compare_parser.add_argument('old')
+	compare_parser.add_argument('new')
+	args = parser.parse_args()
+
+	if args.command == 'run':
+		results = run_suite(args.sizes, args.bins, args.ptu_sizes, args.repeats, args.filters, args.clouds,
+							args.photons, args.seed, args.folder)
+		print_results(results)
+		print("Saved to", save_results(results, args.output))
+	else:
+		print_comparison(compare(load_results(args.old), load_results(args.new)))
+
+def print_results(results):
+	print("%6s %5s %-20s %10s %10s" % ('size', 'bins', 'stage', 'seconds', 'peak MB'))
+	for case in results['cases']:
+		for stage, result in case['stages'].items():
+			print("%6d %5d %-20s %10.4f %10.1f" % (case['size'], case['bins'], stage, result['seconds'],
+												  result['peak_bytes'] / 2 ** 20))
+
+def print_comparison(rows):
+	print("%6s %5s %-20s %10s %10s %8s %10s %10s" % ('size', 'bins', 'stage', 'old s', 'new s', 'speedup', 'old MB',
+													 'new MB'))
+	for size, bins, stage, old_seconds, new_seconds, old_peak, new_peak in rows:
+		print("%6d %5d %-20s %10.4f %10.4f %7.2fx %10.1f %10.1f" % (size, bins, stage, old_seconds, new_seconds,
+																	 old_seconds / new_seconds, old_peak / 2 ** 20,
+																	 new_peak / 2 ** 20))
+
+if __name__ == '__main__':
+	main()
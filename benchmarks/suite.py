@@ -0,0 +1,194 @@
+# Times each stage of the analysis of synthetic FLIM data without opening any windows: reading the file and
+# calculating the phasor, the median filters, the masks, every colormap, the phasor plot and the multi-phasor view. The
+# results of a run are saved as a JSON file, so that the runs of different versions of FLUTE can be compared
+
+# imports
+import contextlib
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+import config
+from phasor import PhasorData, PhasorCache, PhasorPlot, MultiPhasorPlot, HeadlessCanvas
+from .synthetic import SyntheticFLIM, ptufile
+
+# Sizes and numbers of time bins that are run when none are given. Images of 4096 x 4096 pixels can be run as well, but
+# their stacks take several GB of disk space with 256 bins
+SIZES = (256, 1024)
+BINS = (64, 256)
+
+# Sizes that PTU files are made for when none are given. The whole histogram of a PTU file is held in memory while it
+# is written, so large PTU files are left out unless they are asked for
+PTU_SIZES = (256, 512)
+
+# Colormaps that are timed, with the names of their stages
+COLORMAPS = ((0, 'intensity'), (1, 'tau_m'), (2, 'tau_p'), (3, 'jet'), (4, 'distance'))
+
+# Colours of the clouds of the multi-phasor view
+CLOUD_COLORS = ('red', 'blue', 'green', 'cyan', 'magenta', 'yellow', 'orange', 'purple')
+
+def measure(run, setup=None, repeats=3):
+	"""Times run, called with what setup returns, repeats times, with a new setup before every call so that each call
+	does the same work. The peak memory is measured in one more call, as the most memory that the call allocated on
+	top of what was allocated before it. Returns the shortest and the mean time in seconds, and the peak in bytes"""
+	times = []
+	peak = None
+	for i in range(repeats + 1):
+		args = setup() if setup is not None else ()
+		gc.collect()
+		with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+			if i < repeats:
+				start = time.perf_counter()
+				run(*args)
+				times.append(time.perf_counter() - start)
+			else:
+				# Tracing slows the call down, so it isn't timed
+				tracemalloc.start()
+				try:
+					run(*args)
+					peak = tracemalloc.get_traced_memory()[1]
+				finally:
+					tracemalloc.stop()
+		del args
+	return {'seconds': min(times), 'mean_seconds': sum(times) / len(times), 'peak_bytes': peak}
+
+def lifetime_coordinates(lifetime, freq):
+	"""Returns the g and s coordinates of a single exponential decay with lifetime in ns"""
+	wt = 2 * np.pi * freq / 1000 * lifetime
+	return 1 / (1 + wt ** 2), wt / (1 + wt ** 2)
+
+def run_case(synthetic, folder, repeats=3, filters=3, clouds=4, ptu=False, progress=print):
+	"""Writes the data of synthetic, a SyntheticFLIM, to folder and times every stage on it. Returns a dict of the
+	results of measure by stage"""
+	name = '%d_%d' % (synthetic.size, synthetic.bins)
+	settings = dict(bin_width=synthetic.bin_width, freq=synthetic.freq, harmonic=1, cache=PhasorCache(max_bytes=0))
+	stages = {}
+
+	def stage(stage_name, run, setup=None):
+		progress("  %s" % stage_name)
+		stages[stage_name] = measure(run, setup, repeats)
+
+	progress("Writing %d x %d pixels with %d bins" % (synthetic.size, synthetic.size, synthetic.bins))
+	tiff = synthetic.write_tiff(os.path.join(folder, name + '.tif'))
+	stage('load_tiff', lambda: PhasorData.from_file(tiff, **settings))
+	if ptu:
+		ptu_file = synthetic.write_ptu(os.path.join(folder, name + '.ptu'))
+		stage('load_ptu', lambda: PhasorData.from_file(ptu_file, **settings))
+		os.remove(ptu_file)
+	with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+		loaded = PhasorData.from_file(tiff, **settings)
+	os.remove(tiff)
+
+	def fresh():
+		"""Returns data that nothing has been calculated on yet"""
+		return PhasorData(loaded.name, loaded.original_image, loaded.raw_g, loaded.raw_s, loaded.phi_cal,
+						  loaded.m_cal, loaded.bin_width, loaded.freq, loaded.harmonic, loaded.harmonics)
+
+	def prepared():
+		"""Returns data with filters, thresholds, ranges, a distance colormap centre and selection circles set, as
+		they would be while the data is analysed"""
+		data = fresh()
+		data.convolution(filters)
+		data.update_threshold(np.percentile(data.original_image, 10), data.max)
+		data.update_angle_range(5, 80)
+		data.update_circle_range(20, 100)
+		data.fraction_coor_map(*lifetime_coordinates(synthetic.lifetimes[0], synthetic.freq))
+		data.update_fraction_range(0, 60)
+		circles = np.full((4, 2), -3.0)
+		components = [lifetime_coordinates(tau, synthetic.freq) for tau in synthetic.lifetimes]
+		circles[0] = np.mean(components, axis=0)
+		circles[1] = components[-1]
+		data.update_circle(circles, [0.05, 0.05, 0.05, 0.05])
+		return data
+
+	def masks_setup():
+		data = prepared()
+		data.change_colormap(1)
+		return data,
+
+	stage('convolution', lambda data: data.convolution(filters), lambda: (fresh(),))
+	stage('apply_masks', lambda data: data.apply_masks(), masks_setup)
+
+	data = prepared()
+	mask = data.combined_mask()
+	for select, colormap_name in COLORMAPS:
+		stage('colormap_' + colormap_name, lambda select=select: data.colormap_frame(select, mask))
+
+	def plot_data(plot, g, s):
+		plot.plot_data(g, s)
+		plot.refresh()
+
+	stage('plot_data', plot_data, lambda: (PhasorPlot(HeadlessCanvas()),) + tuple(data.thresholded_coordinates()))
+
+	# Each cloud is a strip of the image, and the strips have different mixes of the lifetimes
+	strips = zip(np.array_split(data.x_adjusted, clouds, axis=1), np.array_split(data.y_adjusted, clouds, axis=1))
+	cloud_list = [(i, g.ravel(), s.ravel(), CLOUD_COLORS[i % len(CLOUD_COLORS)], 0.5)
+				  for i, (g, s) in enumerate(strips)]
+	stage('plot_all_clouds', lambda plot: plot.set_clouds(cloud_list), lambda: (MultiPhasorPlot(HeadlessCanvas()),))
+	return stages
+
+def run_suite(sizes=SIZES, bins=BINS, ptu_sizes=PTU_SIZES, repeats=3, filters=3, clouds=4, photons=500, seed=0,
+			  folder=None, progress=print):
+	"""Times every stage for every combination of sizes and bins. The data is written to folder, or to a temporary
+	folder, and removed once it has been timed. PTU files are timed for the sizes in ptu_sizes when ptufile is
+	installed. Returns the results along with what they were run on"""
+	results = {
+		'created': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+		'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+		'processor': platform.processor(), 'cpus': os.cpu_count(),
+		'settings': {'repeats': repeats, 'filters': filters, 'clouds': clouds, 'photons': photons, 'seed': seed},
+		'cases': []
+	}
+	with tempfile.TemporaryDirectory(dir=folder) as temp:
+		for size in sizes:
+			for case_bins in bins:
+				synthetic = SyntheticFLIM(size, case_bins, photons, seed=seed)
+				ptu = ptufile is not None and size in ptu_sizes
+				stages = run_case(synthetic, temp, repeats, filters, clouds, ptu, progress)
+				results['cases'].append({'size': size, 'bins': case_bins, 'stages': stages})
+	return results
+
+def git_commit():
+	"""Returns the commit of FLUTE that is run, or None when it isn't run from a git repository"""
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(config.PROJECT_ROOT),
+							  capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def save_results(results, file=None):
+	"""Writes results to file, by default a file in config.BENCHMARK_DIR named after the time and commit of the run.
+	Returns the name of the file"""
+	if file is None:
+		os.makedirs(config.BENCHMARK_DIR, exist_ok=True)
+		stamp = results['created'].replace(':', '-')
+		file = os.path.join(config.BENCHMARK_DIR, stamp + ('_' + results['commit'] if results['commit'] else '') +
+							'.json')
+	with open(file, 'w') as f:
+		json.dump(results, f, indent=1)
+	return file
+
+def load_results(file):
+	with open(file) as f:
+		return json.load(f)
+
+def compare(old, new):
+	"""Returns a (size, bins, stage, old seconds, new seconds, old peak bytes, new peak bytes) row for every stage that
+	both runs timed"""
+	old_cases = {(case['size'], case['bins']): case['stages'] for case in old['cases']}
+	rows = []
+	for case in new['cases']:
+		old_stages = old_cases.get((case['size'], case['bins']), {})
+		for stage_name, result in case['stages'].items():
+			if stage_name in old_stages:
+				before = old_stages[stage_name]
+				rows.append((case['size'], case['bins'], stage_name, before['seconds'], result['seconds'],
+							 before['peak_bytes'], result['peak_bytes']))
+	return rows
@@ -0,0 +1,113 @@
+# Generates FLIM data to benchmark FLUTE with. Every pixel decays as a mix of exponentials whose fractions change
+# across the image, and the photon counts of every time bin are drawn from a Poisson distribution. TIFF stacks are
+# written one time bin at a time, so they can be far larger than the memory of the computer, while PTU photon streams
+# are encoded from the histogram of the whole image
+
+# imports
+import numpy as np
+import tifffile
+
+try:
+	import ptufile
+except ImportError:
+	ptufile = None
+
+# Lifetimes in ns of the components of the decays, and the laser frequency in MHz that they repeat at
+LIFETIMES = (0.4, 2.5)
+FREQ = 80.0
+
+# Number of pixels of a block of the image that the counts are drawn for at once
+BLOCK_PIXELS = 2 ** 20
+
+class SyntheticFLIM:
+	"""Decays of a size x size image with bins time bins that cover one laser period. The first component of lifetimes
+	makes up a fraction of each pixel that goes from 0 on the left of the image to 1 on the right, the rest is shared
+	out evenly between the other components, and the brightness of the pixels follows a pattern of blobs with photons
+	photons at their brightest. The same seed always gives the same files"""
+
+	def __init__(self, size, bins, photons=500, lifetimes=LIFETIMES, freq=FREQ, seed=0):
+		self.size = int(size)
+		self.bins = int(bins)
+		self.photons = float(photons)
+		self.lifetimes = tuple(float(tau) for tau in lifetimes)
+		self.freq = float(freq)
+		self.seed = seed
+		self.bin_width = 1000 / self.freq / self.bins
+
+	def decays(self):
+		"""Returns the (components, bins) probability of a photon of each component landing in each bin, for decays
+		that have reached a steady state over many laser periods"""
+		period = 1000 / self.freq
+		edges = np.arange(self.bins + 1) * self.bin_width
+		tau = np.asarray(self.lifetimes)[:, np.newaxis]
+		return np.diff(-np.exp(-edges / tau), axis=1) / (1 - np.exp(-period / tau))
+
+	def pixel_fractions(self, rows):
+		"""Returns the (components, rows, size) fraction of each component in rows of the image"""
+		first = np.broadcast_to(np.linspace(0, 1, self.size), (len(rows), self.size))
+		others = (1 - first) / max(1, len(self.lifetimes) - 1)
+		return np.stack([first] + [others] * (len(self.lifetimes) - 1))
+
+	def brightness(self, rows):
+		"""Returns the (rows, size) expected number of photons of rows of the image"""
+		y = np.asarray(rows, dtype=np.float64)[:, np.newaxis] * (2 * np.pi * 6 / self.size)
+		x = np.arange(self.size) * (2 * np.pi * 6 / self.size)
+		return self.photons * (0.15 + 0.85 * (np.sin(x) * np.sin(y)) ** 2)
+
+	def row_blocks(self):
+		"""Yields the rows of the image in blocks of about BLOCK_PIXELS pixels"""
+		lines = max(1, BLOCK_PIXELS // self.size)
+		for start in range(0, self.size, lines):
+			yield np.arange(start, min(start + lines, self.size))
+
+	def expected(self, rows):
+		"""Returns the (rows, size, bins) expected counts of rows of the image"""
+		mix = np.einsum('kyx,kb->yxb', self.pixel_fractions(rows), self.decays())
+		return self.brightness(rows)[..., np.newaxis] * mix
+
+	def counts(self, rows, rng, dtype=np.uint16):
+		"""Draws the (rows, size, bins) photon counts of rows of the image"""
+		return np.minimum(rng.poisson(self.expected(rows)), np.iinfo(dtype).max).astype(dtype)
+
+	def stack(self):
+		"""Returns the whole (bins, Y, X) stack in memory, which is only sensible for small images"""
+		rng = np.random.default_rng(self.seed)
+		return np.concatenate([self.counts(rows, rng) for rows in self.row_blocks()]).transpose(2, 0, 1)
+
+	def write_tiff(self, file):
+		"""Writes the (bins, Y, X) stack to file as 16 bit counts, with a page for each time bin. The counts of each
+		bin are drawn for the whole image before it is written, from its expected counts, so only one bin is held in
+		memory"""
+		rng = np.random.default_rng(self.seed)
+		decays = self.decays()
+		# Expected photons of every component in every pixel, which each bin takes its share of
+		blocks = [(rows, self.pixel_fractions(rows) * self.brightness(rows)) for rows in self.row_blocks()]
+
+		def pages():
+			for b in range(self.bins):
+				page = np.empty((self.size, self.size), dtype=np.uint16)
+				for rows, photons in blocks:
+					counts = rng.poisson(np.tensordot(decays[:, b], photons, axes=1))
+					page[rows[0]:rows[-1] + 1] = np.minimum(counts, np.iinfo(np.uint16).max)
+				yield page
+
+		tifffile.imwrite(file, pages(), shape=(self.bins, self.size, self.size), dtype=np.uint16)
+		return file
+
+	def write_ptu(self, file):
+		"""Writes the counts to file as a T3 PTU photon stream with one frame and one channel, encoded from the
+		histogram of the frame. ptufile writes a whole frame at once, so the (Y, X, bins) histogram of the image is held
+		in memory as 8 bit counts, or 16 bit counts when more than 255 photons can land in one bin"""
+		if ptufile is None:
+			raise ImportError("Writing PTU files needs ptufile")
+		rng = np.random.default_rng(self.seed)
+		peak = self.photons * self.decays().max()
+		dtype = np.uint8 if peak + 6 * np.sqrt(peak) < np.iinfo(np.uint8).max else np.uint16
+		histogram = np.empty((1, self.size, self.size, 1, self.bins), dtype=dtype)
+		for rows in self.row_blocks():
+			histogram[0, rows[0]:rows[-1] + 1, :, 0] = self.counts(rows, rng, dtype)
+		global_resolution = 1e-6 / self.freq
+		# Each photon of a pixel takes up one laser period of its pixel time
+		pixel_time = global_resolution * (int(histogram.sum(axis=-1).max()) + 16)
+		ptufile.imwrite(file, histogram, global_resolution, self.bin_width * 1e-9, pixel_time)
+		return file
@@ -1,4 +1,59 @@
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent
-UI_DIR = PROJECT_ROOT / "ui files"
\ No newline at end of file
+UI_DIR = PROJECT_ROOT / "ui files"
+
+# Largest part of a FLIM stack, in bytes, that is held in memory at once when calculating the phasor coordinates
+TILE_MEMORY = 256 * 2 ** 20
+
+# Number of TTTR records of a PTU file that are decoded at once when the phasor is calculated from the photon stream
+PTU_CHUNK_RECORDS = 2 ** 20
+
+# Largest part of the (Y, X, channels, bins) histogram of a PTU file, in bytes, that ptufile decodes at once. The
+# histogram is decoded a block of lines at a time into 32 bit counts, which is how bidirectional and other scans that
+# FLUTE doesn't decode itself are read
+PTU_DECODE_MEMORY = 256 * 2 ** 20
+
+# Harmonics that are calculated when an image is opened, so that the plot can be switched between them without loading
+# the image again. The harmonic set on the front panel is always calculated as well
+HARMONICS = (1, 2, 3)
+
+# Folder where the phasor sums of opened images can be kept, so that opening the same file again with the same settings
+# doesn't read it again. The cache is off unless CACHE_MAX_BYTES is set to the most space it may take up, for example
+# 2 * 2 ** 30, and the least recently used entries are then removed once the folder is larger than that
+CACHE_DIR = Path.home() / ".flute" / "phasor_cache"
+CACHE_MAX_BYTES = 0
+
+# Number of bins along g and along s that the cursors and the angle, modulation and distance ranges are worked out on,
+# instead of on every pixel, which makes them faster to move on large images. Pixels can then end up on the wrong side
+# of a boundary by up to half a bin. 0 works them out on every pixel, and 256 is a good value for images of several
+# megapixels
+PHASOR_BINS = 0
+
+# Size in bytes of the block of rows that the 3x3 median filter works on at once. Small blocks stay in the processor's
+# cache, which makes the filter faster
+MEDIAN_BLOCK_BYTES = 2 ** 17
+
+# Largest amount of memory, in bytes, that is kept for the g and s maps after each number of median filter passes, so
+# that changing the number of filters only has to filter the maps once at most
+FILTER_CACHE_MEMORY = 512 * 2 ** 20
+
+# Number of bins along g of the density images that the multi-phasor view draws the clouds with. The bins along s are
+# the same size
+MULTI_PHASOR_BINS = 400
+
+# Single file that saving writes the intensity, g, s, lifetime maps, mask and parameters of each image to, instead of a
+# TIFF for each map and a text file: 'ome-tiff', 'hdf5' (which needs h5py), or None for the separate files. This is the
+# default of the save window and of bulk open
+EXPORT_CONTAINER = None
+
+# Side of the square tiles, in pixels, that the maps are stored and compressed in inside the single file, so that other
+# programs can read part of an image without reading all of it. Must be a multiple of 16
+EXPORT_TILE = 256
+
+# Number of frames of a time-lapse or z-stack whose masks, filtered maps and colormaps are kept while moving between
+# frames, so that going back to one of them doesn't calculate it again
+FRAME_CACHE = 8
+
+# Folder where the benchmarks save the results of each run, so that the runs of different versions can be compared
+BENCHMARK_DIR = Path.home() / ".flute" / "benchmarks"
@@ -83,7 +83,7 @@ class MultiPhasorSelector(QtWidgets.QMainWindow):
 			combo.setStyleSheet(f"QComboBox {{ background-color: {color_name}; color: {text_color}; }}")
 			
 			# Connect signal to update appearance when selection changes
-			combo.currentIndexChanged.connect(self.create_color_change_handler(combo))
+			combo.currentIndexChanged.connect(self.create_color_change_handler(combo, row))
 			
 			self.tableWidget.setCellWidget(row, 2, combo)
 			
@@ -105,6 +105,7 @@ class MultiPhasorSelector(QtWidgets.QMainWindow):
 				return lambda val: label.setText(f"{val}%")
 			
 			slider.valueChanged.connect(make_update_func(value_label))
+			slider.valueChanged.connect(lambda val, row=row: self.update_cloud_style(row))
 			
 			slider_layout.addWidget(slider)
 			slider_layout.addWidget(value_label)
@@ -113,14 +114,28 @@ class MultiPhasorSelector(QtWidgets.QMainWindow):
 			
 			self.tableWidget.setCellWidget(row, 3, slider_widget)
 	
-	def create_color_change_handler(self, combo):
+	def create_color_change_handler(self, combo, row):
 		"""Creates a handler for color changes in the combo box"""
 		def handler(index):
 			color_name = self.available_colors[index]
 			# Update the combo box background to match the selected color
 			text_color = 'black' if color_name in ['yellow', 'cyan', 'lime', 'pink', 'coral', 'turquoise'] else 'white'
 			combo.setStyleSheet(f"QComboBox {{ background-color: {color_name}; color: {text_color}; }}")
+			self.update_cloud_style(row)
 		return handler
+
+	def update_cloud_style(self, row):
+		"""Restyles the cloud of the image in row on the multi-phasor window when its color or transparency is changed,
+		if the cloud is shown"""
+		if not self.multi_phasor_window or self.multi_phasor_window.dead or row >= len(self.image_arr):
+			return
+		cloud_id = self.image_arr[row].name
+		if cloud_id not in self.multi_phasor_window.phasor_clouds:
+			return
+		combo = self.tableWidget.cellWidget(row, 2)
+		slider = self.tableWidget.cellWidget(row, 3).findChild(QtWidgets.QSlider)
+		self.multi_phasor_window.set_cloud_style(cloud_id, self.available_colors[combo.currentIndex()],
+												 slider.value() / 100.0)
 	
 	def select_all(self):
 		"""Selects all images in the table"""
@@ -180,36 +195,22 @@ class MultiPhasorSelector(QtWidgets.QMainWindow):
 		if not self.multi_phasor_window or self.multi_phasor_window.dead:
 			self.multi_phasor_window = MultiPhasorGraph("Multi-Phasor View")
 		
-		# Clear existing clouds
-		for cloud_id in list(self.multi_phasor_window.phasor_clouds.keys()):
-			self.multi_phasor_window.remove_phasor_cloud(cloud_id)
-		
-		# Add selected clouds with chosen colors and transparency
+		# Replace the clouds with the selected ones, with chosen colors and transparency, which draws them once
+		clouds = []
 		for idx, image_idx in enumerate(self.selected_images):
 			image = self.image_arr[image_idx]
 			cloud_id = image.name
 			
-			# Get filtered g and s coordinates from the image
-			# Create masks based on the thresholds applied in the individual image
-			intensity_mask = image.intensity_mask
-			plot_angle_mask = image.plot_angle_mask
-			plot_circle_mask = image.plot_circle_mask
-			plot_fraction_mask = image.plot_fraction_mask
-			
-			# Combine all masks
-			combined_mask = intensity_mask | plot_angle_mask | plot_circle_mask | plot_fraction_mask
-			combined_mask = combined_mask | (image.x_adjusted < 0)
-			
-			# Apply mask to get only visible points
-			x_filtered = image.x_adjusted[~combined_mask].flatten()
-			y_filtered = image.y_adjusted[~combined_mask].flatten()
+			# Get the filtered g and s coordinates of the points that pass the thresholds applied in the individual image
+			x_filtered, y_filtered = image.data.visible_coordinates()
 			
 			# Get selected color and transparency
 			color = self.image_colors[image_idx]
 			alpha = self.image_transparency[image_idx]
 			
 			# Add to multi-phasor view - pass color name directly
-			self.multi_phasor_window.add_phasor_cloud(cloud_id, x_filtered, y_filtered, color, alpha)
+			clouds.append((cloud_id, x_filtered, y_filtered, color, alpha))
+		self.multi_phasor_window.set_clouds(clouds)
 		
 		# Show the window
 		self.multi_phasor_window.show()
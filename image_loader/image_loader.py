@@ -5,7 +5,14 @@ import ptufile
 # DEBUG
 import tifffile as t3f
 
+import config
+from .streaming import phasor_sums, phasor_sums_from_slabs, bin_slabs, phasor_totals, phasor_totals_from_slabs
+
 class ImageLoader(ABC):
+	# Whether the frames of a file are repeated scans of the same field, which are added up into one image unless they
+	# are asked for separately, rather than the frames of a time-lapse or z-stack
+	accumulated_frames = False
+	
 	def __init__(self):
 		pass
 	
@@ -19,6 +26,90 @@ class ImageLoader(ABC):
 		"""
 		pass
 	
+	def load_image_sums(self, filename, channel, weights, progress=None):
+		""" Multiplies the decay of every pixel by the phasor weights, without keeping more than a tile of the image
+		in memory when the loader allows it.
+		
+		:param filename: Name of the image file.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the image that has been read so far.
+		...
+		:return: numpy ndarray of shape (N, Y, X)
+		"""
+		return phasor_sums(self.load_image(filename, channel), weights, progress=progress)
+	
+	def load_image_totals(self, filename, channel, weights, progress=None):
+		""" Adds up the phasor sums of all the pixels of the image, without making the sums of each pixel.
+		
+		:param filename: Name of the image file.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the image that has been read so far.
+		...
+		:return: numpy ndarray of shape (N,)
+		"""
+		return phasor_totals(self.load_image(filename, channel), weights, progress=progress)
+	
+	def channel_count(self, filename):
+		""" Returns the number of detector channels of the image.
+		
+		:param filename: Name of the image file.
+		:return: int
+		"""
+		return 1
+	
+	def load_channel_sums(self, filename, channels, weights, progress=None):
+		""" Calculates the phasor sums of several detector channels of the image. Loaders that can read all the
+		channels at once read the file once for all of them.
+		
+		:param filename: Name of the image file.
+		:param channels: Indices of the channels.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the image that has been read so far.
+		...
+		:return: list of numpy ndarrays of shape (N, Y, X), one for each channel
+		"""
+		return [self.load_image_sums(filename, channel, weights, _frame_progress(progress, i, len(channels)))
+				for i, channel in enumerate(channels)]
+	
+	def frame_count(self, filename):
+		""" Returns the number of frames or slices of a time-lapse or z-stack, or 1 for a single image.
+		
+		:param filename: Name of the image file.
+		:return: int
+		"""
+		im = self.load_image(filename)
+		return im.shape[0] if im.ndim == 4 else 1
+	
+	def load_frame_sums(self, filename, channel, weights, progress=None):
+		""" Calculates the phasor sums of each frame of a time-lapse or z-stack, one frame at a time, so that only the
+		sums of the frames are kept. A stack of frames is a (frames, bins, Y, X) array, and a (bins, Y, X) stack is a
+		single frame.
+		
+		:param filename: Name of the image file.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the frames that has been read so far.
+		...
+		:return: iterator of numpy ndarrays of shape (N, Y, X)
+		"""
+		im = self.load_image(filename, channel)
+		stacks = im if im.ndim == 4 else im[np.newaxis]
+		for frame, stack in enumerate(stacks):
+			yield phasor_sums(stack, weights, progress=_frame_progress(progress, frame, len(stacks)))
+	
+	def load_channel_frame_sums(self, filename, channels, weights, progress=None):
+		""" Calculates the phasor sums of each frame of several detector channels of a time-lapse or z-stack, one
+		frame at a time.
+		
+		:param filename: Name of the image file.
+		:param channels: Indices of the channels.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the frames that has been read so far.
+		...
+		:return: iterator of lists of numpy ndarrays of shape (N, Y, X), one list for each frame with an array for
+			each channel
+		"""
+		return map(list, zip(*(self.load_frame_sums(filename, channel, weights, progress) for channel in channels)))
+	
 	@staticmethod
 	def from_file(filename):
 		extension = filename.split('.')[-1]
@@ -40,13 +131,133 @@ class ImageLoader(ABC):
 		:return: numpy ndarray
 		"""
 		return ImageLoader.from_file(filename).load_image(filename, channel)
+	
+	@staticmethod
+	def load_sums(filename, channel, weights, progress=None):
+		""" Calculates the phasor sums of the image. Automatically determines the correct loader to use.
+		
+		:param filename: Name of the image file.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the image that has been read so far.
+		...
+		:return: numpy ndarray of shape (N, Y, X)
+		"""
+		return ImageLoader.from_file(filename).load_image_sums(filename, channel, weights, progress)
+	
+	@staticmethod
+	def load_totals(filename, channel, weights, progress=None):
+		""" Calculates the phasor sums of the whole image, added up over all its pixels. Automatically determines the
+		correct loader to use.
+		
+		:param filename: Name of the image file.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the image that has been read so far.
+		...
+		:return: numpy ndarray of shape (N,)
+		"""
+		return ImageLoader.from_file(filename).load_image_totals(filename, channel, weights, progress)
+	
+	@staticmethod
+	def load_frames(filename, channel, weights, progress=None):
+		""" Calculates the phasor sums of each frame of a time-lapse or z-stack. Automatically determines the correct
+		loader to use.
+		
+		:param filename: Name of the image file.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the frames that has been read so far.
+		...
+		:return: number of frames, and an iterator of numpy ndarrays of shape (N, Y, X)
+		"""
+		loader = ImageLoader.from_file(filename)
+		return loader.frame_count(filename), loader.load_frame_sums(filename, channel, weights, progress)
+	
+	@staticmethod
+	def has_frames(filename, separate_frames=False):
+		""" Returns whether the image is loaded as a series of frames: a time-lapse or z-stack, or the repeated scans
+		of a PTU file when separate_frames is set. Automatically determines the correct loader to use.
+		
+		:param filename: Name of the image file.
+		:param separate_frames: Whether the scans that are otherwise added up into one image are loaded separately.
+		:return: bool
+		"""
+		loader = ImageLoader.from_file(filename)
+		return loader.frame_count(filename) > 1 and (separate_frames or not loader.accumulated_frames)
 
 class TiffLoader(ImageLoader):
 	def load_image(self, filename, channel=0):
-		im = io.imread(filename)
+		# Uncompressed stacks are memory-mapped, so pages are only read from disk when they are used
+		im = self.memmap(filename)
+		if im is None:
+			im = io.imread(filename)
 		return im
+	
+	@staticmethod
+	def memmap(filename):
+		""" Memory-maps the image data of the file, which is only possible if it is stored uncompressed in one
+		contiguous block.
+		
+		:param filename: Name of the image file.
+		:return: read-only numpy memmap, or None if the file can't be memory-mapped
+		"""
+		try:
+			return t3f.memmap(filename, mode='r')
+		except ValueError:
+			return None
+	
+	def load_image_sums(self, filename, channel, weights, progress=None):
+		im = self.memmap(filename)
+		if im is not None and im.ndim == 3:
+			return phasor_sums_from_slabs(bin_slabs(im), weights(im.shape[0]), im.shape[1:], progress)
+		# Compressed or tiled files: each page of the stack holds one time bin, so the stack is decoded one page at a
+		# time
+		with t3f.TiffFile(filename) as tif:
+			series = tif.series[0]
+			if len(series.shape) != 3 or len(series.pages) != series.shape[0]:
+				return super().load_image_sums(filename, channel, weights, progress)
+			slabs = ((k, page.asarray()[np.newaxis]) for k, page in enumerate(series.pages))
+			return phasor_sums_from_slabs(slabs, weights(series.shape[0]), series.shape[1:], progress)
+	
+	def load_image_totals(self, filename, channel, weights, progress=None):
+		im = self.memmap(filename)
+		if im is not None and im.ndim == 3:
+			return phasor_totals_from_slabs(bin_slabs(im), weights(im.shape[0]), progress)
+		with t3f.TiffFile(filename) as tif:
+			series = tif.series[0]
+			if len(series.shape) != 3 or len(series.pages) != series.shape[0]:
+				return super().load_image_totals(filename, channel, weights, progress)
+			slabs = ((k, page.asarray()[np.newaxis]) for k, page in enumerate(series.pages))
+			return phasor_totals_from_slabs(slabs, weights(series.shape[0]), progress)
+	
+	def frame_count(self, filename):
+		with t3f.TiffFile(filename) as tif:
+			shape = tif.series[0].shape
+		return shape[0] if len(shape) == 4 else 1
+	
+	def load_frame_sums(self, filename, channel, weights, progress=None):
+		im = self.memmap(filename)
+		if im is not None and im.ndim in (3, 4):
+			stacks = im if im.ndim == 4 else im[np.newaxis]
+			for frame, stack in enumerate(stacks):
+				yield phasor_sums_from_slabs(bin_slabs(stack), weights(stack.shape[0]), stack.shape[1:],
+											 _frame_progress(progress, frame, len(stacks)))
+			return
+		# Compressed or tiled files: the pages of each frame follow each other, one page per time bin
+		with t3f.TiffFile(filename) as tif:
+			series = tif.series[0]
+			shape = series.shape if len(series.shape) == 4 else (1,) + tuple(series.shape)
+			if len(shape) != 4 or len(series.pages) != shape[0] * shape[1]:
+				yield from super().load_frame_sums(filename, channel, weights, progress)
+				return
+			bins = shape[1]
+			for frame in range(shape[0]):
+				pages = series.pages[frame * bins:(frame + 1) * bins]
+				slabs = ((k, page.asarray()[np.newaxis]) for k, page in enumerate(pages))
+				yield phasor_sums_from_slabs(slabs, weights(bins), shape[2:],
+											 _frame_progress(progress, frame, shape[0]))
 
 class PtuLoader(ImageLoader):
+	accumulated_frames = True
+	
 	def load_image(self, filename, channel=0):
 		ptu = ptufile.PtuFile(filename)
 		# TODO: Better error logging
@@ -55,6 +266,313 @@ class PtuLoader(ImageLoader):
 			return None
 		print(ptu.dims, ptu.shape)
 		print("T coords: ", ptu.coords["T"])
-		data = ptu.decode_image(None, dtype=np.uint8, frame=-1, channel=channel, keepdims=False)
-		data = np.moveaxis(data, 2, 0)
+		# The histogram is decoded a block of lines at a time, into counts that don't wrap around for bright pixels
+		data = np.empty((ptu.shape[4], ptu.shape[1], ptu.shape[2]), dtype=np.uint32)
+		for y, block in self.histogram_blocks(ptu):
+			data[:, y:y + block.shape[0]] = np.moveaxis(block[:, :, channel], 2, 0)
 		return data
+	
+	def load_image_sums(self, filename, channel, weights, progress=None):
+		with ptufile.PtuFile(filename) as ptu:
+			self.check_channels(ptu, [channel])
+			# The photon stream is only decoded here for plain unidirectional scans, anything else is decoded by ptufile
+			if not self.plain_scan(ptu):
+				return self.histogram_sums(ptu, [channel], weights, progress=progress)[0]
+			return self.photon_sums(ptu, channel, weights, progress=progress)
+	
+	def load_image_totals(self, filename, channel, weights, progress=None):
+		with ptufile.PtuFile(filename) as ptu:
+			self.check_channels(ptu, [channel])
+			bins = ptu.shape[4]
+			decay = np.zeros(bins, dtype=np.float64)
+			if not self.plain_scan(ptu):
+				for y, block in self.histogram_blocks(ptu):
+					decay += block[:, :, channel].sum(axis=(0, 1))
+					if progress is not None:
+						progress((y + block.shape[0]) / ptu.shape[1])
+			else:
+				# Only the arrival times of the photons are needed, not the pixels they land in
+				for _, _, _, dtime, _ in self.photon_events(ptu, [channel], progress=progress):
+					decay += np.bincount(dtime, minlength=bins)
+			return weights(bins).T @ decay
+	
+	def channel_count(self, filename):
+		with ptufile.PtuFile(filename) as ptu:
+			return ptu.shape[3]
+	
+	def load_channel_sums(self, filename, channels, weights, progress=None):
+		with ptufile.PtuFile(filename) as ptu:
+			self.check_channels(ptu, channels)
+			if not self.plain_scan(ptu):
+				return self.histogram_sums(ptu, channels, weights, progress=progress)
+			return self.photon_channel_sums(ptu, channels, weights, progress=progress)
+	
+	def frame_count(self, filename):
+		with ptufile.PtuFile(filename) as ptu:
+			return ptu.shape[0] if ptu.is_image else 1
+	
+	def load_frame_sums(self, filename, channel, weights, progress=None):
+		for sums in self.load_channel_frame_sums(filename, [channel], weights, progress):
+			yield sums[0]
+	
+	def load_channel_frame_sums(self, filename, channels, weights, progress=None):
+		with ptufile.PtuFile(filename) as ptu:
+			self.check_channels(ptu, channels)
+			if not self.plain_scan(ptu):
+				if not ptu.is_image:
+					yield self.histogram_sums(ptu, channels, weights, progress=progress)
+					return
+				yield from self.histogram_frame_sums(ptu, channels, weights, progress=progress)
+				return
+			yield from self.photon_frame_sums(ptu, channels, weights, progress=progress)
+	
+	@staticmethod
+	def plain_scan(ptu):
+		"""Returns whether the file is a plain unidirectional image scan, whose photon stream is decoded by
+		photon_events instead of by ptufile"""
+		return ptu.is_image and not ptu.is_bidirectional and not ptu.is_sinusoidal and ptu.measurement_ndim == 3
+	
+	@staticmethod
+	def histogram_blocks(ptu, frame=-1, max_bytes=config.PTU_DECODE_MEMORY):
+		""" Decodes the histogram of the file with ptufile a block of lines at a time, so that no more than max_bytes
+		of it are held at once. Each block is decoded from the whole photon stream, which is memory-mapped once.
+		
+		:param ptu: Open ptufile.PtuFile.
+		:param frame: Frame to decode, -1 to add up all the frames, or None to keep every frame.
+		:param max_bytes: Largest size of a block.
+		:return: iterator of (first line, block) pairs, where block is a (lines, X, channels, bins) uint32 array, or a
+			(frames, lines, X, channels, bins) array when frame is None
+		"""
+		frames, height, width, channels, bins = ptu.shape[:5]
+		line_bytes = width * channels * bins * 4 * (frames if frame is None else 1)
+		rows = int(max(1, min(height, max_bytes // max(1, line_bytes))))
+		records = ptu.read_records(memmap=True)
+		for y in range(0, height, rows):
+			# ptufile doesn't allow the lines of the last block to run past the end of the image
+			lines = slice(y, min(height, y + rows))
+			block = ptu.decode_image((slice(None), lines), records=records, dtype=np.uint32, frame=frame, channel=None,
+									 keepdims=True)
+			yield y, block if frame is None else block[0]
+	
+	@staticmethod
+	def histogram_sums(ptu, channels, weights, frame=-1, progress=None):
+		""" Calculates the phasor sums of several channels from the histogram that ptufile decodes, a block of lines
+		at a time.
+		
+		:param ptu: Open ptufile.PtuFile.
+		:param channels: Indices of the channels.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param frame: Frame to decode, or -1 to add up all the frames.
+		:param progress: Function that is called with the fraction of the lines that has been decoded so far.
+		:return: list of numpy ndarrays of shape (N, Y, X), one for each channel
+		"""
+		height, width, bins = ptu.shape[1], ptu.shape[2], ptu.shape[4]
+		weights = weights(bins)
+		sums = np.empty((len(channels), weights.shape[1], height, width), dtype=np.float64)
+		for y, block in PtuLoader.histogram_blocks(ptu, frame):
+			for i, channel in enumerate(channels):
+				sums[i, :, y:y + block.shape[0]] = phasor_sums(np.moveaxis(block[:, :, channel], 2, 0), weights)
+			if progress is not None:
+				progress((y + block.shape[0]) / height)
+		return list(sums)
+	
+	@staticmethod
+	def histogram_frame_sums(ptu, channels, weights, progress=None):
+		""" Like histogram_sums, but keeps the sums of each frame apart. The photon stream is decoded once for all the
+		frames of each block of lines, instead of once for every frame.
+		
+		:param ptu: Open ptufile.PtuFile of an image.
+		:param channels: Indices of the channels.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param progress: Function that is called with the fraction of the lines that has been decoded so far.
+		:return: list of lists of numpy ndarrays of shape (N, Y, X), one list for each frame with an array for each
+			channel
+		"""
+		frames, height, width, bins = ptu.shape[0], ptu.shape[1], ptu.shape[2], ptu.shape[4]
+		weights = weights(bins)
+		sums = np.empty((frames, len(channels), weights.shape[1], height, width), dtype=np.float64)
+		for y, block in PtuLoader.histogram_blocks(ptu, frame=None):
+			for frame in range(frames):
+				for i, channel in enumerate(channels):
+					stack = np.moveaxis(block[frame, :, :, channel], 2, 0)
+					sums[frame, i, :, y:y + block.shape[1]] = phasor_sums(stack, weights)
+			if progress is not None:
+				progress((y + block.shape[1]) / height)
+		return [list(frame_sums) for frame_sums in sums]
+	
+	@staticmethod
+	def skips_first_frame(ptu):
+		"""Returns whether ptufile leaves out the first frame of the scan, because the scan started part way through it.
+		ptufile only tells this through the information it decodes from the records, which isn't part of its public
+		API, so every frame is kept when that information isn't there"""
+		info = getattr(ptu, '_info', None)
+		return bool(getattr(info, 'skip_first_frame', False))
+	
+	@staticmethod
+	def check_channels(ptu, channels):
+		"""Raises a ValueError if one of channels isn't in the file"""
+		for channel in channels:
+			if channel >= ptu.shape[3]:
+				raise ValueError("FLIM data does not have channel %d! (Channel index is 0-based)" % channel)
+	
+	@staticmethod
+	def photon_sums(ptu, channel, weights, chunk=config.PTU_CHUNK_RECORDS, progress=None):
+		""" Multiplies the arrival time of every photon by the phasor weights and adds it to the sums of its pixel,
+		reading the TTTR records of the file a chunk at a time, so that the (Y, X, bins) histogram is never made.
+		
+		:param ptu: Open ptufile.PtuFile of a unidirectional image scan.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param chunk: Number of records that are decoded at once.
+		:param progress: Function that is called with the fraction of the records that has been decoded so far.
+		:return: numpy ndarray of shape (N, Y, X)
+		"""
+		return PtuLoader.photon_channel_sums(ptu, [channel], weights, chunk, progress)[0]
+	
+	@staticmethod
+	def photon_channel_sums(ptu, channels, weights, chunk=config.PTU_CHUNK_RECORDS, progress=None):
+		""" Like photon_sums, but for several detector channels at once, so that the photon stream is decoded once
+		for all of them. The sums of every channel are added up with one bincount, as if the channels were images
+		side by side.
+		
+		:param ptu: Open ptufile.PtuFile of a unidirectional image scan.
+		:param channels: Indices of the channels.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param chunk: Number of records that are decoded at once.
+		:param progress: Function that is called with the fraction of the records that has been decoded so far.
+		:return: list of numpy ndarrays of shape (N, Y, X), one for each channel
+		"""
+		height, width, bins = ptu.shape[1], ptu.shape[2], ptu.shape[4]
+		weights = weights(bins)
+		size = height * width
+		sums = np.zeros((weights.shape[1], len(channels) * size), dtype=np.float64)
+		for channel, _, pixels, dtime, _ in PtuLoader.photon_events(ptu, channels, chunk, progress):
+			index = channel * size + pixels
+			for k in range(weights.shape[1]):
+				sums[k] += np.bincount(index, weights=weights[dtime, k], minlength=len(channels) * size)
+		return [sums[:, c * size:(c + 1) * size].reshape(-1, height, width) for c in range(len(channels))]
+	
+	@staticmethod
+	def photon_frame_sums(ptu, channels, weights, chunk=config.PTU_CHUNK_RECORDS, progress=None):
+		""" Like photon_channel_sums, but keeps the sums of each frame of the scan apart. The sums of a frame are
+		yielded as soon as the scan has moved past it, so only the frames of the chunk being decoded are held in
+		memory. Photons after the last whole frame are left out, as they are by ptufile.
+		
+		:param ptu: Open ptufile.PtuFile of a unidirectional image scan.
+		:param channels: Indices of the channels.
+		:param weights: Function that returns the (bins, N) weight matrix for a number of time bins.
+		:param chunk: Number of records that are decoded at once.
+		:param progress: Function that is called with the fraction of the records that has been decoded so far.
+		:return: iterator of lists of numpy ndarrays of shape (N, Y, X), one list for each frame with an array for
+			each channel
+		"""
+		frames, height, width, bins = ptu.shape[0], ptu.shape[1], ptu.shape[2], ptu.shape[4]
+		weights = weights(bins)
+		size = height * width
+		sums = {}
+		done = 0  # Frames that have been yielded
+		for channel, frame, pixels, dtime, scan_frame in PtuLoader.photon_events(ptu, channels, chunk, progress):
+			index = channel * size + pixels
+			for f in np.unique(frame[frame < frames]):
+				selected = frame == f
+				frame_sums = sums.setdefault(f, np.zeros((weights.shape[1], len(channels) * size), dtype=np.float64))
+				for k in range(weights.shape[1]):
+					frame_sums[k] += np.bincount(index[selected], weights=weights[dtime[selected], k],
+												 minlength=len(channels) * size)
+			while done < min(scan_frame, frames):
+				yield PtuLoader._frame_sums(sums.pop(done, None), weights, len(channels), height, width)
+				done += 1
+		while done < frames:
+			yield PtuLoader._frame_sums(sums.pop(done, None), weights, len(channels), height, width)
+			done += 1
+	
+	@staticmethod
+	def _frame_sums(sums, weights, channels, height, width):
+		"""Splits the sums of a frame into a (N, Y, X) array for each channel, which are zeros if the frame had no
+		photons"""
+		size = height * width
+		if sums is None:
+			sums = np.zeros((weights.shape[1], channels * size), dtype=np.float64)
+		return [sums[:, c * size:(c + 1) * size].reshape(-1, height, width) for c in range(channels)]
+	
+	@staticmethod
+	def photon_events(ptu, channels, chunk=config.PTU_CHUNK_RECORDS, progress=None):
+		""" Decodes the TTTR records of the file a chunk at a time, and yields the photons of the channels that land
+		in the image.
+		
+		:param ptu: Open ptufile.PtuFile of a unidirectional image scan.
+		:param channels: Indices of the channels.
+		:param chunk: Number of records that are decoded at once.
+		:param progress: Function that is called with the fraction of the records that has been decoded so far.
+		:return: iterator of (channel, frame, pixel, arrival time bin, scan frame) for each chunk, where the first four
+			are arrays with an element for each photon, channel being the position of its channel in channels, and
+			scan frame is the frame the scan is on at the end of the chunk
+		"""
+		height, width, bins = ptu.shape[1], ptu.shape[2], ptu.shape[4]
+		selected = [int(ptu.coords["C"][channel]) for channel in channels]
+		pixel_time = np.uint64(ptu.global_pixel_time)
+		skip = 1 if PtuLoader.skips_first_frame(ptu) else 0
+		records = ptu.read_records(memmap=True)
+		line = 0  # Line of the frame that the previous chunk ended on
+		frames = 0  # Frames finished before the chunk
+		first, size = 0, chunk
+		while first < len(records):
+			last = min(len(records), first + size)
+			data = ptu.decode_records(records[first:last])
+			markers = np.flatnonzero(data["marker"])
+			marker = data["marker"][markers]
+			start = (marker & ptu.line_start_mask) != 0
+			if last < len(records):
+				# Times are only consistent within a decoded chunk, so the chunk is cut before its last line start,
+				# which is where the next chunk begins. The chunk is made bigger if it doesn't hold a whole line
+				cut = np.flatnonzero(start & (markers > 0))
+				if len(cut) == 0:
+					size = size * 2
+					continue
+				cut = cut[-1]
+				data, markers, marker, start = data[:markers[cut]], markers[:cut], marker[:cut], start[:cut]
+			
+			# State of the scan after each marker: the line it is on, whether it is inside that line and when the
+			# line started
+			stops = np.cumsum((marker & ptu.line_stop_mask) != 0)
+			frame = (marker & ptu.frame_change_mask) != 0
+			last_frame = _last_index(frame)
+			y = stops - np.where(last_frame >= 0, stops[np.maximum(last_frame, 0)], -line)
+			last_start = _last_index(start)
+			in_line = (last_start > _last_index((marker & ptu.line_stop_mask) != 0)) & (y < height)
+			frame_count = frames + np.cumsum(frame)
+			if skip:
+				in_line &= frame_count > 0
+			line_time = data["time"][markers[np.maximum(last_start, 0)]]
+			
+			# Photons of the channels, with the marker that comes before each of them
+			photons = np.flatnonzero(np.isin(data["channel"], selected))
+			before = np.searchsorted(markers, photons) - 1
+			keep = before >= 0
+			keep[keep] = in_line[before[keep]]
+			photons, before = photons[keep], before[keep]
+			x = ((data["time"][photons] - line_time[before]) // pixel_time).astype(np.int64)
+			dtime = data["dtime"][photons]
+			keep = (x < width) & (dtime >= 0) & (dtime < bins)
+			pixels = (y[before] * width + x)[keep]
+			photon_frame = (frame_count[before] - skip)[keep]
+			photon_channel = np.zeros(len(pixels), dtype=np.int64)
+			for c in range(1, len(selected)):
+				photon_channel[data["channel"][photons][keep] == selected[c]] = c
+			
+			if len(marker) > 0:
+				line, frames = int(y[-1]), int(frame_count[-1])
+			first, size = first + len(data), chunk
+			if progress is not None:
+				progress(first / len(records))
+			yield photon_channel, photon_frame, pixels, dtime[keep], frames - skip
+
+def _frame_progress(progress, frame, frames):
+	"""Returns a function that reports the progress within a frame, or a channel, as progress through all of them, or
+	None"""
+	if progress is None:
+		return None
+	return lambda fraction: progress((frame + fraction) / frames)
+
+def _last_index(flags):
+	"""Returns the index of the last True element of flags up to each position, or -1 if there is none yet"""
+	return np.maximum.accumulate(np.where(flags, np.arange(len(flags)), -1))
@@ -0,0 +1,74 @@
+# Streams (bins, Y, X) FLIM stacks through the phasor weights without needing the whole stack in memory at once. The
+# stack is read in tiles of rows, or passed in as slabs of time bins, and only the sums of each pixel are kept. These
+# kernels are shared by the loaders and by the phasor package, and only depend on numpy, so that the loaders don't
+# have to import the phasor package
+
+# imports
+import numpy as np
+
+import config
+
+def tile_rows(stack_shape, itemsize=8, max_bytes=config.TILE_MEMORY):
+	"""Returns how many rows of a (bins, Y, X) stack fit in max_bytes"""
+	bins, height, width = stack_shape
+	return int(max(1, min(height, max_bytes // max(1, bins * width * itemsize))))
+
+def phasor_sums(stack, weights, max_bytes=config.TILE_MEMORY, progress=None):
+	"""Multiplies the decay of every pixel of the (bins, Y, X) stack by the weights, reading a tile of rows at a time.
+	stack can be anything that can be sliced into numpy arrays, such as a memory-mapped file. progress is called with
+	the fraction of the rows done after each tile. Returns a (weights, Y, X) array"""
+	bins, height, width = stack.shape
+	weights = weights(bins) if callable(weights) else weights
+	sums = np.empty((weights.shape[1], height, width), dtype=np.float64)
+	rows = tile_rows(stack.shape, max_bytes=max_bytes)
+	for y in range(0, height, rows):
+		tile = np.asarray(stack[:, y:y + rows, :], dtype=np.float64)
+		sums[:, y:y + rows, :] = np.tensordot(weights, tile, axes=(0, 0))
+		if progress is not None:
+			progress(min(height, y + rows) / height)
+	return sums
+
+def phasor_sums_from_slabs(slabs, weights, shape, progress=None):
+	"""Accumulates the sums from slabs of time bins. slabs yields (first_bin, block) pairs, where block is a
+	(bins in slab, Y, X) part of the stack, and shape is (Y, X). weights is the weight matrix of the full stack.
+	progress is called with the fraction of the time bins done after each slab. Returns a (weights, Y, X) array"""
+	sums = np.zeros((weights.shape[1],) + tuple(shape), dtype=np.float64)
+	for first_bin, block in slabs:
+		block = np.asarray(block, dtype=np.float64)
+		sums += np.tensordot(weights[first_bin:first_bin + block.shape[0]], block, axes=(0, 0))
+		if progress is not None:
+			progress(min(1.0, (first_bin + block.shape[0]) / len(weights)))
+	return sums
+
+def bin_slabs(stack, max_bytes=config.TILE_MEMORY):
+	"""Splits a (bins, Y, X) stack into slabs of whole time bins that fit in max_bytes, for phasor_sums_from_slabs.
+	Reading whole bins is sequential for stacks stored one time bin after the other, like memory-mapped tiff files"""
+	bins, height, width = stack.shape
+	step = int(max(1, max_bytes // max(1, height * width * 8)))
+	for first_bin in range(0, bins, step):
+		yield first_bin, stack[first_bin:first_bin + step]
+
+def phasor_totals(stack, weights, max_bytes=config.TILE_MEMORY, progress=None):
+	"""Like phasor_sums, but adds up the sums of all the pixels, which is the phasor of the decay of the whole image.
+	The decays of the pixels of each tile are added up before they are multiplied by the weights, so no map of the
+	image is made. Returns a (weights,) array"""
+	bins, height, width = stack.shape
+	weights = weights(bins) if callable(weights) else weights
+	decay = np.zeros(bins, dtype=np.float64)
+	rows = tile_rows(stack.shape, max_bytes=max_bytes)
+	for y in range(0, height, rows):
+		decay += np.asarray(stack[:, y:y + rows, :], dtype=np.float64).sum(axis=(1, 2))
+		if progress is not None:
+			progress(min(height, y + rows) / height)
+	return weights.T @ decay
+
+def phasor_totals_from_slabs(slabs, weights, progress=None):
+	"""Like phasor_sums_from_slabs, but adds up the sums of all the pixels, a slab at a time. Returns a (weights,)
+	array"""
+	decay = np.zeros(len(weights), dtype=np.float64)
+	for first_bin, block in slabs:
+		block = np.asarray(block, dtype=np.float64)
+		decay[first_bin:first_bin + block.shape[0]] += block.sum(axis=(1, 2))
+		if progress is not None:
+			progress(min(1.0, (first_bin + block.shape[0]) / len(weights)))
+	return weights.T @ decay
@@ -8,13 +8,18 @@ from PyQt5 import QtWidgets
 from PyQt5 import QtGui
 
 from PyQt5 import uic, QtCore
-from PyQt5.QtCore import Qt, QPropertyAnimation, QRect, QEasingCurve, QTimer
+from PyQt5.QtCore import Qt, QPropertyAnimation, QRect, QEasingCurve
 from PyQt5.QtGui import QIcon, QIntValidator, QDoubleValidator, QFontMetrics, QColor
 from PyQt5.QtWidgets import QFileDialog
 import DataWindows
 import os
+import config
 
 from image_handler import ImageHandler
+from phasor import BatchProcessor, PhasorData, FrameSeries, Session, save_session
+from phasor.session import SESSION_EXTENSION
+from image_loader.image_loader import ImageLoader
+from phasor.container import available_formats
 from data_windows import MultiPhasorSelector
 import Calibration
 import pickle
@@ -24,6 +29,7 @@ import range_slider
 
 import ctypes
 import platform
+import multiprocessing
 
 def make_dpi_aware():
 	if int(platform.release()) >= 8:
@@ -31,6 +37,13 @@ def make_dpi_aware():
 
 dir_path = os.path.dirname(__file__)
 
+# Part of the load progress bar that each stage of loading a picture takes up, as (start, size, label)
+LOAD_STAGES = {
+	'read': (0, 80, "Reading"),
+	'transform': (80, 10, "Calculating the phasor of"),
+	'render': (90, 10, "Drawing"),
+}
+
 def resource_path(relative_path):
 	""" Get absolute path to resource, works for dev and for PyInstaller. Important to keep track of files when
 	compiling to a single file"""
@@ -42,6 +55,76 @@ def resource_path(relative_path):
 
 	return os.path.join(base_path, relative_path)
 
+class BatchThread(QtCore.QThread):
+	"""Runs a BatchProcessor outside of the GUI thread, and reports its progress back to the main window"""
+	progress = QtCore.pyqtSignal(int, int, float, str)
+
+	def __init__(self, processor):
+		super(BatchThread, self).__init__()
+		self.processor = processor
+
+	def run(self):
+		self.processor.run(self.progress.emit)
+
+class LoadCancelled(Exception):
+	"""Raised from the progress of a LoadThread to stop the load when the user cancels it"""
+
+class LoadThread(QtCore.QThread):
+	"""Calculates the phasor data of a file outside of the GUI thread, and reports the progress of each stage back to
+	the main window. The loaded PhasorData, or FrameSeries for a time-lapse or z-stack, is sent with loaded, and the
+	windows are then made in the GUI thread. With all_channels, every detector channel of the file is read in the same
+	pass and sent as a dataset of its own. The frames of a PTU file are added up into one image, unless separate_frames
+	is set"""
+	progress = QtCore.pyqtSignal(str, float)
+	loaded = QtCore.pyqtSignal(object)
+	failed = QtCore.pyqtSignal(str)
+
+	def __init__(self, filename, all_channels=False, separate_frames=False, **settings):
+		super(LoadThread, self).__init__()
+		self.filename = filename
+		self.all_channels = all_channels
+		self.separate_frames = separate_frames
+		self.settings = settings
+		self.cancelled = False
+
+	def cancel(self):
+		"""Stops the load at the next progress report"""
+		self.cancelled = True
+
+	def report(self, stage, fraction):
+		if self.cancelled:
+			raise LoadCancelled()
+		self.progress.emit(stage, fraction)
+
+	def run(self):
+		try:
+			datasets = self.load()
+			# The points of the phasor plot are worked out here, so that opening the windows only has to draw them
+			self.report('render', 0.0)
+			for data in datasets:
+				(data.frame(0) if isinstance(data, FrameSeries) else data).thresholded_coordinates()
+		except LoadCancelled:
+			return
+		except Exception as e:
+			self.failed.emit(str(e))
+			return
+		if not self.cancelled:
+			for data in datasets:
+				self.loaded.emit(data)
+
+	def load(self):
+		"""Returns the datasets of the file. Time-lapses and z-stacks, and the frames of a PTU file when
+		separate_frames is set, are loaded as a FrameSeries, and their first frame is shown first"""
+		frames = ImageLoader.has_frames(self.filename, self.separate_frames)
+		if self.all_channels:
+			settings = {name: value for name, value in self.settings.items() if name != 'channel'}
+			if frames:
+				return FrameSeries.from_file_channels(self.filename, progress=self.report, **settings)
+			return PhasorData.from_file_channels(self.filename, progress=self.report, **settings)
+		if frames:
+			return [FrameSeries.from_file(self.filename, progress=self.report, **self.settings)]
+		return [PhasorData.from_file(self.filename, progress=self.report, **self.settings)]
+
 class MainWindow(QtWidgets.QMainWindow):
 	"""Main function that runs the front panel, and coordinates the user interactions with the images that they mean
 	to be interacting with. All the buttons in the front panel are connected to their required functions here, and
@@ -58,6 +141,8 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.LoadFLIM.clicked.connect(self.open_flim_selection_window)
 		self.LoadCalibr.clicked.connect(self.open_calibration)
 		self.bulk_load.clicked.connect(self.bulk_open)
+		self.SaveSession.clicked.connect(self.save_session)
+		self.OpenSession.clicked.connect(self.open_session)
 
 		self.HomeFrameButton.clicked.connect(lambda: self.change_frame(self.MainFrame))
 		self.GraphButton.clicked.connect(lambda: self.change_frame(self.GraphFrame))
@@ -66,8 +151,10 @@ class MainWindow(QtWidgets.QMainWindow):
 		
 		self.Phi_cal_box.setValidator(QDoubleValidator())
 		self.Phi_cal_box.textEdited.connect(self.cal_update)
+		self.Phi_cal_box.editingFinished.connect(self.apply_calibration)
 		self.m_cal_box.setValidator(QDoubleValidator())
 		self.m_cal_box.textEdited.connect(self.cal_update)
+		self.m_cal_box.editingFinished.connect(self.apply_calibration)
 
 		self.tableWidget.setSelectionBehavior(QtWidgets.QTableView.SelectRows)
 		self.tableWidget.itemSelectionChanged.connect(self.setActive)
@@ -79,6 +166,7 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.circleSlider.sliderMoved.connect(self.update_circle_range)
 		self.fractionSlider.sliderMoved.connect(self.update_fraction_range)
 		self.clearCircles.clicked.connect(self.clear_circles)
+		self.circleSelect.currentIndexChanged.connect(self.set_circle)
 		self.SaveData.clicked.connect(self.save_data_popup)
 
 		self.IntensityMin.returnPressed.connect(self.update_threshold)
@@ -124,7 +212,8 @@ class MainWindow(QtWidgets.QMainWindow):
 				'FLIM Load': '', "Cal Load": '', "Bin Width": 0.227, "Freq": 80.0, "Tau Ref": 4.0,
 				"Harmonic": 1.0, "Phi Cal": 0.0, "M Cal": 1.0,"Fraction": 0.4, "save_Dir": '', "FractionX": 1.0, "FractionY":0.0,
 				"framex": 611, "framey": 510, "table0Width": 290, "table1Width": 50, "table2Width": 143,
-				"calibration_file": "", "calibration_channel": 0, "flim_file":"", "flim_channel": 0
+				"calibration_file": "", "calibration_channel": 0, "flim_file":"", "flim_channel": 0,
+				"Batch Workers": os.cpu_count()
 			}
 			with open('saved_dict.pkl', 'wb') as f:
 				pickle.dump(self.load_dict, f)
@@ -133,36 +222,41 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.tableWidget.setColumnWidth(0, self.load_dict['table0Width'])
 		self.tableWidget.setColumnWidth(1, self.load_dict['table1Width'])
 		self.tableWidget.setColumnWidth(2, self.load_dict['table2Width'])
+		self.tableWidget.horizontalHeader().sectionResized.connect(self.save_column_width)
 		self.window_num = 1
 		self.fraction_x = 0; self.fraction_y = 0
 		self.fraction_setting = 'coordinates'
 		self.Phi_cal_box.setText("{:.4f}".format(self.load_dict['Phi Cal']))
 		self.m_cal_box.setText("{:.4f}".format(self.load_dict['M Cal']))
 
-		# Runs self.update on a timer, which checks if windows have been closed and closes their partner plots/windows
-		timer = QTimer(self)
-		timer.timeout.connect(self.update)
-		timer.start(10)
-
-		# Keeps track of all the images that are opened
+		# Keeps track of all the images that are opened, and of the progress windows of the ones that are loading
 		self.image_arr = []
-
-	def update(self):
-		"""Sets the colour of the circle for when the user clicks, and kills the parter windows/plots if the user
-		closes a data window"""
-		self.load_dict['table0Width'] = self.tableWidget.columnWidth(0)
-		self.load_dict['table1Width'] = self.tableWidget.columnWidth(1)
-		self.load_dict['table2Width'] = self.tableWidget.columnWidth(2)
-		for idx, image in enumerate(self.image_arr):
-			image.set_circle(self.circleSelect.currentIndex())
-			if image.dead():
-				del self.image_arr[idx]
-				self.tableWidget.removeRow(idx)
+		self.loads = {}
+
+	def save_column_width(self, index, old_size, size):
+		"""Keeps the width of a table column when the user resizes it, so that it's the same the next time the program
+		is opened"""
+		if index < 3:
+			self.load_dict['table%dWidth' % index] = size
+
+	def set_circle(self, selection):
+		"""Sets the colour of the circle for when the user clicks on the plots"""
+		for image in self.image_arr:
+			image.set_circle(selection)
+
+	def remove_image(self, image):
+		"""Removes an image from the table once the user closed its windows"""
+		if image in self.image_arr:
+			idx = self.image_arr.index(image)
+			del self.image_arr[idx]
+			self.tableWidget.removeRow(idx)
 
 	def open_flim_selection_window(self):
 		""" Opens the file dialog and loads the data if the user selects a tiff file"""
 		self.win_flim = DataWindows.FLIMSelectionWindow()
 		self.win_flim.ChannelSelector.setValue(int(self.load_dict["flim_channel"]))
+		self.win_flim.AllChannels.setChecked(self.load_dict.get("flim_all_channels", False))
+		self.win_flim.SeparateFrames.setChecked(self.load_dict.get("flim_separate_frames", False))
 		self.update_elided_label(self.win_flim.FilenameLabel, self.load_dict["flim_file"], "No file selected")
 		self.win_flim.FileSelector.clicked.connect(self.on_select_flim_button_pressed)
 		self.win_flim.Cancel.clicked.connect(self.on_select_flim_cancelled)
@@ -185,6 +279,8 @@ class MainWindow(QtWidgets.QMainWindow):
 		filename = self.load_dict["flim_file"]
 		if filename != "":
 			self.load_dict["flim_channel"] = self.win_flim.ChannelSelector.value()
+			self.load_dict["flim_all_channels"] = self.win_flim.AllChannels.isChecked()
+			self.load_dict["flim_separate_frames"] = self.win_flim.SeparateFrames.isChecked()
 			self.load_data(filename)
 			del self.win_flim
 
@@ -195,38 +291,138 @@ class MainWindow(QtWidgets.QMainWindow):
 			self.image_arr[i.row()].show_lines(self.ShowRangeLines.isChecked())
 
 	def bulk_open(self):
-		"""Opens a group of images, applies threshold, saves the data, and then closes the windows right away.
-		Allows the user to open hundreds of images without hundreds of windows opening up and cluttering"""
+		"""Opens a group of images, applies threshold, and saves the data without opening any windows. The files are
+		processed in parallel by a pool of worker processes, which allows the user to analyse hundreds of images without
+		freezing the front panel"""
 		self.load_frac_filter = False
 		save_folder = ''
 		file = QFileDialog.getOpenFileNames(self, 'Open file', str(self.load_dict['FLIM Load']), 'Tiff (*.tif *.tiff)')
 		if file[0]: # make sure the user selected a piece of data
 			save_folder = QFileDialog.getExistingDirectory(self, directory = self.load_dict['save_Dir'])
 		if save_folder != '':
-			for data in file[0]:
-				self.load_data(data)
-				self.image_arr[-1].fraction_coor_map(self.fraction_x, self.fraction_y)
-				self.save_type = 'all'
-				self.save_selected_data(save_folder)
-				selection = self.tableWidget.selectionModel().selectedRows()
-				for i in selection:
-					self.image_arr[i.row()].kill()
+			workers, ok = QtWidgets.QInputDialog.getInt(self, 'Bulk Open', 'Number of worker processes:',
+													   self.load_dict.get('Batch Workers', os.cpu_count()), 1, 256)
+			if not ok:
+				return
+			self.load_dict['Batch Workers'] = workers
+			self.load_dict['FLIM Load'] = os.path.dirname(file[0][0])
+			self.load_dict['save_Dir'] = save_folder
+			self.batch = BatchProcessor(file[0], self.batch_settings(), save_folder, workers)
+			self.batch_progress = QtWidgets.QProgressDialog("Processing files...", "Cancel", 0, len(file[0]), self)
+			self.batch_progress.setWindowTitle("Bulk Open")
+			self.batch_progress.canceled.connect(self.batch.cancel)
+			self.batch_thread = BatchThread(self.batch)
+			self.batch_thread.progress.connect(self.update_batch_progress)
+			self.batch_thread.finished.connect(self.batch_finished)
+			self.batch_thread.start()
+			self.batch_progress.show()
+
+	def batch_settings(self):
+		"""Collects the front panel values that bulk open applies to every file"""
+		min_thresh = int(self.IntensityMin.text().replace(",","."))
+		max_thresh = int(self.IntensityMax.text().replace(",","."))
+		if max_thresh < min_thresh:
+			max_thresh = min_thresh + 1
+		min_phi = float(self.Phi_min.text().replace(",","."))
+		max_phi = float(self.Phi_max.text().replace(",","."))
+		if max_phi <= min_phi:
+			max_phi = min_phi + 1
+		min_m = float(self.M_min.text().replace(",","."))
+		max_m = float(self.M_max.text().replace(",","."))
+		if max_m <= min_m:
+			max_m = min_m + 0.1
+		return {
+			'channel': self.load_dict["flim_channel"], 'phi_cal': self.load_dict['Phi Cal'],
+			'm_cal': self.load_dict['M Cal'], 'bin_width': self.load_dict['Bin Width'], 'freq': self.load_dict['Freq'],
+			'harmonic': self.load_dict['Harmonic'], 'filters': int(float(self.Filters.text().replace(",","."))),
+			'intensity_min': float(min_thresh), 'intensity_max': float(max_thresh), 'phi_min': min_phi,
+			'phi_max': max_phi, 'm_min': min_m, 'm_max': max_m,
+			'frac_min': float(self.frac_min.text().replace(",",".")),
+			'frac_max': float(self.frac_max.text().replace(",",".")), 'fraction_x': self.fraction_x,
+			'fraction_y': self.fraction_y, 'show_lines': self.ShowRangeLines.isChecked(), 'container': self.container()
+		}
+
+	def update_batch_progress(self, done, total, eta, file):
+		"""Shows how many files of the batch have been saved, and the estimated time left"""
+		self.batch_progress.setValue(done)
+		self.batch_progress.setLabelText("Saved %s\n%d of %d files, about %d s left" %
+										 (os.path.basename(file), done, total, int(eta)))
+
+	def batch_finished(self):
+		"""Closes the progress window and reports the files that could not be processed"""
+		self.batch_progress.close()
+		if self.batch.errors:
+			QtWidgets.QMessageBox.warning(self, "Bulk Open", "Could not process:\n" +
+										  "\n".join(os.path.basename(f) for f in self.batch.errors))
+		del self.batch_thread
+		del self.batch
 
 	def load_data(self, file_name):
-		"""loads a picture from the file_name location, and populates the table widget"""
+		"""Starts loading a picture from the file_name location in the background. Several pictures can be loading at
+		once, and each one is added to the table widget when it's done"""
 		self.load_dict['FLIM Load'] = os.path.dirname(file_name)
-		# keep track of the image
-		self.image_arr.append(
-			ImageHandler(
-				file_name,
-				channel=self.load_dict["flim_channel"],
-				phi_cal=self.load_dict['Phi Cal'],
-				m_cal=self.load_dict['M Cal'],
-				bin_width=self.load_dict['Bin Width'],
-				freq=self.load_dict['Freq'],
-				harmonic=self.load_dict['Harmonic']
-			)
+		thread = LoadThread(
+			file_name,
+			self.load_dict.get("flim_all_channels", False),
+			self.load_dict.get("flim_separate_frames", False),
+			channel=self.load_dict["flim_channel"],
+			phi_cal=self.load_dict['Phi Cal'],
+			m_cal=self.load_dict['M Cal'],
+			bin_width=self.load_dict['Bin Width'],
+			freq=self.load_dict['Freq'],
+			harmonic=self.load_dict['Harmonic']
 		)
+		progress = QtWidgets.QProgressDialog("Reading %s" % os.path.basename(file_name), "Cancel", 0, 100, self)
+		progress.setWindowTitle("Load")
+		progress.canceled.connect(thread.cancel)
+		thread.progress.connect(lambda stage, fraction: self.update_load_progress(thread, stage, fraction))
+		thread.loaded.connect(self.add_image)
+		thread.failed.connect(lambda error: self.load_failed(thread, error))
+		thread.finished.connect(lambda: self.load_finished(thread))
+		self.loads[thread] = progress
+		thread.start()
+
+	def update_load_progress(self, thread, stage, fraction):
+		"""Shows which stage of loading a picture is running, and how far along it is"""
+		progress = self.loads.get(thread)
+		if progress is None or progress.wasCanceled():
+			return
+		start, size, text = LOAD_STAGES[stage]
+		progress.setLabelText("%s %s" % (text, os.path.basename(thread.filename)))
+		progress.setValue(int(start + size * fraction))
+
+	def load_failed(self, thread, error):
+		"""Tells the user that a picture couldn't be loaded"""
+		name = os.path.basename(thread.filename)
+		QtWidgets.QMessageBox.warning(self, "Load", "Could not load %s:\n%s" % (name, error))
+
+	def load_finished(self, thread):
+		"""Closes the progress window of a picture that finished loading, was cancelled or failed"""
+		progress = self.loads.pop(thread, None)
+		if progress is not None:
+			progress.close()
+			progress.deleteLater()
+		thread.deleteLater()
+
+	def add_image(self, data):
+		"""Opens the windows of a loaded picture, which is a PhasorData or a FrameSeries, populates the table widget and
+		applies the front panel settings to it"""
+		self.open_image(data)
+		self.applyAllFilters()
+
+	def open_image(self, data):
+		"""Opens the windows of a PhasorData or a FrameSeries and adds it to the table widget. Returns its
+		ImageHandler"""
+		# keep track of the image
+		if isinstance(data, FrameSeries):
+			self.image_arr.append(ImageHandler(data.frame(0), data))
+		else:
+			self.image_arr.append(ImageHandler(data))
+		# remove the image from the table when its windows are closed
+		image = self.image_arr[-1]
+		image.graph_window.closed.connect(lambda: self.remove_image(image))
+		image.image_window.closed.connect(lambda: self.remove_image(image))
+		image.set_circle(self.circleSelect.currentIndex())
 		# bind the action when the user clicks the plot
 		self.image_arr[-1].binding_id = \
 			self.image_arr[-1].graph_window.Plot.canvas.mpl_connect('button_press_event', self.update_circle)
@@ -239,7 +435,51 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.tableWidget.setItem(len(self.image_arr) - 1, 2, QtWidgets.QTableWidgetItem(str(self.window_num)))
 		self.tableWidget.selectRow(len(self.image_arr) - 1)
 		self.window_num = self.window_num + 1
-		self.applyAllFilters()
+		return image
+
+	def save_session(self):
+		"""Saves the intensity, the phasor maps and the analysis settings of every open picture to a session file, so
+		that they can be opened again without their raw files"""
+		if not self.image_arr:
+			QtWidgets.QMessageBox.warning(self, "Save Session", "There are no images to save.")
+			return
+		file, _filter = QFileDialog.getSaveFileName(self, 'Save session', str(self.load_dict.get('Session', '')),
+												   "FLUTE Sessions (*%s)" % SESSION_EXTENSION)
+		if file == "":
+			return
+		if not file.endswith(SESSION_EXTENSION):
+			file += SESSION_EXTENSION
+		self.load_dict['Session'] = os.path.dirname(file)
+		save_session(file, [image.session_entry() for image in self.image_arr])
+
+	def open_session(self):
+		"""Opens the pictures of a session file with the settings they were saved with. The pictures are opened one at
+		a time, each one once the windows of the last one are up, and their maps are only read as they are opened"""
+		file, _filter = QFileDialog.getOpenFileName(self, 'Open session', str(self.load_dict.get('Session', '')),
+												   "FLUTE Sessions (*%s)" % SESSION_EXTENSION)
+		if file == "":
+			return
+		self.load_dict['Session'] = os.path.dirname(file)
+		try:
+			session = Session(file)
+		except Exception as e:
+			QtWidgets.QMessageBox.warning(self, "Open Session", "Could not open %s:\n%s" % (os.path.basename(file), e))
+			return
+		self.restore_dataset(session, 0)
+
+	def restore_dataset(self, session, index):
+		"""Opens dataset index of session, and schedules the next one once its windows are up"""
+		if index >= len(session):
+			session.close()
+			return
+		try:
+			data, state, frame, show_lines = session.dataset(index)
+		except Exception as e:
+			QtWidgets.QMessageBox.warning(self, "Open Session", "Could not open %s:\n%s" %
+										  (session.names()[index], e))
+		else:
+			self.open_image(data).restore_state(state, frame, show_lines)
+		QtCore.QTimer.singleShot(0, lambda: self.restore_dataset(session, index + 1))
 
 	def update_circle(self, event):
 		"""Draws the circle on all active plots when the user clicks a plot that's active"""
@@ -341,6 +581,7 @@ class MainWindow(QtWidgets.QMainWindow):
 				Calibration.get_calibration_parameters(filename, channel, bin_width, freq, harmonic, tau_ref)
 			self.Phi_cal_box.setText("{:.4f}".format(self.load_dict['Phi Cal']))
 			self.m_cal_box.setText("{:.4f}".format(self.load_dict['M Cal']))
+			self.apply_calibration()
 			del self.cal
 
 	def kill_cal(self):
@@ -531,6 +772,14 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.load_dict['Phi Cal'] = float(phi_cal) if len(phi_cal)>0 and phi_cal!='-' else 0.0
 		self.load_dict['M Cal'] = float(m_cal) if len(m_cal)>0 and m_cal!='-' else 0.0
 
+	def apply_calibration(self):
+		"""Recalibrates the selected images with the calibration values on the front panel, without reloading them"""
+		if self.load_dict['M Cal'] <= 0:
+			return
+		selection = self.tableWidget.selectionModel().selectedRows()
+		for i in selection:
+			self.image_arr[i.row()].set_calibration(self.load_dict['Phi Cal'], self.load_dict['M Cal'])
+
 	def applyFilter(self):
 		"""Applies convolutional median filters to selected images"""
 		filters = int(float(self.Filters.text().replace(",",".")))
@@ -574,13 +823,14 @@ class MainWindow(QtWidgets.QMainWindow):
 
 	def save_data_popup(self):
 		"""Opens the save data window and connects buttons"""
-		self.save_window = DataWindows.SaveWindow()
+		self.save_window = DataWindows.SaveWindow(self.container())
 		self.save_window.AllData.clicked.connect(lambda: self.save_data('all'))
 		self.save_window.CurrentData.clicked.connect(lambda: self.save_data('current'))
 		self.save_window.show()
 
 	def save_data(self, type):
 		"""Opens a save file dialog and saves the images and parameters"""
+		self.load_dict['Export Format'] = self.save_window.container()
 		self.kill_save_window()
 		file = QFileDialog.getExistingDirectory(self, directory = self.load_dict['save_Dir'])
 		self.save_type = type
@@ -592,7 +842,12 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.load_dict['save_Dir'] = file_path
 		selection = self.tableWidget.selectionModel().selectedRows()
 		for i in selection:
-			self.image_arr[i.row()].save_data(file_path, self.save_type)
+			self.image_arr[i.row()].save_data(file_path, self.save_type, self.container())
+
+	def container(self):
+		"""Returns the format of the single file that the maps were last saved to, or None for a TIFF for each map"""
+		container = self.load_dict.get('Export Format', config.EXPORT_CONTAINER)
+		return container if container in available_formats() else None
 
 	def kill_save_window(self):
 		"""closes the save selection window"""
@@ -616,13 +871,17 @@ class MainWindow(QtWidgets.QMainWindow):
 	def close_windows(self):
 		"""closes all the widnows the user has selected on the table widget, to clean up the workspace"""
 		del self.close
+		# The rows are removed from the table as the windows close, so the images are collected first
 		selection = self.tableWidget.selectionModel().selectedRows()
-		for i in selection:
-			self.image_arr[i.row()].kill()
+		for image in [self.image_arr[i.row()] for i in selection]:
+			image.kill()
 
 	def closeEvent(self, event):
 		"""Closes all open windows when the main window is closed"""
-		for window in self.image_arr:
+		for thread in list(self.loads):
+			thread.cancel()
+			thread.wait()
+		for window in list(self.image_arr):
 			window.kill()
 			del window
 		with open('saved_dict.pkl', 'wb') as f:
@@ -642,6 +901,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
 # Executes the MainWindow
 if __name__ == "__main__":
+	multiprocessing.freeze_support()
 	if platform.system() == "Windows":
 		make_dpi_aware()
 	if hasattr(QtCore.Qt, 'AA_EnableHighDpiScaling'):
@@ -0,0 +1,7 @@
+from .phasor_data import PhasorData
+from .frames import FrameSeries
+from .phasor_plot import PhasorPlot, HeadlessCanvas
+from .multi_phasor_plot import MultiPhasorPlot
+from .batch import BatchProcessor
+from .cache import PhasorCache
+from .session import Session, save_session
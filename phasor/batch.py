@@ -0,0 +1,94 @@
+# Processes a batch of images in a pool of worker processes. Each file is loaded, the settings from the front panel are
+# applied to it and its data is saved, in the same way as opening the file, filtering it and saving it from the GUI.
+
+# imports
+import concurrent.futures
+import os
+import time
+
+from .phasor_data import PhasorData
+from .cache import PhasorCache
+from .export import make_plot
+from .container import FORMATS, container_path, link_containers
+
+def apply_settings(data, settings):
+	"""Applies the filters, thresholds and fraction settings from the front panel to data, in the same order as
+	opening the file from the GUI and running bulk open"""
+	data.change_colormap(0)
+	data.convolution(settings['filters'])
+	data.update_threshold(settings['intensity_min'], settings['intensity_max'])
+	data.update_angle_range(settings['phi_min'], settings['phi_max'])
+	data.update_circle_range(settings['m_min'] * 100, settings['m_max'] * 100)
+	data.update_fraction_range(settings['frac_min'] * 100, settings['frac_max'] * 100)
+	data.fraction_coor_map(settings['fraction_x'], settings['fraction_y'])
+	data.change_colormap(4)
+
+def process_file(filename, settings, save_folder, cache=None):
+	"""Loads filename, applies settings to it and saves all of its data to save_folder. Runs in a worker process. The
+	sums of the file are only taken from or kept in cache, a PhasorCache, when one is given"""
+	data = PhasorData.from_file(
+		filename,
+		channel=settings['channel'],
+		phi_cal=settings['phi_cal'],
+		m_cal=settings['m_cal'],
+		bin_width=settings['bin_width'],
+		freq=settings['freq'],
+		harmonic=settings['harmonic'],
+		harmonics=[settings['harmonic']],
+		cache=PhasorCache(max_bytes=0) if cache is None else cache
+	)
+	apply_settings(data, settings)
+	data.save_data(save_folder, 'all', make_plot(data, settings['show_lines']), settings.get('container'))
+	return data.name
+
+class BatchProcessor:
+	"""Runs process_file on a list of files with a pool of workers processes. The batch can be cancelled from another
+	thread, in which case the files that haven't been started yet are skipped. cache is passed on to process_file"""
+	def __init__(self, files, settings, save_folder, workers=None, cache=None):
+		self.files = list(files)
+		self.settings = settings
+		self.save_folder = save_folder
+		self.workers = workers if workers else os.cpu_count()
+		self.cache = cache
+		self.cancelled = False
+		self.futures = {}
+		self.errors = {}
+
+	def cancel(self):
+		"""Drops the files that haven't been started yet straight away, and stops the batch once the files currently
+		being processed are done"""
+		self.cancelled = True
+		for future in list(self.futures):
+			future.cancel()
+
+	def run(self, progress=None):
+		"""Processes all the files. progress(done, total, eta, filename) is called each time a file finishes, with the
+		estimated time left in seconds. When the maps are saved to HDF5 files, a batch file that links to all of them is
+		written as well. Returns the number of files that were processed"""
+		total = len(self.files)
+		done = 0
+		start = time.monotonic()
+		names = []
+		with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+			for file in self.files:
+				self.futures[executor.submit(process_file, file, self.settings, self.save_folder, self.cache)] = file
+			if self.cancelled:
+				# Cancelled while the files were being submitted
+				self.cancel()
+			for future in concurrent.futures.as_completed(self.futures):
+				file = self.futures[future]
+				if future.cancelled():
+					continue
+				try:
+					names.append(future.result())
+				except Exception as e:
+					self.errors[file] = e
+					print("Could not process %s: %s" % (file, e))
+				done = done + 1
+				eta = (time.monotonic() - start) / done * (total - done)
+				if progress is not None:
+					progress(done, total, eta, file)
+		if self.settings.get('container') == 'hdf5' and names:
+			link_containers(os.path.join(self.save_folder, 'batch' + FORMATS['hdf5']),
+							[container_path(os.path.join(self.save_folder, name), 'hdf5') for name in sorted(names)])
+		return done
@@ -0,0 +1,36 @@
+# Index of the phasor plot bin that every pixel falls in. Selections on the phasor plot, like the cursors, the angle
+# and modulation ranges and the distance band, can then be worked out once for every bin instead of once for every
+# pixel, and gathered back to the pixels through the index.
+
+# imports
+import numpy as np
+
+class PhasorBins:
+	"""Splits the phasor plot into bins x bins cells over g_range and s_range, and records the cell of every pixel of
+	the g and s maps. Selections are evaluated at the centre of each cell, so pixels can be assigned to the wrong side
+	of a boundary by up to half a cell. Pixels outside the cells, or with g or s not a number, are evaluated exactly"""
+	def __init__(self, g, s, bins, g_range=(0, 1), s_range=(0, 0.6)):
+		self.g = g
+		self.s = s
+		self.shape = np.shape(g)
+		g_width = (g_range[1] - g_range[0]) / bins
+		s_width = (s_range[1] - s_range[0]) / bins
+		with np.errstate(invalid='ignore'):
+			g_bin = np.floor((np.ravel(g) - g_range[0]) / g_width)
+			s_bin = np.floor((np.ravel(s) - s_range[0]) / s_width)
+			inside = (g_bin >= 0) & (g_bin < bins) & (s_bin >= 0) & (s_bin < bins)
+		# Kept as intp, which np.take uses without converting the index on every selection
+		self.index = np.where(inside, g_bin * bins + s_bin, 0).astype(np.intp)
+		self.outside = np.flatnonzero(~inside)
+		centres_g = g_range[0] + (np.arange(bins) + 0.5) * g_width
+		centres_s = s_range[0] + (np.arange(bins) + 0.5) * s_width
+		self.centres_g = np.repeat(centres_g, bins)
+		self.centres_s = np.tile(centres_s, bins)
+
+	def evaluate(self, selection):
+		"""Returns the boolean map of selection(g, s), which is evaluated on the centres of the bins and on the pixels
+		outside of them"""
+		selected = np.take(selection(self.centres_g, self.centres_s), self.index)
+		if len(self.outside) > 0:
+			selected[self.outside] = selection(np.ravel(self.g)[self.outside], np.ravel(self.s)[self.outside])
+		return selected.reshape(self.shape)
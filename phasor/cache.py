@@ -0,0 +1,111 @@
+# Keeps the phasor sums of the images that have been opened in a folder on disk, so that opening a file again with the
+# same channel, bin width, frequency and harmonics skips reading and transforming the stack. The sums are stored exactly,
+# compressed, and the folder is kept under a size limit by removing the least recently used entries. The cache is off
+# unless config.CACHE_MAX_BYTES is set.
+
+# imports
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+import config
+
+# Extension of the files of the entries
+ENTRY_EXTENSION = '.npz'
+
+# Number of bytes from the start and the end of a file that are hashed to identify it, along with its size
+SAMPLE_BYTES = 2 ** 20
+
+class PhasorCache:
+	"""Stores (weights, Y, X) phasor sums as compressed .npz files in directory, config.CACHE_DIR by default. Entries
+	are looked up by a key made from the identity of the file and the parameters used to calculate the sums. The cache
+	holds up to max_bytes, config.CACHE_MAX_BYTES by default, and is off when that is 0"""
+	def __init__(self, directory=None, max_bytes=None):
+		self.directory = str(config.CACHE_DIR if directory is None else directory)
+		self.max_bytes = config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+	@property
+	def enabled(self):
+		return self.max_bytes > 0
+
+	@staticmethod
+	def key(filename, **params):
+		"""Returns the key of the sums of filename calculated with params. The file is identified by its size, its
+		modification time and a hash of its first and last bytes, so a file that is changed or replaced gets a new key
+		without the whole file being read"""
+		digest = hashlib.sha1()
+		stat = os.stat(filename)
+		digest.update(repr((stat.st_size, stat.st_mtime_ns)).encode())
+		with open(filename, 'rb') as f:
+			digest.update(f.read(SAMPLE_BYTES))
+			if stat.st_size > SAMPLE_BYTES:
+				f.seek(max(SAMPLE_BYTES, stat.st_size - SAMPLE_BYTES))
+				digest.update(f.read(SAMPLE_BYTES))
+		digest.update(repr(sorted(params.items())).encode())
+		return digest.hexdigest()
+
+	def path(self, key):
+		return os.path.join(self.directory, key + ENTRY_EXTENSION)
+
+	def get(self, key):
+		"""Returns the sums stored under key, or None if they aren't in the cache"""
+		if not self.enabled:
+			return None
+		try:
+			with np.load(self.path(key)) as entry:
+				sums = entry['sums']
+			# The modification time of an entry is when it was last used, which is what eviction goes by
+			os.utime(self.path(key))
+		except (OSError, ValueError, KeyError):
+			return None
+		return sums
+
+	def put(self, key, sums):
+		"""Stores sums under key, and removes the least recently used entries if the cache is over its size limit"""
+		if not self.enabled or sums is None:
+			return
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			# Write to a temporary file first, so that other processes never load a half written entry
+			fd, temp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+		except OSError as e:
+			print("Could not cache phasor sums: %s" % e)
+			return
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				np.savez_compressed(f, sums=sums)
+			os.replace(temp, self.path(key))
+		except OSError as e:
+			print("Could not cache phasor sums: %s" % e)
+			os.remove(temp)
+			return
+		self.evict()
+
+	def evict(self):
+		"""Removes the least recently used entries until the cache fits in max_bytes"""
+		entries = []
+		for entry in os.scandir(self.directory):
+			if entry.name.endswith(ENTRY_EXTENSION):
+				try:
+					stat = entry.stat()
+				except OSError:
+					continue
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+		total = sum(size for _, size, _ in entries)
+		for _, size, path in sorted(entries):
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total = total - size
+
+	def clear(self):
+		"""Removes every entry from the cache"""
+		if os.path.isdir(self.directory):
+			for entry in os.scandir(self.directory):
+				if entry.name.endswith(ENTRY_EXTENSION):
+					os.remove(entry.path)
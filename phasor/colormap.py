@@ -0,0 +1,64 @@
+# Renders the colormaps of the images with lookup tables of 8 bit colours. The value of every pixel is turned into an
+# index into the table of the colormap, and the selection circles and the mask are added as extra entries at the end of
+# the table, so the final RGB image is made in one lookup.
+
+# imports
+import functools
+import numpy as np
+import matplotlib
+
+# Colours of the red, green, blue and yellow selection circles, followed by the black of the masked pixels
+OVERLAY_COLORS = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255], [255, 255, 0], [0, 0, 0]], dtype=np.uint8)
+
+@functools.lru_cache(maxsize=None)
+def lookup_table(name, n):
+	"""Returns the (n + 8, 3) uint8 table of the matplotlib colormap name resampled to n colours. Entries n, n + 1 and
+	n + 2 are the colours for values under, over and outside of the colormap, like matplotlib, and the last five are
+	the OVERLAY_COLORS. The colours are rounded down to 8 bits the same way as matplotlib does"""
+	cmap = matplotlib.colormaps[name].resampled(n)
+	rgba = np.vstack((cmap(np.arange(n)), cmap.get_under(), cmap.get_over(), cmap.get_bad()))
+	table = np.vstack(((rgba[:, :3] * 255).astype(np.uint8), OVERLAY_COLORS))
+	table.flags.writeable = False
+	return table
+
+@functools.lru_cache(maxsize=None)
+def grey_table():
+	"""Returns the (256 + 5, 3) uint8 table of the grey levels, followed by the OVERLAY_COLORS"""
+	table = np.vstack((np.repeat(np.arange(256, dtype=np.uint8)[:, np.newaxis], 3, axis=1), OVERLAY_COLORS))
+	table.flags.writeable = False
+	return table
+
+def color_indices(values, n):
+	"""Returns the index into a lookup_table of n colours of every value. Floats between 0 and 1 are spread over the
+	n colours and integers are used as indices, in the same way as calling a matplotlib colormap"""
+	values = np.asarray(values)
+	if values.dtype.kind == 'f':
+		values = values * n
+		values[values == n] = n - 1
+	under = values < 0
+	over = values >= n
+	bad = np.isnan(values) if values.dtype.kind == 'f' else False
+	with np.errstate(invalid='ignore'):
+		indices = values.astype(np.int16)
+	indices[under] = n
+	indices[over] = n + 1
+	indices[bad] = n + 2
+	return indices
+
+def overlay_indices(color_map):
+	"""Turns the (Y, X, 4) masks of the selection circles into the offset of the overlay colour of every pixel from
+	the end of the colormap, or -1 where there is no circle. Later circles are drawn on top of earlier ones"""
+	overlay = np.full(color_map.shape[:-1], -1, dtype=np.int16)
+	for i in range(color_map.shape[-1]):
+		overlay = np.where(color_map[..., i], np.int16(i), overlay)
+	return overlay
+
+def render(indices, table, overlay, mask, out=None):
+	"""Returns the RGB image of the colour indices with the selection circles from overlay_indices drawn on top and
+	the masked pixels in black. out is reused for the result if it has the right shape"""
+	colors = len(table) - len(OVERLAY_COLORS)
+	indices = np.where(overlay >= 0, overlay + colors, indices)
+	indices = np.where(mask, np.int16(len(table) - 1), indices)
+	if out is None or out.shape != indices.shape + (3,) or out.dtype != np.uint8:
+		out = np.empty(indices.shape + (3,), dtype=np.uint8)
+	return np.take(table, indices, axis=0, out=out, mode='clip')
@@ -0,0 +1,64 @@
+# Writes the maps of an image to a single file, instead of a TIFF for each map. Each map is a named dataset, stored as
+# float32 in compressed tiles, so that other programs can read only the maps and the part of the image that they need.
+# HDF5 files need h5py, which is optional
+
+# imports
+import os
+import tifffile
+
+import config
+
+try:
+	import h5py
+except ImportError:
+	h5py = None
+
+# Formats of the single file, with their extensions
+FORMATS = {'ome-tiff': '.ome.tif', 'hdf5': '.h5'}
+
+def available_formats():
+	"""Returns the formats that can be written with the packages that are installed"""
+	return [format for format in FORMATS if format != 'hdf5' or h5py is not None]
+
+def container_path(path, format):
+	"""Returns the name of the file that format writes for path, which doesn't have an extension"""
+	return path + FORMATS[format]
+
+def write_container(path, datasets, parameters, format, tile=config.EXPORT_TILE):
+	"""Writes datasets, a dict of 2D arrays by name, and parameters, a text describing how they were made, to a single
+	file of format. path doesn't have an extension. Returns the name of the file"""
+	if format not in available_formats():
+		raise ValueError("Cannot save %s files" % format)
+	file = container_path(path, format)
+	if format == 'ome-tiff':
+		write_ome_tiff(file, datasets, parameters, tile)
+	else:
+		write_hdf5(file, datasets, parameters, tile)
+	return file
+
+def write_ome_tiff(file, datasets, parameters, tile):
+	"""Writes each dataset as an image of an OME-TIFF, named after it. The parameters are the description of the first
+	image"""
+	bigtiff = sum(array.nbytes for array in datasets.values()) > 2 ** 31
+	with tifffile.TiffWriter(file, ome=True, bigtiff=bigtiff) as tif:
+		for i, (name, array) in enumerate(datasets.items()):
+			metadata = {'axes': 'YX', 'Name': name}
+			if i == 0:
+				metadata['Description'] = parameters
+			tif.write(array, tile=(tile, tile), compression='zlib', metadata=metadata)
+
+def write_hdf5(file, datasets, parameters, tile):
+	"""Writes each dataset as a dataset of an HDF5 file, named after it. The parameters are an attribute of the file"""
+	with h5py.File(file, 'w') as f:
+		for name, array in datasets.items():
+			chunks = tuple(min(tile, size) for size in array.shape)
+			f.create_dataset(name, data=array, chunks=chunks, compression='gzip', shuffle=True)
+		f.attrs['parameters'] = parameters
+
+def link_containers(file, files):
+	"""Writes an HDF5 file that holds a link to each of files, HDF5 files in the same folder, as a group named after the
+	file, so that a whole batch can be opened as one file"""
+	with h5py.File(file, 'w') as f:
+		for name in files:
+			base = os.path.basename(name)
+			f[base[:-len(FORMATS['hdf5'])]] = h5py.ExternalLink(base, '/')
@@ -0,0 +1,55 @@
+# Draws phasor clouds as density images for the multi-phasor view. Each cloud is binned into a 2D histogram once, and
+# the clouds are then drawn by compositing their histograms, so drawing them costs the same however many points they
+# have
+
+# imports
+import numpy as np
+
+import config
+
+# Part of the phasor plot that the histograms cover
+G_RANGE = (0.0, 1.0)
+S_RANGE = (0.0, 0.6)
+
+def density_shape(bins=config.MULTI_PHASOR_BINS):
+	"""Returns the (s bins, g bins) shape of the histograms, with bins along g and bins of the same size along s"""
+	return int(round(bins * (S_RANGE[1] - S_RANGE[0]) / (G_RANGE[1] - G_RANGE[0]))), int(bins)
+
+def bin_centres(shape):
+	"""Returns the g and s coordinates of the centres of the bins of a histogram of shape"""
+	g_edges = np.linspace(G_RANGE[0], G_RANGE[1], shape[1] + 1)
+	s_edges = np.linspace(S_RANGE[0], S_RANGE[1], shape[0] + 1)
+	return (g_edges[:-1] + g_edges[1:]) / 2, (s_edges[:-1] + s_edges[1:]) / 2
+
+def cloud_density(g, s, bins=config.MULTI_PHASOR_BINS):
+	"""Returns the (s bins, g bins) histogram of the points of a cloud, and its centre, which is the mean of all of its
+	points. Points that aren't finite are left out of both"""
+	g = np.asarray(g, dtype=np.float64).ravel()
+	s = np.asarray(s, dtype=np.float64).ravel()
+	keep = np.isfinite(g) & np.isfinite(s)
+	g, s = g[keep], s[keep]
+	centre = (g.mean(), s.mean()) if len(g) else (np.nan, np.nan)
+	shape = density_shape(bins)
+	column = np.floor((g - G_RANGE[0]) * (shape[1] / (G_RANGE[1] - G_RANGE[0]))).astype(np.int64)
+	row = np.floor((s - S_RANGE[0]) * (shape[0] / (S_RANGE[1] - S_RANGE[0]))).astype(np.int64)
+	inside = (column >= 0) & (column < shape[1]) & (row >= 0) & (row < shape[0])
+	counts = np.bincount(row[inside] * shape[1] + column[inside], minlength=shape[0] * shape[1])
+	return counts.reshape(shape).astype(np.float32), centre
+
+def composite(layers, shape):
+	"""Draws the clouds over each other, in order. layers holds a (density, rgb, alpha) for each cloud, and each point
+	of a cloud covers its bin with opacity alpha, like a scatter plot with that alpha. Returns the (s bins, g bins, 4)
+	RGBA image"""
+	colour = np.zeros(tuple(shape) + (3,), dtype=np.float32)
+	opacity = np.zeros(tuple(shape), dtype=np.float32)
+	for density, rgb, alpha in layers:
+		cover = 1 - np.power(np.float32(1 - alpha), density)
+		behind = 1 - cover
+		colour *= behind[..., np.newaxis]
+		colour += cover[..., np.newaxis] * np.asarray(rgb, dtype=np.float32)
+		opacity *= behind
+		opacity += cover
+	image = np.zeros(tuple(shape) + (4,), dtype=np.float32)
+	np.divide(colour, opacity[..., np.newaxis], out=image[..., :3], where=opacity[..., np.newaxis] > 0)
+	image[..., 3] = opacity
+	return image
@@ -0,0 +1,122 @@
+# Saves the images, maps and phasor plots of a PhasorData in one pass. The masks are worked out once and every colormap
+# is rendered from the data into an image of its own, so saving doesn't change the data or the windows that show it,
+# and only the colormaps that are saved are rendered
+
+# imports
+import numpy as np
+from PIL import Image
+import tifffile
+
+from . import colormap
+from .container import write_container
+from .phasor_plot import PhasorPlot, HeadlessCanvas
+
+# Colormaps in the order they are saved, with the names of their image and plot files. Colormap 3 has no plot of its
+# own, as it is shown as the density plot of colormap 0
+COLORMAP_FILES = (
+	(0, '_image_Intensity.tif', '_graph_density.png'),
+	(1, '_image_TauM.tif', '_graph_TauM.png'),
+	(2, '_image_TauP.tif', '_graph_TauP.png'),
+	(3, '_image_Jet.tif', None),
+	(4, '_image_Distance.tif', '_graph_Distance.png')
+)
+
+def make_plot(data, show_lines):
+	"""Creates a phasor plot of data that isn't shown in a window, with the same ranges and selection circles as the
+	graph window"""
+	plot = PhasorPlot(HeadlessCanvas())
+	plot.set_lifetime_points(data.get_phasor_lifetime_coordinates())
+	plot.update_angle_range(data.applied_min_ang, data.applied_max_ang)
+	plot.update_circle_range(data.applied_min_M, data.applied_max_M)
+	plot.set_fraction(data.x_fraction, data.y_fraction)
+	plot.update_fraction_range(data.fraction_min, data.fraction_max)
+	plot.circle_coors[...] = data.circle_coors
+	plot.circle_radius = list(data.circle_radius)
+	plot.draw_circles()
+	plot.set_alpha(int(show_lines))
+	return plot
+
+def save_data(data, folder, save_type, plot=None, container=None):
+	"""Saves the images of the colormaps, the g and s coordinates, the lifetime maps and a file with the parameters used
+	to create them to folder. save_type is 'all', or 'current' to only save what belongs to the colormap data is shown
+	with. The phasor plot of each saved colormap is drawn on plot and saved alongside its image when plot is given.
+	container is the format of a single file that the intensity, all the maps, the mask and the parameters are written
+	to instead of a TIFF for each map and a text file, or None"""
+	current = data.color_map_select
+	path = folder + '/' + data.name
+
+	def selected(*colormaps):
+		return save_type == 'all' or (save_type == 'current' and current in colormaps)
+
+	mask = data.combined_mask()
+	overlay = data.cursor_overlay()
+	image_props = {'image_min_ang': data.image_min_ang, 'image_max_ang': data.image_max_ang,
+				   'image_min_M': data.image_min_M, 'image_max_M': data.image_max_M}
+	for select, image_file, graph_file in COLORMAP_FILES:
+		save_graph = plot is not None and graph_file is not None and selected(*((0, 3) if select == 0 else (select,)))
+		if not selected(select) and not save_graph:
+			continue
+		indices, table, props = data.colormap_frame(select, mask)
+		image_props.update((name, value) for name, value in props.items() if name in image_props)
+		if selected(select):
+			Image.fromarray(colormap.render(indices, table, overlay, mask)).save(path + image_file)
+		if save_graph:
+			plot.set_colormap(select)
+			plot.set_image_props(image_props['image_min_ang'], image_props['image_max_ang'],
+								 image_props['image_min_M'], image_props['image_max_M'])
+			plot.update_data(*data.thresholded_coordinates())
+			plot.save_fig(path + graph_file)
+
+	maps = masked_maps(data, mask)
+	parameters = parameter_lines(data, maps, mask)
+	if container is not None:
+		datasets = {'intensity': data.original_image.astype(np.float32)}
+		datasets.update((name, array.astype(np.float32)) for name, array in maps.items())
+		datasets['mask'] = mask.astype(np.uint8)
+		write_container(path, datasets, ''.join(parameters), container)
+		return
+
+	tifffile.imwrite(path + '_g.tiff', maps['g'])
+	tifffile.imwrite(path + '_s.tiff', maps['s'])
+	if selected(2):
+		tifffile.imwrite(path + '_TauP.tiff', maps['tau_p'])
+	if selected(1):
+		tifffile.imwrite(path + '_TauM.tiff', maps['tau_m'])
+	if selected(4):
+		tifffile.imwrite(path + '_Dist.tiff', maps['distance'])
+
+	with open(path + '_Parameters.txt', 'w') as f:
+		f.writelines(parameters)
+
+def masked_maps(data, mask):
+	"""Returns the g, s, TauP, TauM and distance maps, with the pixels outside the thresholds set to nan"""
+	g = data.x_adjusted.copy()
+	g[mask] = float("nan")
+	s = data.y_adjusted.copy()
+	s[mask] = float("nan")
+	tau_p, tau_m, distance = data.lifetime_maps()
+	shape = data.original_image.shape
+	return {'g': g.reshape(shape), 's': s.reshape(shape), 'tau_p': tau_p, 'tau_m': tau_m, 'distance': distance}
+
+def parameter_lines(data, maps, mask):
+	"""Returns the lines of the parameters file, with the settings used to create the maps and their averages"""
+	omega = 2 * np.pi * data.freq / 1000 * data.harmonic
+	x_avg = np.average(maps['g'][~mask])
+	y_avg = np.average(maps['s'][~mask])
+	return [
+		f'number Of 3x3 Median Filters: {data.num_filter}\n',
+		f'Intensity Min: {data.min_thresh:.3f}\n',
+		f'Intensity Max: {data.max_thresh:.3f}\n',
+		f'Phi Min (Deg, ns): ({data.applied_min_ang:.3f}, {1 / omega * np.tan(np.deg2rad(data.applied_min_ang)):.3f}) \n',
+		f'Phi Max (Deg, ns): ({data.applied_max_ang:.3f}, {1 / omega * np.tan(np.deg2rad(data.applied_max_ang)):.3f})\n',
+		f'Modulation Min (M, ns): ({data.applied_min_M/100:.3f}, {1 / omega * np.sqrt(1 / np.power(data.applied_min_M/100, 2) - 1):.3f})\n',
+		f'Modulation Max (M, ns): ({data.applied_max_M/100:.3f}, {1 / omega * np.sqrt(1 / np.power(data.applied_max_M/100, 2) - 1):.3f})\n',
+		f'Distance From Coordinates (g,s): {data.x_fraction:.3f}, {data.y_fraction:.3f}\n',
+		f'Distance Min: {data.fraction_min:.3f}\n',
+		f'Distance Max: {data.fraction_max:.3f}\n\n\n',
+		f'Average g Coordinate: {x_avg:.3f}\n',
+		f'Average s Coordinate: {y_avg:.3f}\n',
+		f'Average TauP (ns): {np.nanmean(maps["tau_p"]):.3f}\n',
+		f'Average TauM (ns): {np.nanmean(maps["tau_m"]):.3f}\n',
+		f'Average distance: {np.nanmean(maps["distance"]):.3f}\n'
+	]
@@ -0,0 +1,112 @@
+# Holds the phasor data of time-lapse and z-stack acquisitions, which have a FLIM image for each frame or slice. The
+# frames are read one at a time and only their intensity and uncalibrated g and s maps are kept, and the PhasorData of a
+# frame is only made when it is shown
+
+# imports
+import collections
+import functools
+import numpy as np
+import os
+
+import config
+from image_loader.image_loader import ImageLoader
+from .transform import phasor_weights, phasor_sums, phasor_coordinates
+from .phasor_data import PhasorData
+
+class FrameSeries:
+	"""Holds the intensity and the uncalibrated g and s maps of every frame of an image, stored as float32, and makes
+	the PhasorData of a frame when it is asked for. The PhasorData of the last cache_frames frames are kept, along with
+	their masks and filtered maps, so that going back to a frame is immediate"""
+
+	def __init__(self, name, intensity, raw_g, raw_s, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1,
+				 harmonics=None, cache_frames=config.FRAME_CACHE):
+		self.name = name
+		self.intensity = intensity
+		self.raw_g = raw_g
+		self.raw_s = raw_s
+		self.settings = dict(phi_cal=phi_cal, m_cal=m_cal, bin_width=bin_width, freq=freq, harmonic=harmonic,
+							 harmonics=harmonics)
+		self.cache_frames = max(1, cache_frames)
+		self.frames = collections.OrderedDict()
+
+	@classmethod
+	def from_file(cls, filename, channel=0, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1,
+				  harmonics=None, progress=None):
+		"""Calculates the phasor maps of every frame of the image stored at filename, reading one frame at a time.
+		progress(stage, fraction) is called as in PhasorData.from_file"""
+		progress = progress if progress is not None else lambda stage, fraction: None
+		harmonics = PhasorData.harmonic_set(harmonic, harmonics)
+		weights = functools.partial(phasor_weights, bin_width=float(bin_width), freq=float(freq), harmonic=harmonics)
+		_, frames = ImageLoader.load_frames(filename, channel, weights, lambda fraction: progress('read', fraction))
+		name = os.path.splitext(os.path.basename(filename))[0]
+		series = cls.from_sums(frames, name, phi_cal, m_cal, bin_width, freq, harmonic, harmonics)
+		# The maps of each frame are calculated while the file is read
+		progress('read', 1.0)
+		progress('transform', 1.0)
+		return series
+
+	@classmethod
+	def from_file_channels(cls, filename, channels=None, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1,
+						   harmonics=None, progress=None):
+		"""Calculates the phasor maps of every frame of several detector channels of the image stored at filename, all
+		of them by default, reading the file once for all of them. Returns a FrameSeries for each channel, named after
+		the file and the channel"""
+		progress = progress if progress is not None else lambda stage, fraction: None
+		harmonics = PhasorData.harmonic_set(harmonic, harmonics)
+		weights = functools.partial(phasor_weights, bin_width=float(bin_width), freq=float(freq), harmonic=harmonics)
+		loader = ImageLoader.from_file(filename)
+		channels = list(range(loader.channel_count(filename))) if channels is None else list(channels)
+		maps = [([], [], []) for channel in channels]
+		for frame in loader.load_channel_frame_sums(filename, channels, weights,
+													lambda fraction: progress('read', fraction)):
+			for channel_maps, sums in zip(maps, frame):
+				cls.add_frame(channel_maps, sums)
+		progress('read', 1.0)
+		progress('transform', 1.0)
+		name = os.path.splitext(os.path.basename(filename))[0]
+		return [cls('%s_ch%d' % (name, channel), *channel_maps, phi_cal, m_cal, bin_width, freq, harmonic, harmonics)
+				for channel, channel_maps in zip(channels, maps)]
+
+	@classmethod
+	def from_stacks(cls, stacks, name, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1, harmonics=None):
+		"""Calculates the phasor maps of every (bins, Y, X) stack that stacks yields, one stack at a time"""
+		harmonics = PhasorData.harmonic_set(harmonic, harmonics)
+		weights = functools.partial(phasor_weights, bin_width=float(bin_width), freq=float(freq), harmonic=harmonics)
+		sums = (phasor_sums(stack, weights) for stack in stacks)
+		return cls.from_sums(sums, name, phi_cal, m_cal, bin_width, freq, harmonic, harmonics)
+
+	@classmethod
+	def from_sums(cls, sums, name, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1, harmonics=None):
+		"""Turns the sums of each frame that sums yields into its maps, keeping only the maps"""
+		maps = ([], [], [])
+		for frame_sums in sums:
+			cls.add_frame(maps, frame_sums)
+		return cls(name, *maps, phi_cal, m_cal, bin_width, freq, harmonic, harmonics)
+
+	@staticmethod
+	def add_frame(maps, sums):
+		"""Appends the intensity and the uncalibrated g and s maps of the sums of a frame to the lists in maps"""
+		for frame_maps, frame_map in zip(maps, phasor_coordinates(sums)):
+			frame_maps.append(frame_map.astype(np.float32))
+
+	def __len__(self):
+		return len(self.intensity)
+
+	def frame_name(self, index):
+		"""Returns the name of the data of a frame, which its saved files are named after"""
+		return '%s_frame%03d' % (self.name, index + 1)
+
+	def frame(self, index, state=None):
+		"""Returns the PhasorData of frame index, with the settings from PhasorData.analysis_state applied to it when
+		state is given"""
+		data = self.frames.pop(index, None)
+		if data is None:
+			data = PhasorData(self.frame_name(index), self.intensity[index].astype(np.float64),
+							  self.raw_g[index].astype(np.float64), self.raw_s[index].astype(np.float64),
+							  **self.settings)
+		self.frames[index] = data
+		while len(self.frames) > self.cache_frames:
+			self.frames.popitem(last=False)
+		if state is not None:
+			data.restore_state(state)
+		return data
@@ -0,0 +1,76 @@
+# 3x3 median filter for the g and s maps, and the cache of the maps after each number of filter passes. The filter
+# gives the same result as scipy.signal.medfilt with its default kernel, which pads the edges with zeros, but takes the
+# median of each pixel with a fixed network of min and max operations, a block of rows at a time
+
+# imports
+import numpy as np
+
+import config
+
+def _median3(x, y, z):
+	"""Returns the elementwise median of three arrays"""
+	return np.maximum(np.minimum(x, y), np.minimum(np.maximum(x, y), z))
+
+def _median_block(padded):
+	"""Returns the 3x3 median of the rows of padded that have a row above and below them, dropping the first and last
+	column. Each column of three is sorted once, and the median is then the median of the largest of the lows, the
+	median of the middles and the smallest of the highs of three neighbouring columns"""
+	a, b, c = padded[:-2], padded[1:-1], padded[2:]
+	low = np.minimum(a, b)
+	high = np.maximum(a, b)
+	mid = np.minimum(high, c)
+	np.maximum(high, c, out=high)
+	low, mid = np.minimum(low, mid), np.maximum(low, mid)
+	low = np.maximum(np.maximum(low[:, :-2], low[:, 1:-1]), low[:, 2:])
+	high = np.minimum(np.minimum(high[:, :-2], high[:, 1:-1]), high[:, 2:])
+	return _median3(low, _median3(mid[:, :-2], mid[:, 1:-1], mid[:, 2:]), high)
+
+def median3x3(image, block_bytes=config.MEDIAN_BLOCK_BYTES):
+	"""Applies a 3x3 median filter to the 2D image, with the pixels outside of it taken as 0"""
+	padded = np.pad(image, 1)
+	result = np.empty_like(image)
+	rows = int(max(1, block_bytes // max(1, padded.shape[1] * padded.itemsize)))
+	for y in range(0, image.shape[0], rows):
+		result[y:y + rows] = _median_block(padded[y:y + rows + 2])
+	return result
+
+class MedianLadder:
+	"""Keeps the g and s maps after each number of median filter passes, along with the arrays that products(g, s)
+	makes from them, so that changing the number of passes only filters from the closest number below it. Levels are
+	dropped, furthest from the last one used first, when they take up more than max_bytes"""
+	def __init__(self, g, s, products, max_bytes=config.FILTER_CACHE_MEMORY):
+		self.products = products
+		self.max_bytes = max_bytes
+		self.levels = {0: (g, s)}
+		self.made = {}
+
+	def get(self, passes):
+		"""Returns products(g, s) of the maps filtered passes times. A negative number of passes filters nothing"""
+		passes = max(0, passes)
+		if passes not in self.made:
+			start = max(level for level in self.levels if level <= passes)
+			g, s = self.levels[start]
+			for level in range(start + 1, passes + 1):
+				g, s = median3x3(g), median3x3(s)
+				self.levels[level] = (g, s)
+			self.made[passes] = self.products(g, s)
+			self.evict(passes)
+		return self.made[passes]
+
+	def size(self, level):
+		"""Returns the bytes held for level, counting arrays that are shared between its maps and products once"""
+		arrays = {id(a): a for a in self.levels.get(level, ()) + tuple(self.made.get(level, ()))}
+		return sum(a.nbytes for a in arrays.values())
+
+	def evict(self, keep):
+		"""Drops levels other than 0 and keep until the ladder is within max_bytes"""
+		levels = sorted(set(self.levels) | set(self.made), key=lambda level: abs(level - keep))
+		total = sum(self.size(level) for level in levels)
+		for level in reversed(levels):
+			if total <= self.max_bytes:
+				break
+			if level in (0, keep):
+				continue
+			total -= self.size(level)
+			self.levels.pop(level, None)
+			self.made.pop(level, None)
@@ -0,0 +1,225 @@
+# Draws the phasor clouds of several images on one matplotlib canvas, each as a density image in a colour of its own
+# with a marker at its centre. The MultiPhasorGraph window draws onto its MplWidget, while a HeadlessCanvas allows the
+# same plot to be drawn without Qt
+
+#imports
+import numpy as np
+from matplotlib.colors import to_rgb
+from scipy import ndimage
+
+from . import density
+
+class MultiPhasorPlot:
+	"""Plots multiple phasor clouds on canvas with customizable colors. canvas is a matplotlib canvas with an ax to draw
+	on, such as MplWidget.MplCanvas"""
+	def __init__(self, canvas):
+		self.canvas = canvas
+
+		x = np.linspace(0, 1, 1000)
+		y = np.sqrt(0.5 * 0.5 - (x - 0.5) * (x - 0.5))
+		self.canvas.ax.set_xlim([0, 1])
+		self.canvas.ax.set_ylim([0, 0.6])
+		self.canvas.ax.plot(x, y, 'r')
+		self.canvas.ax.set_xlabel('g', fontsize=23, weight='bold')
+		self.canvas.ax.set_ylabel('s', fontsize=23, weight='bold')
+		self.canvas.ax.tick_params(axis='both', labelsize=18)  # Adjust tick label font size
+		self.canvas.ax.spines['top'].set_visible(False)
+		self.canvas.ax.spines['right'].set_visible(False)
+
+		# Add lifetime labels on the semicircle
+		MHz = 80  # or use the actual MHz value if available
+		lifetimes = [0.5, 1, 2, 3, 4, 8]  # ns
+		omega = 2 * np.pi * MHz * 1e6
+		tau = np.array(lifetimes) * 1e-9
+		g = 1 / (1 + (omega * tau) ** 2)
+		s = (omega * tau) / (1 + (omega * tau) ** 2)
+		# Plot the dots
+		self.canvas.ax.scatter(g, s, color='r', s=12)
+		# Place the labels next to the dots
+		for i, t in enumerate(lifetimes):
+			self.canvas.ax.text(g[i]-0.04, s[i]+0.03, f"{t} ns", color='r', fontsize=15)
+		self.canvas.draw()
+
+		# Dictionary to store multiple phasor clouds
+		self.phasor_clouds = {}
+		# Dictionary to store the color or colormap for each phasor cloud
+		self.cloud_cmaps = {}  # Keeping the name for backward compatibility
+		# Dictionary to store transparency for each cloud
+		self.cloud_alphas = {}
+		# Density histogram and exact centre of each cloud, which are only calculated when its data is added
+		self.cloud_densities = {}
+		self.cloud_centres = {}
+		# Artists drawn for the clouds, which are removed before the clouds are drawn again, and restyled when only
+		# their colors or transparencies change
+		self.density_image = None
+		self.centre_markers = {}
+		self.cloud_contours = {}
+		self.drawn_clouds = []
+		self.show_contours = False
+		# Contours are drawn at these fractions of the highest density of each cloud
+		self.contour_levels = (0.1, 0.5)
+		
+		# Available direct colors (new addition)
+		self.available_colors = [
+			'red', 'blue', 'green', 'cyan', 'magenta', 'yellow', 
+			'orange', 'purple', 'lime', 'pink', 'brown', 'navy',
+			'teal', 'olive', 'maroon', 'coral', 'indigo', 'turquoise'
+		]
+
+	def add_phasor_cloud(self, cloud_id, x_data, y_data, color_or_cmap='red', alpha=0.7):
+		"""Adds a phasor cloud to the collection with a specified color/colormap and transparency"""
+		# Store the data
+		self.phasor_clouds[cloud_id] = (x_data, y_data)
+		self.cloud_densities[cloud_id], self.cloud_centres[cloud_id] = density.cloud_density(x_data, y_data)
+		# Store the color/colormap
+		self.cloud_cmaps[cloud_id] = color_or_cmap
+		# Store the transparency
+		self.cloud_alphas[cloud_id] = alpha
+		# Replot everything
+		self.plot_all_clouds()
+		
+	def remove_phasor_cloud(self, cloud_id):
+		"""Removes a phasor cloud from the collection"""
+		if cloud_id in self.phasor_clouds:
+			del self.phasor_clouds[cloud_id]
+			del self.cloud_cmaps[cloud_id]
+			del self.cloud_densities[cloud_id]
+			del self.cloud_centres[cloud_id]
+			if cloud_id in self.cloud_alphas:
+				del self.cloud_alphas[cloud_id]
+			# Replot everything
+			self.plot_all_clouds()
+			
+	def set_clouds(self, clouds):
+		"""Replaces all the phasor clouds with clouds, a list of (cloud_id, x_data, y_data, color, alpha), and draws
+		them once. A cloud that is given the same data arrays as before keeps its histogram, and when only colors and
+		transparencies changed the clouds that are drawn are restyled"""
+		phasor_clouds, densities, centres = {}, {}, {}
+		for cloud_id, x_data, y_data, color, alpha in clouds:
+			phasor_clouds[cloud_id] = (x_data, y_data)
+			old = self.phasor_clouds.get(cloud_id)
+			if old is not None and old[0] is x_data and old[1] is y_data:
+				densities[cloud_id], centres[cloud_id] = self.cloud_densities[cloud_id], self.cloud_centres[cloud_id]
+			else:
+				densities[cloud_id], centres[cloud_id] = density.cloud_density(x_data, y_data)
+		same_data = list(phasor_clouds) == self.drawn_clouds and all(
+			phasor_clouds[cloud_id][0] is self.phasor_clouds[cloud_id][0] and
+			phasor_clouds[cloud_id][1] is self.phasor_clouds[cloud_id][1] for cloud_id in phasor_clouds)
+
+		self.phasor_clouds = phasor_clouds
+		self.cloud_densities = densities
+		self.cloud_centres = centres
+		self.cloud_cmaps = {cloud_id: color for cloud_id, _, _, color, _ in clouds}
+		self.cloud_alphas = {cloud_id: alpha for cloud_id, _, _, _, alpha in clouds}
+		if same_data:
+			self.restyle_clouds()
+		else:
+			self.plot_all_clouds()
+
+	def set_cloud_colormap(self, cloud_id, color_or_cmap):
+		"""Changes the color/colormap for a specific phasor cloud"""
+		if cloud_id in self.cloud_cmaps:
+			self.cloud_cmaps[cloud_id] = color_or_cmap
+			self.restyle_clouds()
+			
+	def set_cloud_transparency(self, cloud_id, alpha):
+		"""Changes the transparency for a specific phasor cloud"""
+		if cloud_id in self.phasor_clouds:
+			self.cloud_alphas[cloud_id] = alpha
+			self.restyle_clouds()
+	
+	def set_cloud_style(self, cloud_id, color_or_cmap, alpha):
+		"""Changes the color/colormap and the transparency of a specific phasor cloud at once"""
+		if cloud_id in self.phasor_clouds:
+			self.cloud_cmaps[cloud_id] = color_or_cmap
+			self.cloud_alphas[cloud_id] = alpha
+			self.restyle_clouds()
+
+	def set_contours(self, show):
+		"""Turns the density contours of the clouds on and off"""
+		self.show_contours = bool(show)
+		self.plot_all_clouds()
+
+	def get_available_colors(self):
+		"""Returns a list of available color names"""
+		return self.available_colors
+	def set_lifetime_points(self, *args):
+		"""Adds the lifetime values to the universal circle"""
+		lifetime_x = args[0][0]
+		lifetime_y = args[0][1]
+		lifetimes = [0.5, 1, 2, 3, 4, 8]
+		self.canvas.ax.scatter(lifetime_x, lifetime_y, color='r', s=12)
+		for i in range(6):
+			self.canvas.ax.text(lifetime_x[i]-0.05, lifetime_y[i]+0.03, str(lifetimes[i]) + " ns", color='r',
+								fontsize=16)
+
+	def composite_clouds(self):
+		"""Returns the image of all the clouds, composited from their density histograms in the order they were
+		added"""
+		layers = [(self.cloud_densities[cloud_id], to_rgb(self.cloud_cmaps[cloud_id]),
+				   self.cloud_alphas.get(cloud_id, 0.3)) for cloud_id in self.phasor_clouds]
+		return density.composite(layers, density.density_shape())
+
+	def plot_all_clouds(self):
+		"""Plots all phasor clouds with their respective colors and transparency. The clouds are drawn as one image,
+		composited from their density histograms, so the time it takes depends on the size of the plot rather than
+		the number of points"""
+		ax = self.canvas.ax
+		if self.density_image is not None:
+			self.density_image.remove()
+		for artist in list(self.centre_markers.values()) + list(self.cloud_contours.values()):
+			artist.remove()
+		self.density_image = None
+		self.centre_markers = {}
+		self.cloud_contours = {}
+		self.drawn_clouds = list(self.phasor_clouds)
+
+		if self.phasor_clouds:
+			self.density_image = ax.imshow(
+				self.composite_clouds(),
+				extent=density.G_RANGE + density.S_RANGE,
+				origin='lower',
+				interpolation='nearest',
+				aspect='auto',
+				zorder=0
+			)
+
+		g_centres, s_centres = density.bin_centres(density.density_shape())
+		for cloud_id in self.phasor_clouds:
+			color = self.cloud_cmaps[cloud_id]
+			cloud_density = self.cloud_densities[cloud_id]
+			if self.show_contours and cloud_density.max() > 0:
+				# The histogram is smoothed so that the contours follow the shape of the cloud rather than the noise
+				smooth = ndimage.gaussian_filter(cloud_density, 2)
+				self.cloud_contours[cloud_id] = ax.contour(
+					g_centres, s_centres, smooth,
+					levels=smooth.max() * np.asarray(self.contour_levels),
+					colors=[color],
+					linewidths=1.0
+				)
+
+			# Plot the exact center point with a distinctive appearance
+			mean_x, mean_y = self.cloud_centres[cloud_id]
+			if np.isfinite(mean_x):
+				self.centre_markers[cloud_id] = ax.scatter(
+					mean_x, mean_y,
+					color=color,  # Same color as the cloud
+					s=200,	# Larger point size for visibility
+					marker='X',	 # Distinctive marker
+					edgecolors='black',
+					linewidths=1.5,
+					zorder=10,	# Ensure it's drawn on top
+					label=f'Center ({mean_x:.2f}, {mean_y:.2f})'
+				)
+		self.canvas.draw()
+
+	def restyle_clouds(self):
+		"""Applies the colors and transparencies of the clouds to the artists that are drawn, without recalculating
+		their histograms"""
+		if self.density_image is not None:
+			self.density_image.set_data(self.composite_clouds())
+		for cloud_id, marker in self.centre_markers.items():
+			marker.set_facecolor(self.cloud_cmaps[cloud_id])
+		for cloud_id, contour in self.cloud_contours.items():
+			contour.set_edgecolor(self.cloud_cmaps[cloud_id])
+		self.canvas.draw_idle()
@@ -0,0 +1,575 @@
+# Holds the phasor data of a single image and all the calculations done on it, without creating any windows. The
+# ImageHandler class displays a PhasorData object, while batch processing and scripts can use it directly.
+
+# imports
+import functools
+import numpy as np
+import os
+
+import config
+from image_loader.image_loader import ImageLoader
+from .transform import phasor_weights, phasor_sums, phasor_coordinates
+from .cache import PhasorCache
+from .bins import PhasorBins
+from .median import MedianLadder
+from . import export
+from . import colormap
+
+np.seterr(divide='ignore', invalid='ignore')
+
+class PhasorData:
+	"""Holds the intensity image, the g and s coordinates, the masks and the lifetime maps of one FLIM image. It is
+	created from the intensity and the uncalibrated g and s maps of one or more harmonics, which are calculated from
+	the (bins, Y, X) stack by from_file or from_stack. The coordinates and maps are those of the active harmonic"""
+
+	def __init__(self, name, intensity, raw_g, raw_s, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1,
+				 harmonics=None):
+		self.name = name
+		self.original_image = intensity
+		self.max = np.max(self.original_image)
+		self.min = np.min(self.original_image)
+		self.compress_image(self.original_image)
+
+		self.phi_cal = float(phi_cal)
+		self.m_cal = float(m_cal)
+		self.bin_width = float(bin_width)
+		self.freq = float(freq)
+		self.harmonic = float(harmonic)
+
+		# Uncalibrated (harmonics, Y, X) coordinates of every harmonic that was calculated
+		self.harmonics = tuple(float(h) for h in (harmonics if harmonics is not None else [harmonic]))
+		self.raw_g = np.asarray(raw_g).reshape((len(self.harmonics),) + self.original_image.shape)
+		self.raw_s = np.asarray(raw_s).reshape((len(self.harmonics),) + self.original_image.shape)
+
+		# Record the calibrated fft coordinates as g and s
+		self.g, self.s = self.calibrate(*self.raw_coordinates())
+		self.xcoor_map = self.g.reshape(self.original_image.shape)
+		self.x_adjusted = self.xcoor_map.copy()
+
+		self.ycoor_map = self.s.reshape(self.original_image.shape)
+		self.y_adjusted = self.ycoor_map.copy()
+
+		self.plot_angle_mask = np.zeros(self.original_image.shape, dtype=bool)
+		self.plot_circle_mask = np.zeros(self.original_image.shape, dtype=bool)
+		self.plot_fraction_mask = np.zeros(self.original_image.shape, dtype=bool)
+		self.intensity_mask = np.zeros(self.original_image.shape, dtype=bool)
+
+		self.angle_arr = self.ycoor_map / self.xcoor_map
+		self.distance_arr = np.sqrt(self.ycoor_map ** 2 + self.xcoor_map ** 2)
+		self.fraction_arr = self.distance_arr
+		self.color_map = np.zeros(self.original_image.shape + (4,), dtype=bool)
+
+		# Coordinates and radii of the red, green, blue and yellow selection circles
+		self.circle_coors = np.full((4, 2), -3.0)
+		self.circle_radius = [0.05, 0.05, 0.05, 0.05]
+
+		self.color_map_select = 0
+		self.min_thresh = 0
+		self.max_thresh = 1000000
+		self.x_fraction = 0
+		self.y_fraction = 0
+		# Lifetime in ns that the fraction centre was placed at, which moves the centre when the harmonic changes, or
+		# None when the centre was placed at coordinates
+		self.fraction_lifetime = None
+		self.num_filter = 0
+
+		self.image_min_ang, self.image_max_ang = 0, 90
+		self.applied_min_ang, self.applied_max_ang = 0, 90
+		self.image_min_M, self.image_max_M = 0, 120
+		self.applied_min_M, self.applied_max_M = 0, 120
+		self.fraction_min, self.fraction_max = 0, 1
+
+		# Each mask and product is only recalculated when its inputs change. versions counts the changes of each input,
+		# and built holds the inputs that each mask or product was last calculated from
+		self.versions = dict.fromkeys(('calibration', 'coordinates', 'fraction', 'masks', 'cursors'), 0)
+		self.built = {}
+		self.mask = None
+		self.frame = None
+		self.display_changed = True
+
+		# Resolution of the phasor bins that the selections are evaluated on, or 0 to evaluate them on every pixel
+		self.phasor_bins = config.PHASOR_BINS
+		self.fraction_center = (self.x_fraction, self.y_fraction)
+
+	@classmethod
+	def from_file(cls, filename, channel=0, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1,
+				  harmonics=None, cache=None, progress=None):
+		"""Calculates the phasor data of the image stored at filename. The loader reads the stack in tiles or time
+		bins where it can, so the whole stack is never held in memory. All the harmonics are calculated in the same
+		pass, by default those in config.HARMONICS and harmonic, which is the one that is active. The sums are taken
+		from cache, a PhasorCache, if the file was opened before with the same settings.
+
+		progress(stage, fraction) is called while the file is read, with stage 'read', and while the coordinates are
+		calculated from the sums, with stage 'transform'. The load can be stopped by raising an exception from it"""
+		progress = progress if progress is not None else lambda stage, fraction: None
+		harmonics = cls.harmonic_set(harmonic, harmonics)
+		cache = PhasorCache() if cache is None else cache
+		key = None
+		sums = None
+		if cache.enabled:
+			key = cls.cache_key(cache, filename, channel, bin_width, freq, harmonics)
+			sums = cache.get(key)
+		if sums is None:
+			weights = functools.partial(phasor_weights, bin_width=float(bin_width), freq=float(freq),
+										harmonic=harmonics)
+			sums = ImageLoader.load_sums(filename, channel, weights, lambda fraction: progress('read', fraction))
+			if key is not None:
+				cache.put(key, sums)
+		progress('read', 1.0)
+		name = os.path.splitext(os.path.basename(filename))[0]
+		progress('transform', 0.0)
+		data = cls(name, *phasor_coordinates(sums), phi_cal, m_cal, bin_width, freq, harmonic, harmonics)
+		progress('transform', 1.0)
+		return data
+
+	@classmethod
+	def from_file_channels(cls, filename, channels=None, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1,
+						   harmonics=None, cache=None, progress=None):
+		"""Calculates the phasor data of several detector channels of the image stored at filename, all of them by
+		default. The channels that aren't in cache are read from the file in one pass, and each channel is cached on its
+		own, so that it can be opened again without the others. Returns a PhasorData for each channel, named after the
+		file and the channel. progress is called as in from_file"""
+		progress = progress if progress is not None else lambda stage, fraction: None
+		harmonics = cls.harmonic_set(harmonic, harmonics)
+		cache = PhasorCache() if cache is None else cache
+		loader = ImageLoader.from_file(filename)
+		channels = list(range(loader.channel_count(filename))) if channels is None else list(channels)
+		keys = {}
+		sums = {}
+		if cache.enabled:
+			for channel in channels:
+				keys[channel] = cls.cache_key(cache, filename, channel, bin_width, freq, harmonics)
+				found = cache.get(keys[channel])
+				if found is not None:
+					sums[channel] = found
+		missing = [channel for channel in channels if channel not in sums]
+		if missing:
+			weights = functools.partial(phasor_weights, bin_width=float(bin_width), freq=float(freq),
+										harmonic=harmonics)
+			read = loader.load_channel_sums(filename, missing, weights, lambda fraction: progress('read', fraction))
+			for channel, channel_sums in zip(missing, read):
+				sums[channel] = channel_sums
+				if channel in keys:
+					cache.put(keys[channel], channel_sums)
+		progress('read', 1.0)
+		name = os.path.splitext(os.path.basename(filename))[0]
+		progress('transform', 0.0)
+		datasets = [cls('%s_ch%d' % (name, channel), *phasor_coordinates(sums[channel]), phi_cal, m_cal, bin_width,
+						freq, harmonic, harmonics) for channel in channels]
+		progress('transform', 1.0)
+		return datasets
+
+	@staticmethod
+	def cache_key(cache, filename, channel, bin_width, freq, harmonics):
+		"""Returns the key that the sums of a channel of filename are kept under in cache"""
+		return cache.key(filename, channel=int(channel), bin_width=float(bin_width), freq=float(freq),
+						 harmonics=tuple(harmonics))
+
+	@classmethod
+	def from_stack(cls, image, name, phi_cal=0, m_cal=1, bin_width=0.2208, freq=80, harmonic=1, harmonics=None):
+		"""Calculates the phasor data of a (bins, Y, X) stack"""
+		harmonics = cls.harmonic_set(harmonic, harmonics)
+		weights = functools.partial(phasor_weights, bin_width=float(bin_width), freq=float(freq), harmonic=harmonics)
+		sums = phasor_sums(image, weights)
+		return cls(name, *phasor_coordinates(sums), phi_cal, m_cal, bin_width, freq, harmonic, harmonics)
+
+	@staticmethod
+	def harmonic_set(harmonic, harmonics=None):
+		"""Returns the sorted harmonics to calculate, which always include harmonic"""
+		harmonics = config.HARMONICS if harmonics is None else harmonics
+		return sorted(set(float(h) for h in harmonics) | {float(harmonic)})
+
+	def raw_coordinates(self):
+		"""Returns the uncalibrated g and s maps of the active harmonic"""
+		index = self.harmonics.index(self.harmonic)
+		return self.raw_g[index], self.raw_s[index]
+
+	def set_harmonic(self, harmonic):
+		"""Switches the g and s coordinates to another of the harmonics that were calculated when the image was loaded,
+		and recalculates the lifetime maps and masks with the current filters and thresholds"""
+		self.harmonic = float(harmonic)
+		self.update_coordinates()
+
+	def set_calibration(self, phi_cal, m_cal):
+		"""Applies new calibration values to the uncalibrated coordinates, and recalculates the lifetime maps and masks
+		with the current filters and thresholds"""
+		self.phi_cal = float(phi_cal)
+		self.m_cal = float(m_cal)
+		self.update_coordinates()
+
+	def update_coordinates(self):
+		"""Calibrates the coordinates of the active harmonic again and reapplies the filters, ranges and selection
+		circles to them"""
+		self.g, self.s = self.calibrate(*self.raw_coordinates())
+		self.xcoor_map = self.g.reshape(self.original_image.shape)
+		self.ycoor_map = self.s.reshape(self.original_image.shape)
+		self.versions['calibration'] += 1
+		# A centre placed at a lifetime is at another place on the phasor of another harmonic
+		if self.fraction_lifetime is not None:
+			self.fraction_lifetime_map(self.fraction_lifetime)
+		self.convolution(self.num_filter)
+		self.update_angle_range(self.applied_min_ang, self.applied_max_ang)
+		self.update_circle_range(self.applied_min_M, self.applied_max_M)
+		self.update_fraction_range(self.fraction_min * 100, self.fraction_max * 100)
+		self.update_circle(self.circle_coors.copy(), self.circle_radius)
+
+	def analysis_state(self):
+		"""Returns the harmonic, calibration, filters, thresholds, ranges, distance settings, selection circles and
+		colormap of the data, which restore_state applies to other data of the same kind"""
+		return {
+			'harmonic': self.harmonic, 'phi_cal': self.phi_cal, 'm_cal': self.m_cal, 'filters': self.num_filter,
+			'intensity': (self.min_thresh, self.max_thresh), 'angle': (self.applied_min_ang, self.applied_max_ang),
+			'modulation': (self.applied_min_M, self.applied_max_M),
+			'fraction_center': (self.x_fraction, self.y_fraction), 'fraction_lifetime': self.fraction_lifetime,
+			'fraction_range': (self.fraction_min, self.fraction_max),
+			'circles': self.circle_coors.copy(), 'radii': list(self.circle_radius), 'colormap': self.color_map_select
+		}
+
+	def restore_state(self, state):
+		"""Applies the settings from analysis_state to the data. Settings that are already applied aren't calculated
+		again. A harmonic that wasn't calculated for this data leaves the active harmonic as it is"""
+		harmonic = float(state['harmonic']) if float(state['harmonic']) in self.harmonics else self.harmonic
+		if (self.harmonic, self.phi_cal, self.m_cal) != (harmonic, state['phi_cal'], state['m_cal']):
+			self.harmonic = harmonic
+			self.phi_cal, self.m_cal = float(state['phi_cal']), float(state['m_cal'])
+			self.update_coordinates()
+		self.convolution(state['filters'])
+		# States saved before the lifetime was kept only have the centre
+		lifetime = state.get('fraction_lifetime')
+		if lifetime is not None:
+			if self.fraction_lifetime != lifetime:
+				self.fraction_lifetime_map(lifetime)
+		elif (self.x_fraction, self.y_fraction) != tuple(state['fraction_center']):
+			self.fraction_coor_map(*state['fraction_center'])
+		self.update_threshold(*state['intensity'])
+		self.update_angle_range(*state['angle'])
+		self.update_circle_range(*state['modulation'])
+		self.update_fraction_range(state['fraction_range'][0] * 100, state['fraction_range'][1] * 100)
+		self.update_circle(np.asarray(state['circles']), state['radii'])
+		self.color_map_select = state['colormap']
+
+	def colormaps(self, mask):
+		"""Calculates the colour of every pixel in the selected colormap, as indices into the lookup table of the
+		colormap, and stores both as self.frame"""
+		frame = self.colormap_frame(self.color_map_select, mask)
+		if frame is not None:
+			indices, table, props = frame
+			self.frame = indices, table
+			for name, value in props.items():
+				setattr(self, name, value)
+
+	def colormap_frame(self, select, mask):
+		"""Calculates the colour of every pixel in colormap select, as indices into the lookup table of the colormap,
+		without changing the data. Returns the indices, the table and a dict of the attributes that showing the
+		colormap updates, such as the range of the image"""
+		props = {}
+		#Greyscale Intensity colourmap
+		if select == 0:
+			im = self.original_image.copy()
+			if len(im[~mask]) != 0:
+				im = ((im - np.min(im[~mask])) * (1 / (np.max(im[~mask]) - np.min(im[~mask])) * 255))
+			return im.astype('uint8'), colormap.grey_table(), props
+
+		#TauM colourmap
+		elif select == 1:
+			arr = self.distance_arr.copy()
+			arr[arr < 0] = 0
+			arr[mask] = 0
+			if len(arr[~mask]) != 0:
+				props['image_min_M'] = np.min(arr[~mask])
+				props['image_max_M'] = np.max(arr[~mask])
+				arr = (arr - self.applied_min_M/100) * (1 / (self.applied_max_M/100 - self.applied_min_M/100))
+			else:
+				props['image_min_M'] = np.min(arr)
+				props['image_max_M'] = np.max(arr)
+			return colormap.color_indices(arr, 20), colormap.lookup_table('viridis_r', 20), props
+
+		# TauP colourmap
+		elif select == 2:
+			arr = self.angle_arr.copy()
+			arr[arr < 0] = 0
+			np.nan_to_num(arr, copy=False)
+			if len(arr[~mask]) != 0:
+				image_min_ang = np.tan(np.deg2rad(self.applied_min_ang))
+				image_max_ang = np.tan(np.deg2rad(self.applied_max_ang))
+				arr = (arr - image_min_ang) * (1 / (image_max_ang - image_min_ang))
+			else:
+				image_min_ang = np.min(arr)
+				image_max_ang = np.max(arr)
+			props['image_min_ang'], props['image_max_ang'] = image_min_ang, image_max_ang
+			return colormap.color_indices(arr, 20), colormap.lookup_table('viridis', 20), props
+
+		#Jet instensity colourmap
+		elif select == 3:
+			im = np.array(self.original_image.copy(), dtype = np.int64)
+			if len(im[~mask]) != 0:
+				im = ((im - np.min(im[~mask])) * (1 / (np.max(im[~mask]) - np.min(im[~mask]))))
+			return colormap.color_indices(im, 20), colormap.lookup_table('viridis', 20), props
+
+		# Fraction Bound colourmap.
+		elif select == 4:
+			arr = self.fraction_arr.copy()
+			arr[arr < 0] = 0
+			if len(arr[~mask]) != 0:
+				arr = (arr - self.fraction_min) * (1 / (self.fraction_max - self.fraction_min))
+			else:
+				props['fraction_min'] = np.min(arr)
+				props['fraction_max'] = np.max(arr)
+			return colormap.color_indices(arr, 20), colormap.lookup_table('jet', 20), props
+		return None
+
+	def compress_image(self, im):
+		"""Converts the image to be normalized and in the proper format to be displayed"""
+		im = ((im - self.min) * (1 / (self.max - self.min) * 255)).astype('uint8')
+		im = np.stack((im,) * 3, axis=-1)
+		self.displayImage = im
+
+	def rebuild(self, name, inputs):
+		"""Returns True if the product name was last built from different inputs, and records inputs as its new ones"""
+		if self.built.get(name) == inputs:
+			return False
+		self.built[name] = inputs
+		return True
+
+	def bins(self, coordinates):
+		"""Returns the PhasorBins of the calibrated coordinates ('calibrated', which the cursors and the distance band
+		use) or of the filtered ones ('filtered', which the angle and modulation ranges use). The index is made again
+		when the coordinates change"""
+		if coordinates == 'calibrated':
+			g, s, version = self.xcoor_map, self.ycoor_map, self.versions['calibration']
+		else:
+			g, s, version = self.x_adjusted, self.y_adjusted, self.versions['coordinates']
+		if self.rebuild((coordinates, 'bins'), (version, self.phasor_bins)):
+			setattr(self, coordinates + '_bins', PhasorBins(g, s, self.phasor_bins))
+		return getattr(self, coordinates + '_bins')
+
+	def update_circle(self, circle_coor, radii):
+		"""Colors the image based on the coordinates and radii of the four selection circles. Only the circles that
+		moved or changed size are recalculated"""
+		self.circle_coors[...] = circle_coor
+		self.circle_radius = list(radii)
+		for i in range(4):
+			inputs = (float(circle_coor[i, 0]), float(circle_coor[i, 1]), float(radii[i]), self.versions['coordinates'])
+			if self.rebuild(('circle', i), inputs):
+				x, y, radius = circle_coor[i, 0], circle_coor[i, 1], radii[i]
+				if self.phasor_bins:
+					self.color_map[..., i] = self.bins('calibrated').evaluate(
+						lambda g, s: (x - g) ** 2 + (y - s) ** 2 < radius ** 2)
+				else:
+					self.color_map[..., i] = (x - self.xcoor_map) ** 2 + (y - self.ycoor_map) ** 2 < radius ** 2
+				self.versions['cursors'] += 1
+
+	def clear_circles(self):
+		"""Removes the circles from the colormap"""
+		self.circle_coors[:] = -3.0
+		self.color_map[...] = False
+		for i in range(4):
+			self.built.pop(('circle', i), None)
+		self.versions['cursors'] += 1
+
+	def update_circle_range(self, min, max):
+		"""Updates the mask based on the TauM modulation thresholds"""
+		self.applied_min_M, self.applied_max_M = min, max
+		if self.rebuild('circle mask', (min, max, self.versions['coordinates'])):
+			if self.phasor_bins:
+				def outside(g, s):
+					distance = np.sqrt(s ** 2 + g ** 2)
+					return np.logical_or(distance > (max / 100), distance < (min / 100))
+				self.plot_circle_mask = self.bins('filtered').evaluate(outside)
+			else:
+				self.plot_circle_mask = np.logical_or(self.distance_arr > (max / 100), self.distance_arr < (min / 100))
+			self.versions['masks'] += 1
+
+	def update_fraction_range(self, min, max):
+		"""Updates the mask based on the fraction bound thresholds"""
+		self.fraction_min = min / 100
+		self.fraction_max = max / 100
+		if self.rebuild('fraction mask', (min, max, self.versions['fraction'])):
+			if self.phasor_bins:
+				def outside(g, s):
+					distance = np.sqrt((s - self.fraction_center[1]) ** 2 + (g - self.fraction_center[0]) ** 2)
+					return np.logical_or(distance > max / 100, distance < min / 100)
+				self.plot_fraction_mask = self.bins('calibrated').evaluate(outside)
+			else:
+				self.plot_fraction_mask = np.logical_or(self.fraction_arr > max / 100, self.fraction_arr < min / 100)
+			self.versions['masks'] += 1
+
+	def update_angle_range(self, min, max):
+		"""Updates the mask based on the TauP angle thresholds"""
+		self.applied_min_ang, self.applied_max_ang = min, max
+		if self.rebuild('angle mask', (min, max, self.versions['coordinates'])):
+			min = np.tan(np.deg2rad(min))
+			max = np.tan(np.deg2rad(max))
+			if self.phasor_bins:
+				self.plot_angle_mask = self.bins('filtered').evaluate(lambda g, s: np.logical_or(s / g > max, s / g < min))
+			else:
+				self.plot_angle_mask = np.logical_or(self.angle_arr > max, self.angle_arr < min)
+			self.versions['masks'] += 1
+
+	def update_threshold(self, min, max):
+		"""Creates an intensity mask based on the threshold by the user through min and max"""
+		self.min_thresh = min
+		self.max_thresh = max
+		if self.rebuild('intensity mask', (min, max)):
+			self.intensity_mask = np.logical_or(self.original_image < min, self.original_image > max)
+			self.versions['masks'] += 1
+
+	def combined_mask(self):
+		"""Returns the mask of every pixel that is outside one of the thresholds. The mask is shared between calls
+		until one of the masks changes, so it must not be modified"""
+		if self.rebuild('combined mask', (self.versions['masks'], self.versions['coordinates'])):
+			mask = self.plot_angle_mask | self.plot_circle_mask | self.intensity_mask | self.plot_fraction_mask
+			self.mask = np.logical_or(mask, self.x_adjusted < 0)
+		return self.mask
+
+	def apply_masks(self):
+		"""Renders the selected colormap and sets parts of the image outside the thresholds on the plot to black. The
+		colour indices of the colormap are only calculated again when the masks, the data or the ranges change, and
+		the selection circles are only drawn again when they move. display_changed tells whether displayImage is
+		different from the last call"""
+		mask = self.combined_mask()
+		inputs = (self.color_map_select, self.versions['masks'], self.versions['coordinates'],
+				  self.versions['fraction'], self.applied_min_ang, self.applied_max_ang, self.applied_min_M,
+				  self.applied_max_M, self.fraction_min, self.fraction_max)
+		if self.rebuild('frame', inputs):
+			self.colormaps(mask)
+		elif not self.rebuild('cursors', (inputs, self.versions['cursors'])):
+			self.display_changed = False
+			return mask
+		self.built['cursors'] = (inputs, self.versions['cursors'])
+		# The colormap, the selection circles and the mask are turned into RGB in one lookup, into the same buffer
+		self.displayImage = colormap.render(*self.frame, self.cursor_overlay(), mask, out=self.displayImage)
+		self.display_changed = True
+		return mask
+
+	def cursor_overlay(self):
+		"""Returns the overlay colour index of every pixel that is inside a selection circle, which is kept until the
+		circles move"""
+		if self.rebuild('overlay', self.versions['cursors']):
+			self.overlay = colormap.overlay_indices(self.color_map)
+		return self.overlay
+
+	def lifetime_maps(self):
+		"""Returns the TauP, TauM and distance maps, with the pixels outside the thresholds set to nan. The maps are
+		kept until the masks, the coordinates or the distance map change, and must not be modified"""
+		if self.rebuild('lifetime maps', (self.versions['masks'], self.versions['coordinates'],
+										  self.versions['fraction'])):
+			mask = self.combined_mask()
+			omega = 2 * np.pi * self.freq / 1000 * self.harmonic
+			tau_p = 1 / omega * self.angle_arr
+			tau_p[mask] = float("nan")
+			tau_m = 1 / omega * np.sqrt(1 / np.power(self.distance_arr, 2) - 1)
+			tau_m[mask] = float("nan")
+			frac = self.fraction_arr.copy()
+			frac[mask] = float("nan")
+			self.lifetimes = tau_p, tau_m, frac
+		return self.lifetimes
+
+	def thresholded_coordinates(self):
+		"""Returns the filtered g and s coordinates of the pixels inside the intensity threshold, which are the points
+		shown on the phasor plot. The same arrays are returned until the threshold or the coordinates change"""
+		if self.rebuild('thresholded', (self.min_thresh, self.max_thresh, self.versions['coordinates'])):
+			thresh = np.logical_or(self.original_image < self.min_thresh, self.original_image > self.max_thresh)
+			self.thresholded = self.x_adjusted[~thresh], self.y_adjusted[~thresh]
+		return self.thresholded
+
+	def visible_coordinates(self):
+		"""Returns the filtered g and s coordinates of the pixels that pass all the thresholds. The same arrays are
+		returned until the masks or the coordinates change"""
+		if self.rebuild('visible', (self.versions['masks'], self.versions['coordinates'])):
+			mask = self.combined_mask()
+			self.visible = self.x_adjusted[~mask].flatten(), self.y_adjusted[~mask].flatten()
+		return self.visible
+
+	def get_image_params(self):
+		"""Returns image parameters"""
+		return self.name, self.original_image.shape
+
+	def calibrate(self, g, s):
+		"""Rotates the uncalibrated g and s coordinates by phi_cal and scales them by m_cal"""
+		# Apply rotation matrix and calibration in a vectorized manner
+		cos_phi, sin_phi = np.cos(self.phi_cal), np.sin(self.phi_cal)
+		g_cal = g * cos_phi - s * sin_phi
+		s_cal = g * sin_phi + s * cos_phi
+
+		g_coor = (g_cal * self.m_cal).flatten()
+		s_coor = (s_cal * self.m_cal).flatten()
+		return g_coor, s_coor
+
+	def change_colormap(self, val):
+		"""Changes the colormap to the value val. 0=densitymap, 1=TauM, 2=TauP, 3=densitymap, 4=fractionBound"""
+		if val == 0 and self.color_map_select == 0:
+			self.color_map_select = 3
+		elif val == 0 and self.color_map_select != 3:
+			self.color_map_select = 3
+		else:
+			self.color_map_select = val
+
+	def fraction_lifetime_map(self, lifetime):
+		"""Creates the mapping of the coordinates in the plot based on their distance from the lifetime of the
+		fluorophore entered by the user. For example, 0.4ns for NADH."""
+		self.x_fraction = 1 / (1 + np.power(2 * np.pi * self.freq / 1000 * self.harmonic * lifetime, 2))
+		self.y_fraction = 2 * np.pi * self.freq / 1000 * self.harmonic * lifetime / (
+			1 + np.power(2 * np.pi * self.freq / 1000 * self.harmonic * lifetime, 2))
+		self.fraction_arr = np.sqrt((self.ycoor_map - self.y_fraction) ** 2 + (self.xcoor_map - self.x_fraction) ** 2)
+		self.fraction_center = (self.x_fraction, self.y_fraction)
+		self.fraction_lifetime = lifetime
+		self.versions['fraction'] += 1
+		return self.x_fraction, self.y_fraction
+
+	def fraction_coor_map(self, x_coor, y_coor):
+		"""Creates the mapping of the coordinates in the plot based on their distance from the coordinates entered by
+		the user."""
+		self.x_fraction = x_coor
+		self.y_fraction = y_coor
+		self.fraction_lifetime = None
+		self.fraction_arr = np.sqrt((self.ycoor_map - self.y_fraction) ** 2 + (self.xcoor_map - self.x_fraction) ** 2)
+		self.fraction_center = (self.x_fraction, self.y_fraction)
+		self.versions['fraction'] += 1
+
+	def set_fraction_coordinates(self, x_coor, y_coor):
+		self.x_fraction = x_coor
+		self.y_fraction = y_coor
+		self.fraction_lifetime = None
+
+	def get_phasor_lifetime_coordinates(self):
+		"""Gets the coordinates for the points along the universal circles, which are used a reference when looking
+		at the plots"""
+		points = np.asarray([0.5, 1, 2, 3, 4, 8])
+		omega = 2 * np.pi * self.freq / 1000 * self.harmonic
+		x_coors = 1 / (1 + np.power(omega * points, 2))
+		y_coors = omega * points / (1 + np.power(omega * points, 2))
+		return x_coors, y_coors
+
+	def convolution(self, num_filter):
+		"""Applies a 3x3 convolutional median filter to the graph data num_filter times. See:
+		https://doi.org/10.1038/s41596-018-0026-5"""
+		self.num_filter = num_filter
+		if not self.rebuild('convolution', (num_filter, self.versions['calibration'])):
+			return
+		# The maps after each number of filters are kept until the calibration changes, so changing the number of
+		# filters filters the maps once at most
+		if self.rebuild('filter_levels', self.versions['calibration']):
+			self.filter_levels = MedianLadder(self.g.reshape(self.original_image.shape),
+											  self.s.reshape(self.original_image.shape), self.filtered_maps)
+		self.x_adjusted, self.y_adjusted, self.angle_arr, self.distance_arr = self.filter_levels.get(num_filter)
+		self.fraction_arr = np.sqrt((self.ycoor_map - self.y_fraction) ** 2 + (self.xcoor_map - self.x_fraction) ** 2)
+		self.fraction_center = (self.x_fraction, self.y_fraction)
+		self.versions['coordinates'] += 1
+		self.versions['fraction'] += 1
+
+	@staticmethod
+	def filtered_maps(g, s):
+		"""Returns the filtered g and s maps, and the angle and distance maps made from them. The filtered maps are
+		shared with the filter cache, so they must not be changed in place"""
+		if (g == 0).any():
+			g = g.copy()
+			g[g == 0] = -0.1
+		return g, s, s / g, np.sqrt(s ** 2 + g ** 2)
+
+	def save_data(self, file, save_type, plot=None, container=None):
+		"""Saves all the images of the various colormaps, the g and s coordinates, and a file that contains all the
+		parameters used to create the data, without changing the data. The phasor plot of each colormap is saved
+		alongside its image when plot, a PhasorPlot that isn't shown in a window, is given, and the maps are written to
+		a single file when container, one of container.FORMATS, is given. See export.save_data"""
+		export.save_data(self, file, save_type, plot, container)
@@ -0,0 +1,354 @@
+# Draws the phasor plot of the data onto a matplotlib canvas, including the colormaps, the ranges specified by the
+# user and the selection circles. The Graph window draws onto its MplWidget, while HeadlessCanvas allows the same plot
+# to be rendered and saved without Qt.
+
+#imports
+import numpy as np
+import matplotlib
+import matplotlib.patches as patches
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.image import NonUniformImage
+
+class HeadlessCanvas(FigureCanvasAgg):
+	"""Canvas with the same axis layout as MplWidget.MplCanvas, which renders without a window"""
+	def __init__(self):
+		self.fig = Figure()
+		# [left, bottom, width, height]
+		self.ax = self.fig.add_axes([0.15, 0.19, 0.8, 0.75])
+		FigureCanvasAgg.__init__(self, self.fig)
+
+	def save_fig(self, file):
+		self.fig.savefig(file)
+
+
+class PhasorPlot:
+	"""Plots the phasor data on canvas, and colors it based on the thresholding parameters that the user enters.
+	canvas is a matplotlib canvas with an ax to draw on, such as MplWidget.MplCanvas.
+
+	The artists are made once and then only given new data. The range lines and the selection circles are animated:
+	they aren't part of a full draw, but are drawn over a copy of the rest of the plot, so that moving them doesn't
+	redraw the histogram"""
+	def __init__(self, canvas):
+		self.canvas = canvas
+
+		x = np.linspace(0, 1, 1000)
+		y = np.sqrt(0.5 * 0.5 - (x - 0.5) * (x - 0.5))
+		self.canvas.ax.set_xlim([0, 1])
+		self.canvas.ax.set_ylim([0, 0.6])
+		self.canvas.ax.plot(x, y, 'r')
+		self.canvas.ax.set_xlabel('g', fontsize=23, weight='bold')
+		self.canvas.ax.set_ylabel('s', fontsize=23, weight='bold')
+		self.canvas.ax.tick_params(axis='both', labelsize=18)  # Adjust tick label font size
+		self.canvas.ax.spines['top'].set_visible(False)
+		self.canvas.ax.spines['right'].set_visible(False)
+
+		# load the range lines horizontally and vertically
+		y = np.tan((np.radians(0)) * x - 0.001)
+		self.min_line, = self.canvas.ax.plot(x, y, color='r')
+
+		y = np.tan(np.radians(90)) * x
+		self.max_line, = self.canvas.ax.plot(x, y, color='r')
+
+		self.min_circle, = self.canvas.ax.plot(x, y, color='r')
+		self.max_circle, = self.canvas.ax.plot(x, y, color='r')
+
+		self.circle_coors = np.full((4, 2),-3.0)
+		self.circle_radius = [0.05, 0.05, 0.05, 0.05]
+
+		self.circle_fraction_min = patches.Circle((0, 0), 0, ec='r', fill=0, lw=1.5)
+		self.circle_fraction_max = patches.Circle((0, 0), 1.2, ec='r', fill=0, lw=1.5)
+
+		self.canvas.ax.add_patch(self.circle_fraction_min)
+		self.canvas.ax.add_patch(self.circle_fraction_max)
+
+		self.circler = patches.Circle((-2, -2), 0.05, ec='r', fill=0, alpha=0.7, lw=2.5)
+		self.circleg = patches.Circle((-2, -2), 0.05, ec='g', fill=0, alpha=0.7, lw=2.5)
+		self.circleb = patches.Circle((-2, -2), 0.05, ec='b', fill=0, alpha=0.7, lw=2.5)
+		self.circley = patches.Circle((-2, -2), 0.05, ec='y', fill=0, alpha=0.7, lw=2.5)
+
+		self.canvas.ax.add_patch(self.circler)
+		self.canvas.ax.add_patch(self.circleg)
+		self.canvas.ax.add_patch(self.circleb)
+		self.canvas.ax.add_patch(self.circley)
+
+		# Drawn over the background in this order, which is the order a full draw would draw them in
+		self.overlays = [self.circle_fraction_min, self.circle_fraction_max, self.circler, self.circleg,
+						 self.circleb, self.circley, self.min_line, self.max_line, self.min_circle, self.max_circle]
+		for artist in self.overlays:
+			artist.set_animated(True)
+
+		self.angle_min_val = 0
+		self.angle_max_val = 90
+		self.circle_min_val = 0
+		self.circle_max_val = 120
+		self.fraction_min = 0
+		self.fraction_max = 1.2
+		self.line_alpha = 1.0
+
+		self.image_min_ang, self.image_max_ang = 0, 90
+		self.image_min_M, self.image_max_M = 0, 120
+
+		self.color_map = 0 #0=densitymap, 1=TauM, 2=TauP, 3=densitymap, 4=fractionBound
+
+		self.cmap = matplotlib.cm.viridis.copy()
+		self.cmap_r = matplotlib.cm.viridis_r.copy()
+		self.cmap.set_bad('k', alpha=0)
+		self.cmap_noir = matplotlib.cm.Greys.copy()
+
+		# One image on top which has all the colours, and one image on the bottom which is just black to show the
+		# points which are outside of the thresholding. The colours of an image can't be changed once it has data, so
+		# there is a top image for each colormap, and only the one in use is shown. They are added to the plot once
+		# they have data
+		self.image_back = NonUniformImage(self.canvas.ax, interpolation='bilinear', cmap=self.cmap_noir)
+		self.image = NonUniformImage(self.canvas.ax, interpolation='bilinear', cmap=self.cmap)
+		self.image_r = NonUniformImage(self.canvas.ax, interpolation='bilinear', cmap=self.cmap_r)
+
+		self.x_fraction = 0
+		self.y_fraction = 0
+		self.circleSelect = 0
+		self.lifetime_points = []
+		self.histogram = None
+
+		# Copy of the canvas without the animated artists, taken after every full draw
+		self.background = None
+		self.background_stale = True
+		self.saving = False
+		self.canvas.mpl_connect('draw_event', self.on_draw)
+
+	def plot_data(self, x_data, y_data):
+		"""Plots the xy data given by image handler, and colors based on the thresholds and colormap selected by the
+		user"""
+		# Placing the data into a histogram with reasonably sized binning helps speed up the plotting significantly.
+		# The histogram is kept until different data is plotted, so that changing the ranges doesn't recalculate it
+		if self.histogram is None or x_data is not self.histogram[0] or y_data is not self.histogram[1]:
+			self.histogram = (x_data, y_data) + np.histogram2d(x_data, y_data, bins=150, range=[[0, 1], [0, 0.6]])
+		H, xedges, yedges = self.histogram[2:]
+		H = H.T.copy()
+		xcenters = (xedges[:-1] + xedges[1:]) / 2
+		ycenters = (yedges[:-1] + yedges[1:]) / 2
+		x = np.tile(xcenters, (150,1))
+		y = np.tile(ycenters, (150,1)).T
+		# pre calculate distance D, fraction bound F, and angle A maps for the data
+		D = np.sqrt(x**2+y**2)
+		F = np.sqrt((x-self.x_fraction)**2+(y-self.y_fraction)**2)
+		A = y/x
+		min = np.tan(np.deg2rad(self.angle_min_val))
+		max = np.tan(np.deg2rad(self.angle_max_val))
+		# The plot is shown as an image, which makes it faster to plot than the raw data
+		im = self.image_r if self.color_map == 1 else self.image
+		im2 = self.image_back
+		im.set_data(xcenters, ycenters, A)
+		# These if statements color the top image based on the thresholds, and then sets areas outside the thresholding
+		# to be black.
+		if self.color_map == 0:
+			H = np.ma.masked_where(H < 0.005, H)
+			im.set_data(xcenters, ycenters, H)
+			H[H != 0] = 1
+			im2.set_data(xcenters, ycenters, H)
+		elif self.color_map == 1:
+			D = np.ma.masked_where((D < self.circle_min_val / 100) | (D > self.circle_max_val / 100) | (H < 0.01) |
+								   (A < min) | (A > max) | (F<self.fraction_min) | (F>self.fraction_max),D)
+			H[H != 0] = 1
+			if not False in D.mask:
+				D.mask[0, 0] = False
+			im.set_data(xcenters, ycenters, D)
+			im.set_clim(self.circle_min_val / 100, self.circle_max_val / 100)
+			im2.set_data(xcenters, ycenters, H)
+		elif self.color_map == 2:
+			A[(A > self.image_max_ang) & (A < max)] = self.image_max_ang
+			A[(A < self.image_min_ang) & (A > min)] = self.image_min_ang
+			A = np.ma.masked_where((D < self.circle_min_val / 100) | (D > self.circle_max_val / 100) | (H < 0.01) |
+								   (A < min) | (A > max) | (F<self.fraction_min) | (F>self.fraction_max),A)
+			if not False in A.mask:
+				A.mask[0, 0] = False
+			im.set_data(xcenters, ycenters, A)
+			im.set_clim(min, max)
+			H[H != 0] = 1
+			im2.set_data(xcenters, ycenters, H)
+		elif self.color_map == 4:
+			F = np.ma.masked_where((D < self.circle_min_val / 100) | (D > self.circle_max_val / 100) | (H < 0.01) |
+								   (A < min) | (A > max) | (F<self.fraction_min) | (F>self.fraction_max),F)
+			H[H != 0] = 1
+			if not False in F.mask:
+				F.mask[0, 0] = False
+			im.set_data(xcenters, ycenters, F)
+			im.set_clim(self.fraction_min, self.fraction_max)
+			im2.set_data(xcenters, ycenters, H)
+		# The limits are worked out from the data when they weren't set above, as they were for a new image
+		if self.color_map not in (1, 2, 4):
+			im.autoscale()
+		im2.autoscale()
+		for image in (im2, im):
+			if image not in self.canvas.ax.images:
+				self.canvas.ax.add_image(image)
+		self.image.set_visible(im is self.image)
+		self.image_r.set_visible(im is self.image_r)
+		self.request_refresh(full=True)
+		# if len(self.MHz) <= 2:
+		#	self.canvas.ax.text(0.8, 0.55, self.MHz + " MHz", fontsize=12)
+		# else:
+		#	self.canvas.ax.text(0.75, 0.55, self.MHz + " MHz", fontsize=12)
+		# list = self.canvas.ax.get_images()
+
+	def on_draw(self, event):
+		"""Keeps a copy of the canvas after every full draw, before the animated artists are drawn over it"""
+		if self.saving:
+			return
+		self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+		self.background_stale = False
+		self.draw_overlays()
+
+	def draw_overlays(self):
+		"""Draws the range lines and the selection circles over what is on the canvas"""
+		for artist in self.overlays:
+			self.canvas.ax.draw_artist(artist)
+
+	def refresh(self):
+		"""Brings the canvas up to date. The whole plot is only drawn when something other than the range lines and the
+		selection circles changed, otherwise those are drawn over the copy of the rest of the plot"""
+		if self.background is None or self.background_stale:
+			self.canvas.draw()
+		else:
+			self.canvas.restore_region(self.background)
+			self.draw_overlays()
+			self.canvas.blit(self.canvas.figure.bbox)
+
+	def request_refresh(self, full=False):
+		"""Asks for the canvas to be brought up to date, with full set when more than the animated artists changed.
+		Windows that show the plot call refresh() once the event that changed it has been handled, so that everything
+		it changed is drawn together. The plot is drawn when it is saved, so there is nothing else to do here"""
+		self.background_stale = self.background_stale or full
+
+	def set_circle(self, selection):
+		"""Changes the colour of the circle seleted for when the user clicks the plot based on the value in the
+		enumerated dropdown box on the front panel"""
+		self.circleSelect = selection
+
+	def clear_circles(self):
+		"""Sends all the circles to far outside the plot coordinates"""
+		self.circle_coors[:] = -3.0
+		self.draw_circles()
+
+	def update_circle(self, event):
+		"""Moves the selected circles"""
+		self.circle_coors[self.circleSelect][0] = event.xdata
+		self.circle_coors[self.circleSelect][1] = event.ydata
+		self.draw_circles()
+
+	def draw_circles(self):
+		"""Moves the circles. Using patches as opposed to plotting them is far more efficient, otherwise the program
+		hangs for a while"""
+		for circle, coors, radius in zip((self.circler, self.circleg, self.circleb, self.circley), self.circle_coors,
+										 self.circle_radius):
+			circle.set_center((coors[0], coors[1]))
+			circle.set_radius(radius)
+		self.request_refresh()
+
+	def update_fraction_range(self, min, max, *args, **kwargs):
+		"""Moves the circles for fraction range"""
+		self.fraction_min = min
+		self.fraction_max = max
+		for circle, radius in ((self.circle_fraction_min, min), (self.circle_fraction_max, max)):
+			circle.set_center((self.x_fraction, self.y_fraction))
+			circle.set_radius(radius)
+			circle.set_edgecolor('b')
+			circle.set_alpha(self.line_alpha)
+		self.request_refresh()
+
+	def update_angle_range(self, min, max, *args, **kwargs):
+		"""Moves the lines for angle range"""
+		x = np.linspace(0,2,3)
+		y = np.tan((np.deg2rad(min)))*x
+		if y[-1] == 0:
+			y = [-1, -1, -1]
+
+		self.min_line.set_data(x, y)
+		self.min_line.set_alpha(self.line_alpha)
+
+		y = np.tan(np.radians(max))*x
+		self.max_line.set_data(x, y)
+		self.max_line.set_alpha(self.line_alpha)
+
+		self.angle_min_val = min
+		self.angle_max_val = max
+		self.request_refresh()
+
+	def update_circle_range(self, min, max, *args, **kwargs):
+		"""Moves the circles for modulation range"""
+		x1 = np.linspace(0, min/100, 100)
+		y1 = np.sqrt((min/100)**2 - x1**2)
+		self.min_circle.set_data(x1, y1)
+		self.min_circle.set_alpha(self.line_alpha)
+
+		x2 = np.linspace(0, max/100, 100)
+		y2 = np.sqrt((max/100)**2 - x2**2)
+		self.max_circle.set_data(x2, y2)
+		self.max_circle.set_alpha(self.line_alpha)
+
+		self.circle_min_val = min
+		self.circle_max_val = max
+		self.request_refresh()
+
+	def change_circle_radius(self, radius):
+		"""Makes the click circles of radius = radius"""
+		self.circle_radius[self.circleSelect] = radius
+		self.draw_circles()
+
+	def update_data(self, x, y, col_map = 0):
+		"""plots new data, and moves the thresholding lines and circles to match it"""
+		# 1D data is passed on as it is, so that the histogram of data that was plotted before can be reused
+		self.plot_data(x if x.ndim == 1 else x.flatten(), y if y.ndim == 1 else y.flatten())
+		self.update_angle_range(self.angle_min_val, self.angle_max_val)
+		self.update_circle_range(self.circle_min_val, self.circle_max_val)
+		self.draw_circles()
+
+	def set_colormap(self, val):
+		"""updates the colormap value"""
+		self.color_map = val
+
+	def set_image_props(self, min_ang, max_ang, min_m, max_m):
+		"""Changes the thresholding parameters for angle and modulation"""
+		self.image_min_ang = min_ang
+		self.image_max_ang = max_ang
+		self.image_min_M = min_m
+		self.image_max_M = max_m
+
+	def set_lifetime_points(self, *args):
+		"""Adds the lifetime values to the universal circle, replacing the ones from a previous harmonic"""
+		lifetime_x = args[0][0]
+		lifetime_y = args[0][1]
+		lifetimes = [0.5, 1, 2, 3, 4, 8]
+		for item in self.lifetime_points:
+			item.remove()
+		self.lifetime_points = [self.canvas.ax.scatter(lifetime_x, lifetime_y, color='r', s=12)]
+		for i in range(6):
+			self.lifetime_points.append(self.canvas.ax.text(lifetime_x[i]-0.05, lifetime_y[i]+0.03,
+															str(lifetimes[i]) + " ns", color='r', fontsize=15))
+		self.request_refresh(full=True)
+
+	def set_fraction(self, x, y):
+		"""Changes the thresholding parameters for the fraction bound circles"""
+		self.x_fraction = x
+		self.y_fraction = y
+
+	def save_fig(self, file, **kwargs):
+		"""Saves the figure as a png file, including the range lines and the selection circles. kwargs are passed on to
+		savefig"""
+		self.saving = True
+		for artist in self.overlays:
+			artist.set_animated(False)
+		try:
+			self.canvas.figure.savefig(file, **kwargs)
+		finally:
+			for artist in self.overlays:
+				artist.set_animated(True)
+			self.saving = False
+		# Saving draws the figure at a different size, so the canvas is drawn again
+		self.request_refresh(full=True)
+	
+	def set_alpha(self, value):
+		self.line_alpha = value
+		self.update_circle_range(self.circle_min_val, self.circle_max_val)
+		self.update_angle_range(self.angle_min_val, self.angle_max_val)
+		self.update_fraction_range(self.fraction_min, self.fraction_max)
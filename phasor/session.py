@@ -0,0 +1,97 @@
+# Saves the datasets that are open to a session file, and opens them again without reading or transforming their raw
+# files. Only the intensity and the uncalibrated g and s maps of each dataset are kept, in a compressed NumPy archive,
+# along with a manifest of the settings of its analysis. The maps of a dataset are only read from the archive when it
+# is opened, so the first windows of a session come up before the rest of it is read
+
+# imports
+import json
+import numpy as np
+
+from .phasor_data import PhasorData
+from .frames import FrameSeries
+
+# Version of the manifest, which is raised when the layout of the archive changes
+SESSION_VERSION = 1
+
+# Extension of session files
+SESSION_EXTENSION = '.flute'
+
+def save_session(file, datasets):
+	"""Writes datasets to file. Each dataset is a (data, state, frame, show_lines) tuple, where data is a PhasorData or a
+	FrameSeries, state is the PhasorData.analysis_state of the data that is shown, frame is the frame of a FrameSeries
+	that is shown and show_lines is whether the range lines are drawn on its plot"""
+	arrays = {}
+	entries = []
+	for i, (data, state, frame, show_lines) in enumerate(datasets):
+		key = 'dataset%03d' % i
+		if isinstance(data, FrameSeries):
+			kind = 'series'
+			settings = dict(data.settings)
+			maps = (np.stack(data.intensity), np.stack(data.raw_g), np.stack(data.raw_s))
+		else:
+			kind = 'data'
+			settings = dict(phi_cal=data.phi_cal, m_cal=data.m_cal, bin_width=data.bin_width, freq=data.freq,
+							harmonic=data.harmonic, harmonics=list(data.harmonics))
+			maps = (data.original_image, data.raw_g, data.raw_s)
+		for name, array in zip(('intensity', 'raw_g', 'raw_s'), maps):
+			arrays['%s_%s' % (key, name)] = array
+		entries.append({'key': key, 'name': data.name, 'kind': kind, 'settings': settings, 'state': state,
+						'frame': int(frame), 'show_lines': bool(show_lines)})
+	manifest = json.dumps({'version': SESSION_VERSION, 'datasets': entries}, default=_json_value)
+	# savez adds .npz to the names of files that it opens itself, so the file is opened here
+	with open(file, 'wb') as f:
+		np.savez_compressed(f, manifest=np.array(manifest), **arrays)
+
+def _json_value(value):
+	"""Turns the NumPy arrays and numbers of an analysis state into lists and numbers that json can write"""
+	if isinstance(value, np.ndarray):
+		return value.tolist()
+	if isinstance(value, np.generic):
+		return value.item()
+	raise TypeError("Cannot save %r to a session" % (value,))
+
+class Session:
+	"""A session file that is open for reading. The manifest is read straight away, and the maps of each dataset when
+	it is opened with dataset"""
+
+	def __init__(self, file):
+		self.file = file
+		self.archive = np.load(file)
+		try:
+			manifest = json.loads(str(self.archive['manifest']))
+		except KeyError:
+			self.archive.close()
+			raise ValueError("%s is not a session file" % file)
+		if manifest['version'] > SESSION_VERSION:
+			self.archive.close()
+			raise ValueError("%s was saved by a newer version" % file)
+		self.entries = manifest['datasets']
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def names(self):
+		"""Returns the names of the datasets, in the order they were saved"""
+		return [entry['name'] for entry in self.entries]
+
+	def dataset(self, index):
+		"""Reads the maps of dataset index from the file. Returns the PhasorData or FrameSeries along with its analysis
+		state, which is applied with PhasorData.restore_state or FrameSeries.frame, the frame that was shown and whether
+		the range lines were drawn"""
+		entry = self.entries[index]
+		intensity, raw_g, raw_s = (self.archive['%s_%s' % (entry['key'], name)]
+								   for name in ('intensity', 'raw_g', 'raw_s'))
+		if entry['kind'] == 'series':
+			data = FrameSeries(entry['name'], list(intensity), list(raw_g), list(raw_s), **entry['settings'])
+		else:
+			data = PhasorData(entry['name'], intensity, raw_g, raw_s, **entry['settings'])
+		return data, entry['state'], entry['frame'], entry['show_lines']
+
+	def close(self):
+		self.archive.close()
@@ -0,0 +1,34 @@
+# Calculates the phasor weights and turns the sums over the time bins into phasor coordinates. The sums themselves are
+# worked out by the streaming kernels of image_loader.streaming, which are imported here as well so that they can be
+# used from either package. See https://doi.org/10.1073/pnas.1108161108
+
+# imports
+import numpy as np
+
+from image_loader.streaming import tile_rows, phasor_sums, phasor_sums_from_slabs, bin_slabs
+
+def phasor_weights(bins, bin_width=0.2208, freq=80, harmonic=1):
+	"""Returns the (bins, 1 + 2 * harmonics) matrix that the decays are multiplied with. The first column is ones,
+	which gives the integral of the decay, followed by the cosine and sine of omega * t at the centre of each bin for
+	each harmonic. harmonic can be a single harmonic or a list of them, so that all of them are calculated in one pass
+	over the stack"""
+	t_arr = bin_width * (np.arange(bins) + 0.5)
+	harmonics = np.atleast_1d(np.asarray(harmonic, dtype=np.float64))
+	omega_t = 2 * np.pi * freq / 1000 * harmonics[np.newaxis, :] * t_arr[:, np.newaxis]
+	columns = [np.ones(bins)]
+	for k in range(len(harmonics)):
+		columns += [np.cos(omega_t[:, k]), np.sin(omega_t[:, k])]
+	return np.stack(columns, axis=1)
+
+def phasor_coordinates(sums):
+	"""Turns the sums from phasor_sums into the intensity and the uncalibrated g and s coordinates of every pixel. g
+	and s are (harmonics, Y, X) arrays, in the order of the harmonics given to phasor_weights"""
+	integral = sums[0].copy()
+	integral[integral == 0] = 0.00001  # Avoid division by zero
+	return sums[0], sums[1::2] / integral, sums[2::2] / integral
+
+def phasor_centroid(sums):
+	"""Returns the photon weighted mean of the uncalibrated g and s coordinates of all the pixels, which is the phasor
+	of the summed decay. sums is a (weights, ...) array from phasor_sums, or its totals over all the pixels"""
+	totals = np.asarray(sums).reshape(len(sums), -1).sum(axis=1)
+	return totals[1::2] / totals[0], totals[2::2] / totals[0]
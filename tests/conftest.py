@@ -0,0 +1,16 @@
+# Lets the tests import the modules of FLUTE, which is run from its folder rather than installed as a package, and
+# gives the tests of the windows a Qt application to run in
+
+# imports
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def qapp():
+	"""Returns the Qt application, which draws off screen. Tests that use it are skipped when PyQt5 isn't installed"""
+	os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+	QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+	return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
@@ -0,0 +1,70 @@
+# Checks that bulk open saves the same files as opening each file and saving it from the GUI, and that a batch can be
+# cancelled
+
+# imports
+import os
+import numpy as np
+import tifffile
+
+from phasor.batch import BatchProcessor, apply_settings, process_file
+from phasor.cache import PhasorCache
+from phasor.export import make_plot
+from phasor.phasor_data import PhasorData
+
+SETTINGS = {
+	'channel': 0, 'phi_cal': 0.1, 'm_cal': 1.1, 'bin_width': 0.2208, 'freq': 80.0, 'harmonic': 1, 'filters': 1,
+	'intensity_min': 20.0, 'intensity_max': 5000.0, 'phi_min': 5.0, 'phi_max': 80.0, 'm_min': 0.1, 'm_max': 1.1,
+	'frac_min': 0.0, 'frac_max': 0.6, 'fraction_x': 0.5, 'fraction_y': 0.3, 'show_lines': True, 'container': None
+}
+
+def write_files(folder, count):
+	rng = np.random.default_rng(0)
+	t = SETTINGS['bin_width'] * (np.arange(56) + 0.5)
+	files = []
+	for i in range(count):
+		tau = rng.uniform(0.5, 4, (24, 20))
+		stack = rng.poisson(rng.uniform(5, 300, (24, 20)) * np.exp(-t[:, np.newaxis, np.newaxis] / tau) / tau)
+		files.append(str(folder / ('image%d.tif' % i)))
+		tifffile.imwrite(files[-1], stack.astype(np.uint16))
+	return files
+
+def saved_files(folder):
+	"""Returns the contents of the files in folder by name"""
+	return {name: open(os.path.join(folder, name), 'rb').read() for name in sorted(os.listdir(folder))}
+
+def test_batch_matches_saving_from_the_gui(tmp_path):
+	files = write_files(tmp_path, 2)
+	for name in ('gui', 'first', 'second'):
+		(tmp_path / name).mkdir()
+	for file in files:
+		data = PhasorData.from_file(file, channel=0, phi_cal=0.1, m_cal=1.1, bin_width=0.2208, freq=80.0, harmonic=1,
+									harmonics=[1], cache=PhasorCache(max_bytes=0))
+		apply_settings(data, SETTINGS)
+		data.save_data(str(tmp_path / 'gui'), 'all', make_plot(data, True))
+	assert BatchProcessor(files, SETTINGS, str(tmp_path / 'first'), workers=2).run() == 2
+	# Runs with a cache save the same files too, both when they fill it and when they read from it
+	cache = PhasorCache(tmp_path / 'cache', max_bytes=2 ** 30)
+	for _ in range(2):
+		BatchProcessor(files, SETTINGS, str(tmp_path / 'second'), workers=1, cache=cache).run()
+
+	gui = saved_files(str(tmp_path / 'gui'))
+	assert any(name.endswith('_g.tiff') for name in gui) and any(name.endswith('.png') for name in gui)
+	assert saved_files(str(tmp_path / 'first')) == gui
+	assert saved_files(str(tmp_path / 'second')) == gui
+
+def test_process_file_reads_the_file_without_a_cache(tmp_path, monkeypatch):
+	file = write_files(tmp_path, 1)[0]
+	monkeypatch.setattr('config.CACHE_MAX_BYTES', 2 ** 30)
+	monkeypatch.setattr('config.CACHE_DIR', tmp_path / 'cache')
+	process_file(file, SETTINGS, str(tmp_path))
+	assert not (tmp_path / 'cache').exists()
+
+def test_cancel_drops_files_that_have_not_started(tmp_path):
+	files = write_files(tmp_path, 12)
+	(tmp_path / 'saved').mkdir()
+	processor = BatchProcessor(files, SETTINGS, str(tmp_path / 'saved'), workers=1)
+	done = processor.run(lambda done, total, eta, file: processor.cancel())
+	# The pool may already have handed a few files to its worker when the first one finishes
+	assert done < len(files)
+	assert sum(future.cancelled() for future in processor.futures) == len(files) - done
+	assert not processor.errors
@@ -0,0 +1,86 @@
+# Checks that the synthetic FLIM data has the counts and lifetimes it is made with, and that a small run of the
+# benchmark suite times every stage and can be saved and compared
+
+# imports
+import subprocess
+import sys
+import numpy as np
+import pytest
+import tifffile
+
+import config
+from benchmarks import suite
+from benchmarks.synthetic import SyntheticFLIM
+from image_loader.image_loader import PtuLoader
+from phasor.cache import PhasorCache
+from phasor.phasor_data import PhasorData
+
+STAGES = ['load_tiff', 'convolution', 'apply_masks'] + ['colormap_' + name for _, name in suite.COLORMAPS] + \
+		 ['plot_data', 'plot_all_clouds']
+
+def test_decays_cover_one_period():
+	synthetic = SyntheticFLIM(16, 64)
+	decays = synthetic.decays()
+	assert decays.shape == (len(synthetic.lifetimes), 64)
+	np.testing.assert_allclose(decays.sum(axis=1), 1, rtol=1e-12)
+
+def test_same_seed_writes_the_same_file(tmp_path):
+	first = SyntheticFLIM(24, 16, seed=3).write_tiff(str(tmp_path / 'first.tif'))
+	second = SyntheticFLIM(24, 16, seed=3).write_tiff(str(tmp_path / 'second.tif'))
+	other = SyntheticFLIM(24, 16, seed=4).write_tiff(str(tmp_path / 'other.tif'))
+	first, second, other = (tifffile.imread(file) for file in (first, second, other))
+	assert first.shape == (16, 24, 24)
+	np.testing.assert_array_equal(first, second)
+	assert not np.array_equal(first, other)
+
+def test_tiff_counts_match_the_expected_photons(tmp_path):
+	synthetic = SyntheticFLIM(64, 32, photons=200)
+	stack = tifffile.imread(synthetic.write_tiff(str(tmp_path / 'stack.tif')))
+	expected = synthetic.expected(np.arange(64)).transpose(2, 0, 1)
+	# Totals of Poisson counts are within a few standard deviations of the expected totals
+	assert abs(stack.sum() - expected.sum()) < 5 * np.sqrt(expected.sum())
+	bins, expected_bins = stack.sum(axis=(1, 2)), expected.sum(axis=(1, 2))
+	assert (abs(bins - expected_bins) < 5 * np.sqrt(expected_bins)).all()
+
+def test_phasor_follows_the_mix_of_lifetimes(tmp_path):
+	synthetic = SyntheticFLIM(64, 256, photons=2000)
+	data = PhasorData.from_file(synthetic.write_tiff(str(tmp_path / 'stack.tif')), bin_width=synthetic.bin_width,
+								freq=synthetic.freq, cache=PhasorCache(max_bytes=0))
+	# The left column of the image is all the second lifetime, and the right column all the first
+	for column, lifetime in ((0, synthetic.lifetimes[1]), (-1, synthetic.lifetimes[0])):
+		g, s = suite.lifetime_coordinates(lifetime, synthetic.freq)
+		assert np.median(data.xcoor_map[:, column]) == pytest.approx(g, abs=0.02)
+		assert np.median(data.ycoor_map[:, column]) == pytest.approx(s, abs=0.02)
+
+def test_ptu_holds_the_same_counts_as_the_stack(tmp_path):
+	synthetic = SyntheticFLIM(24, 16)
+	file = synthetic.write_ptu(str(tmp_path / 'stack.ptu'))
+	np.testing.assert_array_equal(PtuLoader().load_image(file), synthetic.stack())
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+	return suite.run_suite(sizes=(32,), bins=(16,), ptu_sizes=(32,), repeats=1, clouds=2,
+						   folder=str(tmp_path_factory.mktemp('suite')), progress=lambda message: None)
+
+def test_suite_times_every_stage(results):
+	[case] = results['cases']
+	assert (case['size'], case['bins']) == (32, 16)
+	assert sorted(case['stages']) == sorted(STAGES + ['load_ptu'])
+	for result in case['stages'].values():
+		assert 0 <= result['seconds'] <= result['mean_seconds']
+		assert result['peak_bytes'] >= 0
+
+def test_results_are_saved_and_compared(results, tmp_path):
+	file = suite.save_results(results, str(tmp_path / 'run.json'))
+	loaded = suite.load_results(file)
+	assert loaded['cases'] == results['cases']
+	rows = suite.compare(loaded, results)
+	assert [row[2] for row in rows] == list(results['cases'][0]['stages'])
+	assert all(row[3] == row[4] for row in rows)
+
+def test_command_line_run(tmp_path):
+	output = str(tmp_path / 'run.json')
+	subprocess.run([sys.executable, '-m', 'benchmarks', 'run', '--sizes', '32', '--bins', '16', '--ptu-sizes',
+					'--repeats', '1', '--clouds', '2', '--folder', str(tmp_path), '--output', output],
+				   cwd=str(config.PROJECT_ROOT), check=True, capture_output=True)
+	assert sorted(suite.load_results(output)['cases'][0]['stages']) == sorted(STAGES)
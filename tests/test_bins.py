@@ -0,0 +1,54 @@
+# Checks that selections evaluated on the bins of the phasor plot only differ from the exact ones within half a bin of
+# their boundaries
+
+# imports
+import numpy as np
+
+from phasor.bins import PhasorBins
+
+BINS = 64
+G_WIDTH = 1 / BINS
+S_WIDTH = 0.6 / BINS
+
+def random_coordinates(seed=0):
+	"""Returns g and s maps that mostly fall on the plot, with some pixels outside it and some not a number"""
+	rng = np.random.default_rng(seed)
+	g = rng.uniform(-0.1, 1.1, (50, 40))
+	s = rng.uniform(-0.1, 0.7, (50, 40))
+	g[0, :5] = np.nan
+	s[1, :5] = np.nan
+	return g, s
+
+def circle(x, y, radius):
+	return lambda g, s: (x - g) ** 2 + (y - s) ** 2 < radius ** 2
+
+def test_pixels_fall_in_their_cells():
+	g, s = random_coordinates()
+	bins = PhasorBins(g, s, BINS)
+	inside = np.ones(g.size, dtype=bool)
+	inside[bins.outside] = False
+	assert np.all(np.abs(bins.centres_g[bins.index[inside]] - g.ravel()[inside]) <= G_WIDTH / 2 + 1e-12)
+	assert np.all(np.abs(bins.centres_s[bins.index[inside]] - s.ravel()[inside]) <= S_WIDTH / 2 + 1e-12)
+	outside = (g < 0) | (g >= 1) | (s < 0) | (s >= 0.6) | np.isnan(g) | np.isnan(s)
+	np.testing.assert_array_equal(np.sort(bins.outside), np.flatnonzero(outside))
+
+def test_circle_differs_only_near_its_edge():
+	g, s = random_coordinates()
+	bins = PhasorBins(g, s, BINS)
+	x, y, radius = 0.5, 0.3, 0.2
+	with np.errstate(invalid='ignore'):
+		exact = circle(x, y, radius)(g, s)
+	selected = bins.evaluate(circle(x, y, radius))
+	assert selected.shape == g.shape and selected.dtype == bool
+	differ = selected != exact
+	assert 0 < exact.sum() and differ.sum() < 0.1 * exact.sum()
+	half_diagonal = np.hypot(G_WIDTH, S_WIDTH) / 2
+	assert np.all(np.abs(np.hypot(g - x, s - y)[differ] - radius) <= half_diagonal)
+
+def test_outside_pixels_are_exact():
+	g, s = random_coordinates()
+	bins = PhasorBins(g, s, BINS)
+	selection = lambda g, s: (g < 0.2) | (s > 0.5) | np.isnan(g)
+	exact = selection(g, s)
+	np.testing.assert_array_equal(bins.evaluate(selection).ravel()[bins.outside], exact.ravel()[bins.outside])
+	assert bins.evaluate(selection)[0, :5].all()
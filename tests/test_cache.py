@@ -0,0 +1,76 @@
+# Checks that the phasor cache gives back exactly what was stored in it, stays within its size limit and is off unless
+# it is turned on
+
+# imports
+import os
+import numpy as np
+import tifffile
+
+import config
+from phasor.cache import PhasorCache
+from phasor.phasor_data import PhasorData
+
+def random_sums(seed=0):
+	rng = np.random.default_rng(seed)
+	return np.concatenate([rng.poisson(200, (1, 32, 32)), rng.normal(0, 100, (2, 32, 32))]).astype(np.float64)
+
+def test_round_trip_is_exact(tmp_path):
+	source = tmp_path / 'image.tif'
+	source.write_bytes(b'not an image')
+	cache = PhasorCache(tmp_path / 'cache', max_bytes=2 ** 30)
+	key = cache.key(str(source), channel=0)
+	assert cache.get(key) is None
+	sums = random_sums()
+	cache.put(key, sums)
+	found = cache.get(key)
+	assert found.dtype == np.float64
+	np.testing.assert_array_equal(found, sums)
+	assert cache.path(key).endswith('.npz')
+
+def test_off_by_default(tmp_path, monkeypatch):
+	monkeypatch.setattr(config, 'CACHE_DIR', tmp_path)
+	cache = PhasorCache()
+	assert not cache.enabled
+	cache.put('entry', random_sums())
+	assert cache.get('entry') is None
+	assert not os.listdir(tmp_path)
+	monkeypatch.setattr(config, 'CACHE_MAX_BYTES', 2 ** 30)
+	assert PhasorCache().enabled
+
+def test_changed_file_gets_new_key(tmp_path):
+	source = tmp_path / 'image.tif'
+	source.write_bytes(b'first')
+	key = PhasorCache.key(str(source), channel=0)
+	assert PhasorCache.key(str(source), channel=1) != key
+	source.write_bytes(b'second')
+	assert PhasorCache.key(str(source), channel=0) != key
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+	cache = PhasorCache(tmp_path, max_bytes=2 ** 30)
+	cache.put('size', random_sums())
+	entry_bytes = os.path.getsize(cache.path('size'))
+	os.remove(cache.path('size'))
+	cache = PhasorCache(tmp_path, max_bytes=int(entry_bytes * 2.5))
+	for i in range(3):
+		cache.put('entry%d' % i, random_sums(i))
+		os.utime(cache.path('entry%d' % i), (i, i))
+	cache.put('entry3', random_sums(3))
+	assert cache.get('entry0') is None
+	assert all(cache.get('entry%d' % i) is not None for i in (2, 3))
+
+def test_disabled_cache_stores_nothing(tmp_path):
+	cache = PhasorCache(tmp_path, max_bytes=0)
+	cache.put('entry', random_sums())
+	assert cache.get('entry') is None
+	assert not os.listdir(tmp_path)
+
+def test_cached_load_gives_the_same_coordinates(tmp_path):
+	stack = np.random.default_rng(2).poisson(20, (56, 24, 20)).astype(np.uint16)
+	file = str(tmp_path / 'stack.tif')
+	tifffile.imwrite(file, stack)
+	cache = PhasorCache(tmp_path / 'cache', max_bytes=2 ** 30)
+	fresh = PhasorData.from_file(file, cache=cache)
+	assert len(os.listdir(str(tmp_path / 'cache'))) == 1
+	cached = PhasorData.from_file(file, cache=cache)
+	for name in ('original_image', 'raw_g', 'raw_s', 'x_adjusted', 'y_adjusted'):
+		np.testing.assert_array_equal(getattr(cached, name), getattr(fresh, name))
@@ -0,0 +1,109 @@
+# Checks that the colormaps rendered with lookup tables are the same images that calling the matplotlib colormaps gave
+
+# imports
+import matplotlib
+import numpy as np
+import pytest
+import tifffile
+
+from phasor import colormap
+from phasor.cache import PhasorCache
+from phasor.phasor_data import PhasorData
+
+def matplotlib_colors(values, name, n=20):
+	"""Returns the 8 bit RGB colours of values that the windows were drawn with before the lookup tables"""
+	return (matplotlib.colormaps[name].resampled(n)(values)[..., :3] * 255).astype(np.uint8)
+
+def no_overlay(shape):
+	return np.full(shape, -1, dtype=np.int16)
+
+@pytest.mark.parametrize('name', ['viridis', 'viridis_r', 'jet'])
+def test_float_values_match_matplotlib(name):
+	values = np.concatenate([np.linspace(-0.5, 1.5, 401), [0, 1, 1 - 1e-12, 1 / 20, 19 / 20, -np.inf, np.inf, np.nan]])
+	values = values.reshape(1, -1)
+	indices = colormap.color_indices(values, 20)
+	rendered = colormap.render(indices, colormap.lookup_table(name, 20), no_overlay(values.shape),
+							   np.zeros(values.shape, dtype=bool))
+	np.testing.assert_array_equal(rendered, matplotlib_colors(values, name))
+
+def test_integer_values_match_matplotlib():
+	values = np.arange(-3, 25).reshape(1, -1)
+	rendered = colormap.render(colormap.color_indices(values, 20), colormap.lookup_table('viridis', 20),
+							   no_overlay(values.shape), np.zeros(values.shape, dtype=bool))
+	np.testing.assert_array_equal(rendered, matplotlib_colors(values, 'viridis'))
+
+def test_grey_table_repeats_levels():
+	levels = np.arange(256, dtype=np.uint8).reshape(16, 16)
+	rendered = colormap.render(levels, colormap.grey_table(), no_overlay(levels.shape), np.zeros(levels.shape, bool))
+	np.testing.assert_array_equal(rendered, np.stack((levels,) * 3, axis=-1))
+
+def test_circles_and_mask_are_drawn_on_top():
+	rng = np.random.default_rng(0)
+	values = rng.uniform(0, 1, (30, 30))
+	circles = rng.uniform(0, 1, (30, 30, 4)) < 0.3
+	mask = rng.uniform(0, 1, (30, 30)) < 0.2
+	rendered = colormap.render(colormap.color_indices(values, 20), colormap.lookup_table('viridis', 20),
+							   colormap.overlay_indices(circles), mask)
+	# The circles were painted over the image one after the other, and then the mask in black
+	expected = matplotlib_colors(values, 'viridis')
+	for i, color in enumerate(([255, 0, 0], [0, 255, 0], [0, 0, 255], [255, 255, 0])):
+		expected[circles[..., i]] = color
+	expected[mask] = 0
+	np.testing.assert_array_equal(rendered, expected)
+
+def baseline_image(data, select, mask):
+	"""Returns the image of colormap select as the image window drew it before the lookup tables"""
+	if select == 0:
+		im = data.original_image.copy()
+		im = (im - np.min(im[~mask])) * (1 / (np.max(im[~mask]) - np.min(im[~mask])) * 255)
+		im = im.astype('uint8')
+		im[mask] = 0
+		return np.stack((im,) * 3, axis=-1)
+	if select == 1:
+		arr = data.distance_arr.copy()
+		arr[arr < 0] = 0
+		arr[mask] = 0
+		arr = (arr - data.applied_min_M / 100) * (1 / (data.applied_max_M / 100 - data.applied_min_M / 100))
+		name = 'viridis_r'
+	elif select == 2:
+		arr = data.angle_arr.copy()
+		arr[arr < 0] = 0
+		np.nan_to_num(arr, copy=False)
+		low, high = np.tan(np.deg2rad(data.applied_min_ang)), np.tan(np.deg2rad(data.applied_max_ang))
+		arr = (arr - low) * (1 / (high - low))
+		arr[mask] = 0
+		name = 'viridis'
+	elif select == 3:
+		im = np.array(data.original_image.copy(), dtype=np.int64)
+		arr = (im - np.min(im[~mask])) * (1 / (np.max(im[~mask]) - np.min(im[~mask])))
+		arr[mask] = 0
+		name = 'viridis'
+	else:
+		arr = data.fraction_arr.copy()
+		arr[arr < 0] = 0
+		arr = (arr - data.fraction_min) * (1 / (data.fraction_max - data.fraction_min))
+		arr[mask] = 0
+		name = 'jet'
+	image = matplotlib_colors(arr, name)
+	image[mask] = 0
+	return image
+
+@pytest.mark.parametrize('select', [0, 1, 2, 3, 4])
+def test_colormap_frames_match_baseline(tmp_path, select):
+	rng = np.random.default_rng(select)
+	t = 0.2208 * (np.arange(56) + 0.5)
+	tau = rng.uniform(0.5, 4, (32, 32))
+	stack = rng.poisson(rng.uniform(5, 300, (32, 32)) * np.exp(-t[:, np.newaxis, np.newaxis] / tau) / tau)
+	file = str(tmp_path / 'decays.tif')
+	tifffile.imwrite(file, stack.astype(np.uint16))
+	data = PhasorData.from_file(file, cache=PhasorCache(max_bytes=0))
+	data.convolution(1)
+	data.update_threshold(30, 3000)
+	data.update_angle_range(10, 70)
+	data.update_circle_range(20, 100)
+	data.fraction_coor_map(0.5, 0.3)
+	data.update_fraction_range(0, 50)
+	mask = data.combined_mask()
+	indices, table, _ = data.colormap_frame(select, mask)
+	rendered = colormap.render(indices, table, no_overlay(mask.shape), mask)
+	np.testing.assert_array_equal(rendered, baseline_image(data, select, mask))
@@ -0,0 +1,77 @@
+# Checks that the maps written to a single OME-TIFF or HDF5 file read back as they were written
+
+# imports
+import numpy as np
+import pytest
+import tifffile
+
+from phasor import container, export
+from phasor.container import write_container, link_containers
+from phasor.phasor_data import PhasorData
+
+def random_datasets():
+	rng = np.random.default_rng(0)
+	g = rng.uniform(0, 1, (40, 36)).astype(np.float32)
+	g[:3] = np.nan
+	return {'intensity': rng.poisson(100, (40, 36)).astype(np.float32), 'g': g,
+			'mask': (rng.uniform(0, 1, (40, 36)) < 0.3).astype(np.uint8)}
+
+PARAMETERS = 'number Of 3x3 Median Filters: 1\nIntensity Min: 0.000\n'
+
+def test_ome_tiff_round_trip(tmp_path):
+	datasets = random_datasets()
+	# Tiles that don't divide the image
+	file = write_container(str(tmp_path / 'image'), datasets, PARAMETERS, 'ome-tiff', tile=16)
+	assert file.endswith('.ome.tif')
+	with tifffile.TiffFile(file) as tif:
+		assert tif.is_ome
+		assert len(tif.series) == len(datasets)
+		for series, (name, array) in zip(tif.series, datasets.items()):
+			assert series.name == name
+			assert series.pages[0].is_tiled
+			np.testing.assert_array_equal(series.asarray(), array)
+		assert 'number Of 3x3 Median Filters: 1' in tif.ome_metadata
+
+def test_hdf5_round_trip(tmp_path):
+	h5py = pytest.importorskip('h5py')
+	datasets = random_datasets()
+	file = write_container(str(tmp_path / 'image'), datasets, PARAMETERS, 'hdf5', tile=16)
+	assert file.endswith('.h5')
+	with h5py.File(file, 'r') as f:
+		assert set(f) == set(datasets)
+		for name, array in datasets.items():
+			assert f[name].chunks == (16, 16)
+			np.testing.assert_array_equal(f[name][()], array)
+		assert f.attrs['parameters'] == PARAMETERS
+
+def test_linked_hdf5_files(tmp_path):
+	h5py = pytest.importorskip('h5py')
+	files = [write_container(str(tmp_path / name), random_datasets(), PARAMETERS, 'hdf5') for name in ('a', 'b')]
+	link_containers(str(tmp_path / 'batch.h5'), files)
+	with h5py.File(str(tmp_path / 'batch.h5'), 'r') as f:
+		assert set(f) == {'a', 'b'}
+		np.testing.assert_array_equal(f['b/g'][()], random_datasets()['g'])
+
+def test_unavailable_format_raises(tmp_path, monkeypatch):
+	monkeypatch.setattr(container, 'h5py', None)
+	assert container.available_formats() == ['ome-tiff']
+	with pytest.raises(ValueError):
+		write_container(str(tmp_path / 'image'), random_datasets(), PARAMETERS, 'hdf5')
+
+def test_saved_container_holds_the_maps(tmp_path):
+	rng = np.random.default_rng(1)
+	data = PhasorData('maps', rng.poisson(100, (30, 20)).astype(np.float64), rng.uniform(0.1, 0.9, (30, 20)),
+					  rng.uniform(0.05, 0.5, (30, 20)))
+	data.update_threshold(90, 1000)
+	export.save_data(data, str(tmp_path), 'all', container='ome-tiff')
+	mask = data.combined_mask()
+	maps = export.masked_maps(data, mask)
+	with tifffile.TiffFile(str(tmp_path / 'maps.ome.tif')) as tif:
+		saved = {series.name: series.asarray() for series in tif.series}
+	assert list(saved) == ['intensity', 'g', 's', 'tau_p', 'tau_m', 'distance', 'mask']
+	np.testing.assert_array_equal(saved['intensity'], data.original_image.astype(np.float32))
+	for name, array in maps.items():
+		np.testing.assert_array_equal(saved[name], array.astype(np.float32))
+	np.testing.assert_array_equal(saved['mask'], mask)
+	# The maps are in the container instead of TIFFs of their own
+	assert not (tmp_path / 'maps_g.tiff').exists()
@@ -0,0 +1,107 @@
+# Checks the density histograms of the multi-phasor clouds, and that compositing them looks like drawing every point of
+# every cloud over the last with its transparency
+
+# imports
+import numpy as np
+import pytest
+from matplotlib.colors import to_rgb
+
+from phasor import density
+from phasor.multi_phasor_plot import MultiPhasorPlot
+from phasor.phasor_plot import HeadlessCanvas
+
+BINS = 50
+
+def cloud(seed, points=2000, centre=(0.5, 0.3), spread=0.05):
+	rng = np.random.default_rng(seed)
+	return rng.normal(centre[0], spread, points), rng.normal(centre[1], spread, points)
+
+def test_density_matches_histogram():
+	g, s = cloud(0)
+	g[:10] = np.nan
+	counts, centre = density.cloud_density(g, s, BINS)
+	shape = density.density_shape(BINS)
+	keep = np.isfinite(g)
+	expected, _, _ = np.histogram2d(s[keep], g[keep], bins=shape, range=[density.S_RANGE, density.G_RANGE])
+	np.testing.assert_array_equal(counts, expected)
+	np.testing.assert_allclose(centre, (g[keep].mean(), s[keep].mean()), rtol=1e-12)
+
+def test_points_outside_the_plot_are_left_out_of_the_density_only():
+	g, s = np.array([0.5, -0.1, 1.5, 0.5]), np.array([0.3, 0.3, 0.3, 0.7])
+	counts, centre = density.cloud_density(g, s, BINS)
+	assert counts.sum() == 1
+	np.testing.assert_allclose(centre, (g.mean(), s.mean()))
+
+def test_empty_cloud_has_no_centre():
+	counts, centre = density.cloud_density(np.array([np.nan]), np.array([0.2]), BINS)
+	assert counts.sum() == 0
+	assert np.isnan(centre).all()
+
+def drawn_point_by_point(layers, shape):
+	"""Draws every point of every cloud over the ones before it, each with the colour and transparency of its cloud,
+	as a scatter plot would"""
+	colour = np.zeros(shape + (3,))
+	opacity = np.zeros(shape)
+	for counts, rgb, alpha in layers:
+		for point in range(int(counts.max())):
+			# Bins that have run out of points are left as they are
+			a = np.where(counts > point, alpha, 0)
+			colour = a[..., np.newaxis] * np.asarray(rgb) + (1 - a[..., np.newaxis]) * colour
+			opacity = a + (1 - a) * opacity
+	image = np.zeros(shape + (4,))
+	np.divide(colour, opacity[..., np.newaxis], out=image[..., :3], where=opacity[..., np.newaxis] > 0)
+	image[..., 3] = opacity
+	return image
+
+def test_composite_matches_drawing_every_point():
+	shape = density.density_shape(BINS)
+	layers = [(density.cloud_density(*cloud(seed, 300, centre), BINS)[0], to_rgb(colour), alpha)
+			  for seed, centre, colour, alpha in ((1, (0.5, 0.3), 'red', 0.3), (2, (0.55, 0.32), 'blue', 0.7),
+												  (3, (0.45, 0.28), 'green', 0.1))]
+	image = density.composite(layers, shape)
+	np.testing.assert_allclose(image, drawn_point_by_point(layers, shape), rtol=1e-4, atol=1e-5)
+	# Empty bins are transparent
+	assert (image[..., 3][sum(counts for counts, _, _ in layers) == 0] == 0).all()
+
+def test_later_clouds_are_drawn_on_top():
+	shape = density.density_shape(BINS)
+	counts = density.cloud_density(*cloud(4), BINS)[0]
+	red, blue = (counts, to_rgb('red'), 0.6), (counts, to_rgb('blue'), 0.6)
+	covered = counts > 2
+	assert (density.composite([red, blue], shape)[covered, 2] > 0.5).all()
+	assert (density.composite([blue, red], shape)[covered, 0] > 0.5).all()
+
+@pytest.fixture
+def plot():
+	return MultiPhasorPlot(HeadlessCanvas())
+
+def test_clouds_are_drawn_as_one_image(plot):
+	images = []
+	for index in range(20):
+		plot.add_phasor_cloud('cloud%d' % index, *cloud(index, 500, (0.3 + index / 50, 0.3)), 'red', 0.5)
+		images.append(list(plot.canvas.ax.images))
+	assert all(len(drawn) == 1 for drawn in images)
+	np.testing.assert_array_equal(plot.density_image.get_array(), plot.composite_clouds())
+	assert len(plot.centre_markers) == 20
+	for cloud_id, marker in plot.centre_markers.items():
+		np.testing.assert_allclose(marker.get_offsets()[0], plot.cloud_centres[cloud_id])
+
+def test_removed_clouds_leave_the_plot(plot):
+	plot.add_phasor_cloud('kept', *cloud(0), 'red')
+	plot.add_phasor_cloud('removed', *cloud(1), 'blue')
+	plot.set_contours(True)
+	plot.remove_phasor_cloud('removed')
+	assert list(plot.centre_markers) == list(plot.cloud_contours) == ['kept']
+	assert len(plot.canvas.ax.images) == 1
+	np.testing.assert_array_equal(plot.density_image.get_array(), plot.composite_clouds())
+	plot.remove_phasor_cloud('kept')
+	assert plot.density_image is None and len(plot.canvas.ax.images) == 0
+
+def test_restyling_keeps_the_histograms(plot, monkeypatch):
+	plot.add_phasor_cloud('cloud', *cloud(0), 'red', 0.5)
+	image = plot.density_image
+	monkeypatch.setattr(density, 'cloud_density', lambda *args, **kwargs: pytest.fail('histogram recalculated'))
+	plot.set_cloud_style('cloud', 'blue', 0.9)
+	assert plot.density_image is image
+	np.testing.assert_array_equal(image.get_array(), plot.composite_clouds())
+	np.testing.assert_allclose(plot.centre_markers['cloud'].get_facecolor()[0][:3], to_rgb('blue'))
@@ -0,0 +1,92 @@
+# Checks the maps that are exported against the way they were calculated before the phasor core was split from the
+# windows: the whole stack transformed at once, filtered with scipy and masked by each range in turn. The results are
+# equal to float rounding, as the sums are now added up in tiles and in a different order
+
+# imports
+import numpy as np
+import pytest
+import tifffile
+from scipy import signal
+
+from phasor import export
+from phasor.cache import PhasorCache
+from phasor.phasor_data import PhasorData
+
+SETTINGS = dict(phi_cal=0.3, m_cal=1.2, bin_width=0.2208, freq=80.0, harmonic=1)
+
+def baseline_maps(stack, num_filter, thresholds, angles, modulations, fraction, fraction_range, phi_cal, m_cal,
+				  bin_width, freq, harmonic):
+	"""Returns the g, s, TauP, TauM and distance maps that were saved for stack, with the pixels that were masked set
+	to nan"""
+	intensity = stack.sum(axis=0)
+	t = bin_width * (np.arange(stack.shape[0]) + 0.5)
+	integral = stack.sum(axis=0, dtype=np.float64)
+	integral[integral == 0] = 0.00001
+	omega_t = 2 * np.pi * freq / 1000 * harmonic * t
+	g = np.einsum('kij,k->ij', stack, np.cos(omega_t)) / integral
+	s = np.einsum('kij,k->ij', stack, np.sin(omega_t)) / integral
+	g, s = (g * np.cos(phi_cal) - s * np.sin(phi_cal)) * m_cal, (g * np.sin(phi_cal) + s * np.cos(phi_cal)) * m_cal
+
+	x_adjusted, y_adjusted = g, s
+	for _ in range(num_filter):
+		x_adjusted, y_adjusted = signal.medfilt(x_adjusted), signal.medfilt(y_adjusted)
+	x_adjusted[x_adjusted == 0] = -0.1
+	angle_arr = y_adjusted / x_adjusted
+	distance_arr = np.sqrt(y_adjusted ** 2 + x_adjusted ** 2)
+	fraction_arr = np.sqrt((s - fraction[1]) ** 2 + (g - fraction[0]) ** 2)
+
+	mask = np.logical_or(intensity < thresholds[0], intensity > thresholds[1])
+	mask |= np.logical_or(angle_arr > np.tan(np.deg2rad(angles[1])), angle_arr < np.tan(np.deg2rad(angles[0])))
+	mask |= np.logical_or(distance_arr > modulations[1] / 100, distance_arr < modulations[0] / 100)
+	mask |= np.logical_or(fraction_arr > fraction_range[1] / 100, fraction_arr < fraction_range[0] / 100)
+	mask |= x_adjusted < 0
+
+	omega = 2 * np.pi * freq / 1000 * harmonic
+	maps = {'g': x_adjusted.copy(), 's': y_adjusted.copy(), 'tau_p': 1 / omega * angle_arr,
+			'tau_m': 1 / omega * np.sqrt(1 / np.power(distance_arr, 2) - 1), 'distance': fraction_arr.copy()}
+	for array in maps.values():
+		array[mask] = float('nan')
+	return maps
+
+@pytest.fixture
+def analysed(tmp_path):
+	"""Returns a stack, the PhasorData of it with filters and ranges applied, and the baseline maps of the same
+	settings"""
+	rng = np.random.default_rng(0)
+	t = SETTINGS['bin_width'] * (np.arange(56) + 0.5)
+	# Decays of lifetimes between 0.5 and 4 ns, with a few empty pixels
+	tau = rng.uniform(0.5, 4, (40, 36))
+	brightness = rng.uniform(0, 300, (40, 36))
+	brightness[:3, :3] = 0
+	stack = rng.poisson(brightness * np.exp(-t[:, np.newaxis, np.newaxis] / tau) / tau).astype(np.uint16)
+	file = str(tmp_path / 'decays.tif')
+	tifffile.imwrite(file, stack)
+
+	data = PhasorData.from_file(file, cache=PhasorCache(max_bytes=0), **SETTINGS)
+	data.convolution(2)
+	data.update_threshold(20, 4000)
+	data.update_angle_range(5, 80)
+	data.update_circle_range(10, 110)
+	data.fraction_coor_map(0.6, 0.3)
+	data.update_fraction_range(0, 60)
+	expected = baseline_maps(stack, 2, (20, 4000), (5, 80), (10, 110), (0.6, 0.3), (0, 60), **SETTINGS)
+	return data, expected
+
+def test_masked_maps_match_baseline(analysed):
+	data, expected = analysed
+	maps = export.masked_maps(data, data.combined_mask())
+	assert set(maps) == set(expected)
+	for name, array in maps.items():
+		assert np.isnan(array).any() and not np.isnan(array).all()
+		np.testing.assert_allclose(array, expected[name], rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name)
+
+def test_saved_maps_match_baseline(analysed, tmp_path):
+	data, expected = analysed
+	folder = tmp_path / 'saved'
+	folder.mkdir()
+	export.save_data(data, str(folder), 'all')
+	for name, suffix in (('g', '_g'), ('s', '_s'), ('tau_p', '_TauP'), ('tau_m', '_TauM'), ('distance', '_Dist')):
+		saved = tifffile.imread(str(folder / (data.name + suffix + '.tiff')))
+		np.testing.assert_allclose(saved, expected[name], rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name)
+	parameters = (folder / (data.name + '_Parameters.txt')).read_text()
+	assert parameters.startswith('number Of 3x3 Median Filters: 2\n')
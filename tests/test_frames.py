@@ -0,0 +1,35 @@
+# Checks that the frames of a time-lapse are transformed like single images, and quietly
+
+# imports
+import numpy as np
+import tifffile
+
+from image_loader.image_loader import ImageLoader
+from phasor.cache import PhasorCache
+from phasor.frames import FrameSeries
+from phasor.phasor_data import PhasorData
+
+def test_frames_match_single_images(tmp_path, capsys):
+	stacks = np.random.default_rng(0).poisson(10, (3, 16, 12, 10)).astype(np.uint16)
+	file = str(tmp_path / 'series.tif')
+	tifffile.imwrite(file, stacks)
+	series = FrameSeries.from_file(file, bin_width=0.5)
+	assert capsys.readouterr().out == ''
+	assert len(series) == 3
+	for index, stack in enumerate(stacks):
+		single = str(tmp_path / ('frame%d.tif' % index))
+		tifffile.imwrite(single, stack)
+		expected = PhasorData.from_file(single, bin_width=0.5, cache=PhasorCache(max_bytes=0))
+		frame = series.frame(index)
+		assert frame.name == 'series_frame%03d' % (index + 1)
+		np.testing.assert_array_equal(frame.original_image, expected.original_image)
+		# The maps of frames are kept in single precision
+		np.testing.assert_allclose(frame.raw_g, expected.raw_g, rtol=1e-6, atol=1e-7)
+		np.testing.assert_allclose(frame.raw_s, expected.raw_s, rtol=1e-6, atol=1e-7)
+
+def test_stacks_of_frames_are_series(tmp_path):
+	file = str(tmp_path / 'stack.tif')
+	tifffile.imwrite(file, np.zeros((16, 4, 4), dtype=np.uint16))
+	assert not ImageLoader.has_frames(file)
+	tifffile.imwrite(file, np.zeros((2, 16, 4, 4), dtype=np.uint16))
+	assert ImageLoader.has_frames(file)
@@ -0,0 +1,90 @@
+# Checks the staged progress that loading reports, and that the load thread stops when it is cancelled. The tests of
+# LoadThread need PyQt5, and are skipped without it
+
+# imports
+import numpy as np
+import pytest
+import tifffile
+
+from phasor.cache import PhasorCache
+from phasor.frames import FrameSeries
+from phasor.phasor_data import PhasorData
+
+STACK = np.random.default_rng(0).poisson(20, (32, 24, 20)).astype(np.uint16)
+
+class Stop(Exception):
+	pass
+
+@pytest.fixture(params=['image', 'series'])
+def loaded_file(request, tmp_path):
+	"""Returns a file and the function that loads it, for a single image and for a time-lapse"""
+	file = str(tmp_path / 'stack.tif')
+	if request.param == 'image':
+		tifffile.imwrite(file, STACK)
+		return file, lambda file, **kwargs: PhasorData.from_file(file, cache=PhasorCache(max_bytes=0), **kwargs)
+	tifffile.imwrite(file, np.stack([STACK, STACK]))
+	return file, FrameSeries.from_file
+
+def test_progress_is_reported_in_stages(loaded_file):
+	file, load = loaded_file
+	reports = []
+	load(file, progress=lambda stage, fraction: reports.append((stage, fraction)))
+	stages = [stage for stage, _fraction in reports]
+	assert stages == sorted(stages, key=['read', 'transform'].index)
+	for stage in ('read', 'transform'):
+		fractions = [fraction for name, fraction in reports if name == stage]
+		assert fractions == sorted(fractions)
+		assert 0 <= fractions[0] and fractions[-1] == 1
+
+def test_raising_from_progress_stops_the_load(loaded_file):
+	file, load = loaded_file
+	reports = []
+
+	def progress(stage, fraction):
+		reports.append(stage)
+		raise Stop()
+
+	with pytest.raises(Stop):
+		load(file, progress=progress)
+	assert reports == ['read']
+
+@pytest.fixture
+def load_thread(qapp):
+	"""Returns a function that runs a LoadThread in this thread, and returns what it sent"""
+	import main
+
+	def run(file, cancel=False, **kwargs):
+		thread = main.LoadThread(file, **kwargs)
+		sent = {'loaded': [], 'failed': [], 'progress': []}
+		thread.loaded.connect(sent['loaded'].append)
+		thread.failed.connect(sent['failed'].append)
+		thread.progress.connect(lambda stage, fraction: sent['progress'].append(stage))
+		if cancel:
+			thread.cancel()
+		thread.run()
+		return sent
+
+	return run
+
+def test_thread_sends_the_loaded_data(load_thread, tmp_path):
+	file = str(tmp_path / 'stack.tif')
+	tifffile.imwrite(file, STACK)
+	sent = load_thread(file, bin_width=0.2208)
+	assert sent['failed'] == []
+	[data] = sent['loaded']
+	np.testing.assert_array_equal(data.original_image, STACK.sum(axis=0))
+	assert sent['progress'][-1] == 'render'
+
+def test_cancelled_thread_sends_nothing(load_thread, tmp_path):
+	file = str(tmp_path / 'stack.tif')
+	tifffile.imwrite(file, STACK)
+	sent = load_thread(file, cancel=True)
+	assert sent == {'loaded': [], 'failed': [], 'progress': []}
+
+def test_thread_reports_failures(load_thread, tmp_path):
+	file = str(tmp_path / 'broken.tif')
+	with open(file, 'wb') as f:
+		f.write(b'not a tiff file')
+	sent = load_thread(file)
+	assert sent['loaded'] == []
+	assert len(sent['failed']) == 1
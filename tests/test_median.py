@@ -0,0 +1,46 @@
+# Checks the 3x3 median filter against scipy, and the filter cache of PhasorData
+
+# imports
+import numpy as np
+import pytest
+from scipy import signal
+
+from phasor.median import median3x3, MedianLadder
+from phasor.phasor_data import PhasorData
+
+def random_maps(height=41, width=33, seed=0):
+	rng = np.random.default_rng(seed)
+	intensity = rng.poisson(50, (height, width)).astype(np.float64)
+	return intensity, rng.normal(0.5, 0.2, (height, width)), rng.normal(0.3, 0.2, (height, width))
+
+@pytest.mark.parametrize('shape', [(1, 1), (1, 7), (7, 1), (2, 2), (41, 33)])
+@pytest.mark.parametrize('block_bytes', [1, 200, 2 ** 30])
+def test_median3x3_matches_scipy(shape, block_bytes):
+	image = np.random.default_rng(1).normal(size=shape)
+	np.testing.assert_array_equal(median3x3(image, block_bytes), signal.medfilt2d(image))
+
+def test_median3x3_with_ties_matches_scipy():
+	image = np.random.default_rng(2).integers(0, 3, (30, 30)).astype(np.float64)
+	np.testing.assert_array_equal(median3x3(image), signal.medfilt2d(image))
+
+def test_ladder_matches_repeated_filters():
+	_, g, s = random_maps()
+	ladder = MedianLadder(g, s, lambda g, s: (g, s))
+	for passes in (3, 1, 4, 0):
+		expected_g, expected_s = g, s
+		for _ in range(passes):
+			expected_g, expected_s = signal.medfilt2d(expected_g), signal.medfilt2d(expected_s)
+		np.testing.assert_array_equal(ladder.get(passes)[0], expected_g)
+		np.testing.assert_array_equal(ladder.get(passes)[1], expected_s)
+
+def test_negative_passes_filter_nothing():
+	_, g, s = random_maps()
+	ladder = MedianLadder(g, s, lambda g, s: (g, s))
+	assert ladder.get(-1)[0] is g
+	data = PhasorData('maps', *random_maps())
+	data.convolution(0)
+	unfiltered = data.x_adjusted.copy(), data.y_adjusted.copy()
+	data.convolution(2)
+	data.convolution(-1)
+	np.testing.assert_array_equal(data.x_adjusted, unfiltered[0])
+	np.testing.assert_array_equal(data.y_adjusted, unfiltered[1])
@@ -0,0 +1,116 @@
+# Checks that the clouds of the multi-phasor view are replaced in one call with a single draw, that clouds given the
+# same data keep their histograms, and that only restyling is done when only the colours and transparencies change
+
+# imports
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+from phasor import density
+from phasor.multi_phasor_plot import MultiPhasorPlot
+from phasor.phasor_data import PhasorData
+from phasor.phasor_plot import HeadlessCanvas
+
+def cloud(seed, points=1000):
+	rng = np.random.default_rng(seed)
+	return rng.normal(0.3 + seed / 20, 0.04, points), rng.normal(0.3, 0.04, points)
+
+def clouds(styles, data=None):
+	"""Returns the set_clouds list of a cloud for each (colour, alpha) of styles"""
+	data = data if data is not None else [cloud(seed) for seed in range(len(styles))]
+	return [('cloud%d' % index, g, s, colour, alpha) for index, ((g, s), (colour, alpha)) in
+			enumerate(zip(data, styles))]
+
+@pytest.fixture
+def plot():
+	plot = MultiPhasorPlot(HeadlessCanvas())
+	plot.draws = []
+	plot.canvas.mpl_connect('draw_event', plot.draws.append)
+	return plot
+
+@pytest.fixture
+def histograms(monkeypatch):
+	"""Counts the clouds whose histograms are calculated"""
+	calculated = []
+
+	def cloud_density(g, s, *args, **kwargs):
+		calculated.append(g)
+		return original(g, s, *args, **kwargs)
+
+	original = density.cloud_density
+	monkeypatch.setattr(density, 'cloud_density', cloud_density)
+	return calculated
+
+STYLES = [('red', 0.5), ('blue', 0.3), ('green', 0.8)]
+
+def test_set_clouds_matches_adding_them_one_by_one(plot):
+	plot.set_clouds(clouds(STYLES))
+	assert len(plot.draws) == 1
+	expected = MultiPhasorPlot(HeadlessCanvas())
+	for cloud_id, g, s, colour, alpha in clouds(STYLES):
+		expected.add_phasor_cloud(cloud_id, g, s, colour, alpha)
+	np.testing.assert_array_equal(plot.density_image.get_array(), expected.density_image.get_array())
+	assert plot.cloud_centres == expected.cloud_centres
+	assert list(plot.centre_markers) == list(expected.centre_markers)
+
+def test_same_data_is_only_restyled(plot, histograms):
+	data = [cloud(seed) for seed in range(3)]
+	plot.set_clouds(clouds(STYLES, data))
+	image, markers = plot.density_image, dict(plot.centre_markers)
+	del histograms[:]
+	restyled = [('cyan', 0.9), ('red', 0.1), ('navy', 0.5)]
+	plot.set_clouds(clouds(restyled, data))
+	assert histograms == []
+	assert plot.density_image is image and plot.centre_markers == markers
+	expected = MultiPhasorPlot(HeadlessCanvas())
+	expected.set_clouds(clouds(restyled, data))
+	np.testing.assert_array_equal(image.get_array(), expected.density_image.get_array())
+	assert len(plot.draws) == 2
+
+def test_only_new_data_is_binned(plot, histograms):
+	data = [cloud(seed) for seed in range(3)]
+	plot.set_clouds(clouds(STYLES, data))
+	del histograms[:]
+	data[1] = cloud(7)
+	plot.set_clouds(clouds(STYLES, data))
+	assert len(histograms) == 1 and histograms[0] is data[1][0]
+	expected = MultiPhasorPlot(HeadlessCanvas())
+	expected.set_clouds(clouds(STYLES, data))
+	np.testing.assert_array_equal(plot.density_image.get_array(), expected.density_image.get_array())
+
+def test_removed_and_reordered_clouds_are_drawn_again(plot):
+	data = [cloud(seed) for seed in range(3)]
+	plot.set_clouds(clouds(STYLES, data))
+	plot.set_clouds(clouds(STYLES, data)[::-1])
+	assert plot.drawn_clouds == ['cloud2', 'cloud1', 'cloud0']
+	plot.set_clouds(clouds(STYLES, data)[:1])
+	assert list(plot.centre_markers) == ['cloud0']
+	plot.set_clouds([])
+	assert plot.density_image is None and plot.centre_markers == {}
+
+def test_visible_coordinates_are_kept_until_the_masks_change():
+	stack = np.random.default_rng(0).poisson(20, (32, 16, 12)).astype(np.uint16)
+	data = PhasorData.from_stack(stack, 'image')
+	visible = data.visible_coordinates()
+	data.apply_masks()
+	assert data.visible_coordinates() is visible
+	data.update_threshold(600, 1e6)
+	data.apply_masks()
+	changed = data.visible_coordinates()
+	assert changed is not visible
+	assert len(changed[0]) == np.count_nonzero(~data.combined_mask())
+
+def test_displaying_again_keeps_the_histograms(qapp, histograms):
+	from data_windows import MultiPhasorSelector
+	images = [SimpleNamespace(name='image%d' % seed, data=SimpleNamespace(visible_coordinates=lambda c=cloud(seed): c))
+			  for seed in range(3)]
+	selector = MultiPhasorSelector(images)
+	selector.select_all()
+	selector.display_selected()
+	window = selector.multi_phasor_window
+	image = window.density_image
+	assert len(histograms) == 3
+	selector.display_selected()
+	assert selector.multi_phasor_window is window and window.density_image is image
+	assert len(histograms) == 3
+	window.close()
@@ -0,0 +1,157 @@
+# Checks the headless phasor data: loading, and keeping the maps and masks up to date as the settings change
+
+# imports
+import numpy as np
+import pytest
+import tifffile
+
+from phasor.cache import PhasorCache
+from phasor.phasor_data import PhasorData
+
+BIN_WIDTH = 0.2208
+
+def decays(seed=0, height=32, width=28, bins=56):
+	"""Returns a (bins, Y, X) stack of decays with lifetimes between 0.5 and 4 ns"""
+	rng = np.random.default_rng(seed)
+	t = BIN_WIDTH * (np.arange(bins) + 0.5)
+	tau = rng.uniform(0.5, 4, (height, width))
+	brightness = rng.uniform(5, 300, (height, width))
+	return rng.poisson(brightness * np.exp(-t[:, np.newaxis, np.newaxis] / tau) / tau).astype(np.uint16)
+
+@pytest.fixture
+def stack_file(tmp_path):
+	file = str(tmp_path / 'decays.tif')
+	tifffile.imwrite(file, decays())
+	return file
+
+def test_load_is_quiet(stack_file, capsys):
+	data = PhasorData.from_file(stack_file, bin_width=BIN_WIDTH, cache=PhasorCache(max_bytes=0))
+	assert capsys.readouterr().out == ''
+	np.testing.assert_array_equal(data.original_image, decays().sum(axis=0))
+
+class AlwaysRebuilt(PhasorData):
+	"""PhasorData that recalculates every product each time it is asked for, which the dirty tracking has to match"""
+	def rebuild(self, name, inputs):
+		self.built[name] = inputs
+		return True
+
+def setting_changes(data, v):
+	"""Returns the settings that can be changed on data, each set from the random values v"""
+	return [
+		lambda: data.convolution(int(v[0] * 3)),
+		lambda: data.update_threshold(float(int(v[0] * 30)), 1e6),
+		lambda: data.update_angle_range(float(int(v[0] * 40)), float(45 + int(v[1] * 45))),
+		lambda: data.update_circle_range(float(int(v[0] * 50)), float(60 + int(v[1] * 60))),
+		lambda: data.fraction_coor_map(v[0], v[1] / 2),
+		lambda: data.fraction_lifetime_map(0.4 + v[0] * 4),
+		lambda: data.update_fraction_range(float(int(v[0] * 30)), float(40 + int(v[1] * 80))),
+		lambda: data.update_circle(np.asarray(v[2:10]).reshape(4, 2) * 0.8, [0.05] * 4),
+		lambda: data.clear_circles(),
+		lambda: data.change_colormap(int(v[0] * 5)),
+		lambda: data.set_harmonic(float(1 + int(v[0] * 3))),
+		lambda: data.set_calibration(v[0] * 0.4 - 0.2, 0.8 + v[1] * 0.3),
+		lambda: None
+	]
+
+@pytest.mark.parametrize('phasor_bins', [0, 64])
+def test_dirty_tracking_matches_always_rebuilding(phasor_bins):
+	stack = decays(1)
+	tracked, rebuilt = PhasorData.from_stack(stack, 'tracked'), AlwaysRebuilt.from_stack(stack, 'rebuilt')
+	tracked.phasor_bins = rebuilt.phasor_bins = phasor_bins
+	rng = np.random.default_rng(3)
+	for step in range(500):
+		change = int(rng.integers(13))
+		v = rng.uniform(0, 1, 10)
+		if rng.uniform() < 0.3:
+			# The same values are set again often, which must not leave anything out of date
+			v[:2] = 0.5
+		results = []
+		for data in (tracked, rebuilt):
+			setting_changes(data, v)[change]()
+			mask = data.apply_masks().copy()
+			results.append((mask, data.displayImage.copy(), [a.copy() for a in data.thresholded_coordinates()],
+							[a.copy() for a in data.visible_coordinates()]))
+		(mask, image, points, visible), (expected_mask, expected_image, expected_points, expected_visible) = results
+		np.testing.assert_array_equal(mask, expected_mask, err_msg='step %d' % step)
+		np.testing.assert_array_equal(image, expected_image, err_msg='step %d' % step)
+		for a, b in zip(points + visible, expected_points + expected_visible):
+			np.testing.assert_array_equal(a, b, err_msg='step %d' % step)
+
+def test_set_harmonic_matches_loading_the_harmonic():
+	stack = decays(2)
+	data = PhasorData.from_stack(stack, 'switched', harmonics=[1, 2])
+	data.update_threshold(20, 1e6)
+	data.fraction_lifetime_map(0.4)
+	data.update_fraction_range(10, 90)
+	data.change_colormap(4)
+	data.set_harmonic(2)
+	expected = PhasorData.from_stack(stack, 'loaded', harmonic=2, harmonics=[1, 2])
+	expected.update_threshold(20, 1e6)
+	expected.fraction_lifetime_map(0.4)
+	expected.update_fraction_range(10, 90)
+	expected.change_colormap(4)
+	# The centre placed at a lifetime moves to that lifetime on the phasor of the new harmonic
+	assert (data.x_fraction, data.y_fraction) == (expected.x_fraction, expected.y_fraction)
+	np.testing.assert_array_equal(data.apply_masks(), expected.apply_masks())
+	np.testing.assert_array_equal(data.displayImage, expected.displayImage)
+	for a, b in zip(data.thresholded_coordinates(), expected.thresholded_coordinates()):
+		np.testing.assert_array_equal(a, b)
+
+def test_set_harmonic_keeps_a_centre_placed_at_coordinates():
+	data = PhasorData.from_stack(decays(2), 'switched', harmonics=[1, 2])
+	data.fraction_lifetime_map(0.4)
+	data.fraction_coor_map(0.6, 0.3)
+	data.set_harmonic(2)
+	assert (data.x_fraction, data.y_fraction) == (0.6, 0.3)
+	assert data.fraction_lifetime is None
+
+def test_restore_state_moves_the_lifetime_centre():
+	stack = decays(2)
+	data = PhasorData.from_stack(stack, 'saved', harmonics=[1, 2])
+	data.fraction_lifetime_map(2.5)
+	data.set_harmonic(2)
+	restored = PhasorData.from_stack(stack, 'restored', harmonics=[1, 2])
+	restored.restore_state(data.analysis_state())
+	assert (restored.harmonic, restored.fraction_lifetime) == (2, 2.5)
+	assert (restored.x_fraction, restored.y_fraction) == (data.x_fraction, data.y_fraction)
+
+def test_restore_state_keeps_a_harmonic_that_was_not_calculated():
+	stack = decays(2)
+	data = PhasorData.from_stack(stack, 'saved', harmonic=3, harmonics=[1, 3])
+	data.update_threshold(20, 1e6)
+	restored = PhasorData.from_stack(stack, 'restored', harmonics=[1, 2])
+	restored.restore_state(data.analysis_state())
+	assert restored.harmonic == 1
+	assert (restored.min_thresh, restored.max_thresh) == (20, 1e6)
+
+def analysed(data):
+	"""Applies filters, thresholds, ranges, a fraction centre, selection circles and a colormap to data, in the order
+	the front panel applies them"""
+	data.convolution(2)
+	data.update_threshold(15, 1e6)
+	data.update_angle_range(10, 70)
+	data.update_circle_range(20, 100)
+	data.fraction_coor_map(0.5, 0.3)
+	data.update_fraction_range(10, 80)
+	data.update_circle(np.array([[0.6, 0.4], [0.3, 0.4], [-3, -3], [-3, -3]]), [0.1, 0.08, 0.05, 0.05])
+	data.change_colormap(1)
+	return data
+
+def test_recalibrating_matches_loading_with_the_calibration(stack_file):
+	settings = dict(bin_width=BIN_WIDTH, cache=PhasorCache(max_bytes=0))
+	data = analysed(PhasorData.from_file(stack_file, phi_cal=0.1, m_cal=0.9, **settings))
+	state = data.analysis_state()
+	data.set_calibration(-0.2, 1.1)
+	expected = analysed(PhasorData.from_file(stack_file, phi_cal=-0.2, m_cal=1.1, **settings))
+	np.testing.assert_array_equal(data.g, expected.g)
+	np.testing.assert_array_equal(data.s, expected.s)
+	np.testing.assert_array_equal(data.apply_masks(), expected.apply_masks())
+	np.testing.assert_array_equal(data.displayImage, expected.displayImage)
+	for a, b in zip(data.thresholded_coordinates() + data.visible_coordinates(),
+					expected.thresholded_coordinates() + expected.visible_coordinates()):
+		np.testing.assert_array_equal(a, b)
+	# Everything but the calibration is kept
+	recalibrated = data.analysis_state()
+	assert (recalibrated.pop('phi_cal'), recalibrated.pop('m_cal')) == (-0.2, 1.1)
+	for name, value in recalibrated.items():
+		np.testing.assert_array_equal(value, state[name], err_msg=name)
@@ -0,0 +1,118 @@
+# Checks that the phasor plot keeps its artists, and that moving the range lines and selection circles is blitted over
+# the copy of the rest of the plot and looks the same as drawing the whole plot
+
+# imports
+from types import SimpleNamespace
+import numpy as np
+import matplotlib.image
+
+from phasor.phasor_plot import HeadlessCanvas, PhasorPlot
+
+def phasor_cloud(seed=0, points=5000):
+	rng = np.random.default_rng(seed)
+	return rng.uniform(0.2, 0.8, points), rng.uniform(0.1, 0.45, points)
+
+class CountedCanvas(HeadlessCanvas):
+	"""HeadlessCanvas that counts the full draws"""
+	def __init__(self):
+		HeadlessCanvas.__init__(self)
+		self.draws = 0
+
+	def draw(self):
+		self.draws += 1
+		HeadlessCanvas.draw(self)
+
+def make_plot():
+	plot = PhasorPlot(CountedCanvas())
+	plot.set_lifetime_points((np.linspace(0.9, 0.1, 6), np.linspace(0.2, 0.4, 6)))
+	plot.update_data(*phasor_cloud())
+	plot.refresh()
+	return plot
+
+def move_overlays(plot):
+	plot.update_angle_range(20, 60)
+	plot.update_circle_range(40, 90)
+	plot.set_fraction(0.5, 0.3)
+	plot.update_fraction_range(0.1, 0.25)
+	plot.circleSelect = 1
+	plot.change_circle_radius(0.08)
+	plot.update_circle(SimpleNamespace(xdata=0.4, ydata=0.35))
+
+def pixels(plot):
+	return np.asarray(plot.canvas.buffer_rgba()).copy()
+
+def test_moving_overlays_is_blitted():
+	plot = make_plot()
+	assert plot.canvas.draws == 1
+	move_overlays(plot)
+	plot.refresh()
+	assert plot.canvas.draws == 1
+	# The reference is the same plot drawn in full
+	expected = make_plot()
+	move_overlays(expected)
+	expected.canvas.draw()
+	np.testing.assert_array_equal(pixels(plot), pixels(expected))
+
+def test_new_data_draws_the_whole_plot():
+	plot = make_plot()
+	plot.update_data(*phasor_cloud(1))
+	plot.refresh()
+	assert plot.canvas.draws == 2
+	plot.refresh()
+	assert plot.canvas.draws == 2
+
+def test_artists_are_reused():
+	plot = make_plot()
+	artists = (list(plot.canvas.ax.lines), list(plot.canvas.ax.patches), list(plot.canvas.ax.images))
+	for seed in range(3):
+		plot.update_data(*phasor_cloud(seed))
+		plot.set_colormap(seed)
+		move_overlays(plot)
+		plot.set_lifetime_points((np.linspace(0.9, 0.1, 6), np.linspace(0.2, 0.4, 6)))
+		plot.refresh()
+	assert (list(plot.canvas.ax.lines), list(plot.canvas.ax.patches)) == artists[:2]
+	assert len(plot.canvas.ax.images) <= 3
+	# The lifetime points of the last harmonic are replaced rather than added to
+	assert len(plot.canvas.ax.collections) == 1
+	assert len(plot.canvas.ax.texts) == 6
+
+def test_saved_figure_includes_overlays(tmp_path):
+	plot = make_plot()
+	move_overlays(plot)
+	plot.save_fig(str(tmp_path / 'plot.png'))
+	assert not plot.saving
+	assert all(artist.get_animated() for artist in plot.overlays)
+	plot.refresh()
+	# Saving draws the figure again at its own size, after which the canvas is drawn in full once more
+	assert plot.canvas.draws == 2
+	# The reference draws the overlays with the rest of the figure, and only once
+	expected, bare = make_plot(), make_plot()
+	move_overlays(expected)
+	expected.saving = True
+	for artist in expected.overlays:
+		artist.set_animated(False)
+	expected.canvas.figure.savefig(str(tmp_path / 'expected.png'))
+	bare.save_fig(str(tmp_path / 'bare.png'))
+	saved = matplotlib.image.imread(str(tmp_path / 'plot.png'))
+	np.testing.assert_array_equal(saved, matplotlib.image.imread(str(tmp_path / 'expected.png')))
+	assert not np.array_equal(saved, matplotlib.image.imread(str(tmp_path / 'bare.png')))
+
+def test_graph_draws_once_per_event(qapp):
+	import DataWindows
+	graph = DataWindows.Graph('graph', 80)
+	graph.update_data(*phasor_cloud())
+	qapp.processEvents()
+	draws = []
+	graph.canvas.mpl_connect('draw_event', draws.append)
+	# Everything that one event changes is drawn together once control is back in the event loop
+	graph.update_data(*phasor_cloud(1))
+	graph.update_fraction_range(0.1, 0.3)
+	graph.update_angle_range(10, 70)
+	assert draws == []
+	qapp.processEvents()
+	assert len(draws) == 1
+	# Moving only the lines and circles doesn't draw the plot
+	move_overlays(graph)
+	qapp.processEvents()
+	assert len(draws) == 1
+	graph.close()
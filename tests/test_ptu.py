@@ -0,0 +1,110 @@
+# Checks the phasor sums that are worked out from the photon stream of PTU files against the histograms that ptufile
+# decodes from the same files
+
+# imports
+import functools
+import numpy as np
+import ptufile
+import pytest
+
+from image_loader.image_loader import ImageLoader, PtuLoader
+from phasor.transform import phasor_weights, phasor_sums
+
+BINS = 16
+PERIOD = 12.5e-9
+
+@pytest.fixture(scope='module')
+def ptu_file(tmp_path_factory):
+	"""Writes a T3 PTU file with 3 frames and 2 channels, and returns its name and (T, Y, X, C, H) histogram"""
+	histogram = np.random.default_rng(0).poisson(1, (3, 12, 10, 2, BINS)).astype(np.uint8)
+	file = str(tmp_path_factory.mktemp('ptu') / 'scan.ptu')
+	# Each photon of a pixel takes up one laser period of its pixel time
+	pixel_time = PERIOD * (int(histogram.sum(axis=(-2, -1)).max()) + 16)
+	ptufile.imwrite(file, histogram, PERIOD, PERIOD / BINS, pixel_time)
+	return file, histogram
+
+def weights():
+	return functools.partial(phasor_weights, bin_width=PERIOD * 1e9 / BINS, freq=80.0, harmonic=[1, 2])
+
+def expected_sums(histogram):
+	"""Returns the phasor sums of a (Y, X, bins) histogram"""
+	return phasor_sums(np.moveaxis(histogram, 2, 0), weights())
+
+def test_scan_is_decoded_from_photons(ptu_file):
+	with ptufile.PtuFile(ptu_file[0]) as ptu:
+		assert PtuLoader.plain_scan(ptu)
+
+@pytest.mark.parametrize('chunk', [64, 2 ** 20])
+def test_photon_sums_match_histogram(ptu_file, chunk):
+	file, histogram = ptu_file
+	with ptufile.PtuFile(file) as ptu:
+		for channel in range(2):
+			sums = PtuLoader.photon_sums(ptu, channel, weights(), chunk=chunk)
+			np.testing.assert_allclose(sums, expected_sums(histogram[..., channel, :].sum(axis=0)), rtol=1e-12,
+									   atol=1e-9)
+
+def test_all_channels_match_histogram(ptu_file):
+	file, histogram = ptu_file
+	sums = ImageLoader.from_file(file).load_channel_sums(file, [1, 0], weights())
+	for sum_map, channel in zip(sums, [1, 0]):
+		np.testing.assert_allclose(sum_map, expected_sums(histogram[..., channel, :].sum(axis=0)), rtol=1e-12,
+								   atol=1e-9)
+
+def test_frame_sums_match_histogram(ptu_file):
+	file, histogram = ptu_file
+	count, frames = ImageLoader.load_frames(file, 1, weights())
+	frames = list(frames)
+	assert count == len(frames) == 3
+	for frame, sums in enumerate(frames):
+		np.testing.assert_allclose(sums, expected_sums(histogram[frame, :, :, 1]), rtol=1e-12, atol=1e-9)
+
+def test_histogram_blocks_match_histogram(ptu_file):
+	file, histogram = ptu_file
+	with ptufile.PtuFile(file) as ptu:
+		# Blocks of 5 lines, so the last block of the 12 lines is cut short
+		blocks = list(PtuLoader.histogram_blocks(ptu, max_bytes=10 * 2 * BINS * 4 * 5))
+		assert len(blocks) == 3
+		decoded = np.concatenate([block for _, block in blocks])
+		np.testing.assert_array_equal(decoded[..., :BINS], histogram.sum(axis=0))
+		sums = PtuLoader.histogram_sums(ptu, [0], weights())[0]
+	np.testing.assert_allclose(sums, expected_sums(histogram[..., 0, :].sum(axis=0)), rtol=1e-12, atol=1e-9)
+
+@pytest.mark.parametrize('load', ['load_channel_sums', 'load_image_sums', 'load_image_totals'])
+def test_missing_channel_raises(ptu_file, load):
+	file = ptu_file[0]
+	channel = [2] if load == 'load_channel_sums' else 2
+	with pytest.raises(ValueError):
+		getattr(ImageLoader.from_file(file), load)(file, channel, weights())
+
+def test_scan_without_record_information_keeps_every_frame(ptu_file):
+	class Scan:
+		pass
+	assert not PtuLoader.skips_first_frame(Scan())
+	with ptufile.PtuFile(ptu_file[0]) as ptu:
+		assert PtuLoader.skips_first_frame(ptu) == ptu._info.skip_first_frame
+
+def test_scans_are_added_up_unless_asked_for(ptu_file):
+	file, histogram = ptu_file
+	assert not ImageLoader.has_frames(file)
+	assert ImageLoader.has_frames(file, separate_frames=True)
+	sums = ImageLoader.load_sums(file, 0, weights())
+	np.testing.assert_allclose(sums, expected_sums(histogram[..., 0, :].sum(axis=0)), rtol=1e-12, atol=1e-9)
+
+def test_histogram_frames_are_decoded_once(ptu_file, monkeypatch):
+	file, histogram = ptu_file
+	with ptufile.PtuFile(file) as ptu:
+		decode = ptu.decode_image
+		calls = []
+
+		def counted(*args, **kwargs):
+			calls.append(kwargs)
+			return decode(*args, **kwargs)
+
+		monkeypatch.setattr(ptu, 'decode_image', counted)
+		frames = PtuLoader.histogram_frame_sums(ptu, [1, 0], weights())
+	# One decode of every frame at once, as the histogram fits in one block
+	assert len(calls) == 1 and calls[0]['frame'] is None
+	assert len(frames) == 3
+	for frame, sums in enumerate(frames):
+		for sum_map, channel in zip(sums, [1, 0]):
+			np.testing.assert_allclose(sum_map, expected_sums(histogram[frame, :, :, channel]), rtol=1e-12, atol=1e-9)
@@ -0,0 +1,73 @@
+# Checks that a session file brings back the datasets that were saved to it, with the same analysis
+
+# imports
+import json
+import numpy as np
+import pytest
+
+from phasor import PhasorData, FrameSeries, Session, save_session
+
+def random_stack(rng):
+	decay = np.exp(-np.arange(64) / 12.0)[:, np.newaxis, np.newaxis]
+	return rng.poisson(20 * decay * rng.uniform(0.2, 2, (1, 48, 64))).astype(np.uint16)
+
+def analysed(rng):
+	"""Returns PhasorData with every setting of its analysis changed from the default"""
+	data = PhasorData.from_stack(random_stack(rng), 'image', phi_cal=0.2, m_cal=0.9, harmonic=1)
+	data.convolution(2)
+	data.update_threshold(30, 100000)
+	data.update_angle_range(10, 70)
+	data.update_circle_range(20, 100)
+	data.fraction_coor_map(0.5, 0.3)
+	data.update_fraction_range(5, 60)
+	data.update_circle(np.array([[0.5, 0.3], [0.6, 0.35], [-3, -3], [-3, -3]]), [0.05, 0.1, 0.05, 0.05])
+	data.change_colormap(4)
+	data.set_harmonic(2)
+	data.apply_masks()
+	return data
+
+def assert_same_analysis(restored, data):
+	assert restored.name == data.name
+	assert restored.harmonic == data.harmonic and restored.color_map_select == data.color_map_select
+	np.testing.assert_array_equal(restored.original_image, data.original_image)
+	np.testing.assert_array_equal(restored.x_adjusted, data.x_adjusted)
+	np.testing.assert_array_equal(restored.combined_mask(), data.combined_mask())
+	np.testing.assert_array_equal(restored.displayImage, data.displayImage)
+
+def test_round_trip(tmp_path):
+	rng = np.random.default_rng(1)
+	data = analysed(rng)
+	series = FrameSeries.from_stacks([random_stack(rng) for _ in range(3)], 'series')
+	frame = series.frame(2, data.analysis_state())
+	frame.apply_masks()
+	file = str(tmp_path / 'saved.flute')
+	save_session(file, [(data, data.analysis_state(), 0, True), (series, frame.analysis_state(), 2, False)])
+
+	with Session(file) as session:
+		assert len(session) == 2
+		assert session.names() == ['image', 'series']
+		restored, state, index, show_lines = session.dataset(0)
+		restored.restore_state(state)
+		restored.apply_masks()
+		assert (index, show_lines) == (0, True)
+		assert_same_analysis(restored, data)
+
+		restored_series, state, index, show_lines = session.dataset(1)
+		assert isinstance(restored_series, FrameSeries) and len(restored_series) == 3
+		assert (index, show_lines) == (2, False)
+		restored_frame = restored_series.frame(index, state)
+		restored_frame.apply_masks()
+		assert_same_analysis(restored_frame, frame)
+
+def test_other_archives_are_refused(tmp_path):
+	file = str(tmp_path / 'arrays.npz')
+	np.savez(file, intensity=np.zeros(3))
+	with pytest.raises(ValueError):
+		Session(file)
+
+def test_newer_sessions_are_refused(tmp_path):
+	file = str(tmp_path / 'newer.flute')
+	with open(file, 'wb') as f:
+		np.savez(f, manifest=np.array(json.dumps({'version': 1000, 'datasets': []})))
+	with pytest.raises(ValueError):
+		Session(file)
@@ -0,0 +1,61 @@
+# Checks that uncompressed TIFF stacks are memory-mapped, and that compressed and tiled stacks, which are decoded a page
+# at a time instead, give the same image and phasor sums
+
+# imports
+import functools
+import numpy as np
+import pytest
+import tifffile
+
+from image_loader.image_loader import TiffLoader
+from phasor.transform import phasor_weights, phasor_sums
+
+WEIGHTS = functools.partial(phasor_weights, bin_width=0.2208, freq=80.0, harmonic=[1, 2])
+
+def random_stack(shape=(48, 33, 29), seed=0):
+	return np.random.default_rng(seed).poisson(20, shape).astype(np.uint16)
+
+# Ways of writing a stack, and whether the loader can memory-map the file
+LAYOUTS = {
+	'contiguous': ({}, True),
+	'compressed': ({'compression': 'zlib'}, False),
+	'tiled': ({'tile': (16, 16)}, False),
+}
+
+@pytest.fixture(params=sorted(LAYOUTS))
+def layout(request):
+	return request.param
+
+def write(tmp_path, stack, layout):
+	file = str(tmp_path / ('%s.tif' % layout))
+	tifffile.imwrite(file, stack, **LAYOUTS[layout][0])
+	return file
+
+def test_only_contiguous_stacks_are_mapped(tmp_path, layout):
+	stack = random_stack()
+	file = write(tmp_path, stack, layout)
+	image = TiffLoader().load_image(file)
+	assert isinstance(image, np.memmap) == LAYOUTS[layout][1]
+	np.testing.assert_array_equal(image, stack)
+
+def test_mapped_stacks_are_read_only(tmp_path):
+	file = write(tmp_path, random_stack(), 'contiguous')
+	image = TiffLoader().load_image(file)
+	with pytest.raises(ValueError):
+		image[0, 0, 0] = 1
+
+def test_sums_do_not_depend_on_the_layout(tmp_path, layout):
+	stack = random_stack()
+	file = write(tmp_path, stack, layout)
+	fractions = []
+	sums = TiffLoader().load_image_sums(file, 0, WEIGHTS, fractions.append)
+	np.testing.assert_allclose(sums, phasor_sums(stack, WEIGHTS), rtol=1e-12, atol=1e-9)
+	assert fractions and fractions[-1] == pytest.approx(1)
+
+def test_frame_sums_do_not_depend_on_the_layout(tmp_path, layout):
+	stacks = random_stack((3, 16, 12, 10), seed=1)
+	file = write(tmp_path, stacks, layout)
+	frames = list(TiffLoader().load_frame_sums(file, 0, WEIGHTS))
+	assert len(frames) == len(stacks)
+	for sums, stack in zip(frames, stacks):
+		np.testing.assert_allclose(sums, phasor_sums(stack, WEIGHTS), rtol=1e-12, atol=1e-9)
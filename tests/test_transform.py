@@ -0,0 +1,105 @@
+# Checks the phasor weights and the streaming kernels against the phasor worked out directly from the whole stack, and
+# the calibration against the centroid of a known decay
+
+# imports
+import functools
+import numpy as np
+import pytest
+import ptufile
+import tifffile
+
+import Calibration
+from image_loader.image_loader import ImageLoader
+from phasor.cache import PhasorCache
+from image_loader.streaming import phasor_totals, phasor_totals_from_slabs
+from phasor.transform import phasor_weights, phasor_sums, phasor_sums_from_slabs, bin_slabs, phasor_centroid
+
+BIN_WIDTH = 0.2208
+FREQ = 80.0
+
+def random_stack(bins=56, height=37, width=29, seed=0):
+	return np.random.default_rng(seed).poisson(20, (bins, height, width)).astype(np.uint16)
+
+def direct_sums(stack, harmonics, bin_width=BIN_WIDTH):
+	"""Works out the sums with the cosine and sine of every bin, over the whole stack at once"""
+	t = bin_width * (np.arange(stack.shape[0]) + 0.5)
+	sums = [stack.sum(axis=0, dtype=np.float64)]
+	for harmonic in harmonics:
+		omega_t = 2 * np.pi * FREQ / 1000 * harmonic * t
+		sums.append(np.einsum('b,byx->yx', np.cos(omega_t), stack.astype(np.float64)))
+		sums.append(np.einsum('b,byx->yx', np.sin(omega_t), stack.astype(np.float64)))
+	return np.stack(sums)
+
+def mono_exponential(tau, bins=256, height=16, width=16, photons=10000):
+	"""Returns a (bins, Y, X) stack of the same noise free decay with lifetime tau in every pixel, covering one laser
+	period"""
+	bin_width = 1000 / FREQ / bins
+	t = bin_width * (np.arange(bins) + 0.5)
+	decay = np.round(photons * np.exp(-t / tau)).astype(np.uint16)
+	return np.broadcast_to(decay[:, np.newaxis, np.newaxis], (bins, height, width)).copy(), bin_width
+
+def test_weights_match_cosine_and_sine():
+	weights = phasor_weights(64, BIN_WIDTH, FREQ, [1, 2])
+	t = BIN_WIDTH * (np.arange(64) + 0.5)
+	omega = 2 * np.pi * FREQ / 1000
+	expected = np.stack([np.ones(64), np.cos(omega * t), np.sin(omega * t), np.cos(2 * omega * t),
+						 np.sin(2 * omega * t)], axis=1)
+	np.testing.assert_allclose(weights, expected, rtol=0, atol=1e-15)
+
+@pytest.mark.parametrize('max_bytes', [1, 5000, 2 ** 30])
+def test_tiled_sums_match_direct(max_bytes):
+	stack = random_stack()
+	weights = functools.partial(phasor_weights, bin_width=BIN_WIDTH, freq=FREQ, harmonic=[1, 2, 3])
+	sums = phasor_sums(stack, weights, max_bytes=max_bytes)
+	np.testing.assert_allclose(sums, direct_sums(stack, [1, 2, 3]), rtol=1e-12, atol=1e-9)
+
+@pytest.mark.parametrize('max_bytes', [1, 20000, 2 ** 30])
+def test_slab_sums_match_direct(max_bytes):
+	stack = random_stack()
+	weights = phasor_weights(stack.shape[0], BIN_WIDTH, FREQ, [1, 2])
+	sums = phasor_sums_from_slabs(bin_slabs(stack, max_bytes), weights, stack.shape[1:])
+	np.testing.assert_allclose(sums, direct_sums(stack, [1, 2]), rtol=1e-12, atol=1e-9)
+
+@pytest.mark.parametrize('max_bytes', [1, 20000, 2 ** 30])
+def test_totals_match_summed_maps(max_bytes):
+	stack = random_stack()
+	weights = phasor_weights(stack.shape[0], BIN_WIDTH, FREQ, [1, 2])
+	expected = direct_sums(stack, [1, 2]).sum(axis=(1, 2))
+	np.testing.assert_allclose(phasor_totals(stack, weights, max_bytes), expected, rtol=1e-12)
+	np.testing.assert_allclose(phasor_totals_from_slabs(bin_slabs(stack, max_bytes), weights), expected, rtol=1e-12)
+
+def test_loader_totals_match_sums(tmp_path):
+	stack = random_stack()
+	file = str(tmp_path / 'stack.tif')
+	tifffile.imwrite(file, stack)
+	weights = functools.partial(phasor_weights, bin_width=BIN_WIDTH, freq=FREQ, harmonic=1)
+	sums = ImageLoader.load_sums(file, 0, weights)
+	np.testing.assert_allclose(ImageLoader.load_totals(file, 0, weights), sums.sum(axis=(1, 2)), rtol=1e-12)
+
+def test_ptu_totals_match_sums(tmp_path):
+	histogram = np.random.default_rng(1).poisson(2, (1, 24, 20, 1, 32)).astype(np.uint8)
+	file = str(tmp_path / 'image.ptu')
+	# Each photon of a pixel takes up one laser period of its pixel time
+	ptufile.imwrite(file, histogram, 12.5e-9, 12.5e-9 / 32, 12.5e-9 * (int(histogram.sum(axis=-1).max()) + 16))
+	weights = functools.partial(phasor_weights, bin_width=12.5 / 32, freq=FREQ, harmonic=1)
+	sums = ImageLoader.load_sums(file, 0, weights)
+	totals = ImageLoader.load_totals(file, 0, weights)
+	np.testing.assert_allclose(totals, sums.sum(axis=(1, 2)), rtol=1e-12)
+	assert totals[0] == histogram.sum()
+
+def test_calibration_centroid_of_mono_exponential(tmp_path):
+	tau = 4.0
+	stack, bin_width = mono_exponential(tau)
+	file = str(tmp_path / 'reference.tif')
+	tifffile.imwrite(file, stack)
+	theta, m = Calibration.get_calibration_parameters(file, 0, bin_width, FREQ, 1, tau, cache=PhasorCache(max_bytes=0))
+
+	# The centroid is the phasor of the decay of one pixel, as every pixel has the same decay
+	g, s = phasor_centroid(direct_sums(stack[:, :1, :1], [1], bin_width).reshape(3, 1))
+	omega_tau = 2 * np.pi * FREQ / 1000 * tau
+	ideal_g, ideal_s = 1 / (1 + omega_tau ** 2), omega_tau / (1 + omega_tau ** 2)
+	assert theta == pytest.approx(np.arctan2(ideal_s, ideal_g) - np.arctan2(s[0], g[0]), abs=1e-12)
+	assert m == pytest.approx(np.hypot(ideal_g, ideal_s) / np.hypot(g[0], s[0]), rel=1e-12)
+	# A finely binned decay of the reference lifetime hardly needs calibrating
+	assert abs(theta) < 0.01
+	assert m == pytest.approx(1, abs=0.01)
@@ -0,0 +1,55 @@
+# Checks that the front panel follows the windows of the images through their signals: closing a window closes its
+# partner and removes the image from the table, and the circle colour and column widths are passed on as they change.
+# These tests need PyQt5, and are skipped without it
+
+# imports
+import numpy as np
+import pytest
+
+from phasor.phasor_data import PhasorData
+
+def stack_data(name='image'):
+	stack = np.random.default_rng(0).poisson(20, (32, 16, 12)).astype(np.uint16)
+	return PhasorData.from_stack(stack, name)
+
+@pytest.fixture
+def main_window(qapp, tmp_path, monkeypatch):
+	# The front panel keeps its settings in the folder it is run from
+	monkeypatch.chdir(tmp_path)
+	import main
+	window = main.MainWindow()
+	yield window
+	for image in list(window.image_arr):
+		image.kill()
+
+def test_closing_one_window_closes_the_other(qapp):
+	from image_handler import ImageHandler
+	image = ImageHandler(stack_data())
+	closed = []
+	image.image_window.closed.connect(lambda: closed.append('picture'))
+	image.graph_window.close()
+	assert image.graph_window.dead and image.image_window.dead
+	assert image.dead()
+	assert closed == ['picture']
+
+@pytest.mark.parametrize('window', ['graph_window', 'image_window'])
+def test_closed_images_leave_the_table(main_window, window):
+	kept = main_window.open_image(stack_data('kept'))
+	closed = main_window.open_image(stack_data('closed'))
+	assert main_window.tableWidget.rowCount() == 2
+	getattr(closed, window).close()
+	assert main_window.image_arr == [kept]
+	assert main_window.tableWidget.rowCount() == 1
+	assert main_window.tableWidget.item(0, 0).text() == kept.name
+
+def test_circle_colour_is_passed_on(main_window):
+	first = main_window.open_image(stack_data())
+	main_window.circleSelect.setCurrentIndex(2)
+	assert first.selected_circle == first.graph_window.circleSelect == 2
+	# Images that are opened later start with the selected colour
+	second = main_window.open_image(stack_data())
+	assert second.selected_circle == 2
+
+def test_column_widths_are_kept(main_window):
+	main_window.tableWidget.setColumnWidth(1, 77)
+	assert main_window.load_dict['table1Width'] == 77